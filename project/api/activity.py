@@ -0,0 +1,100 @@
+from collections import namedtuple
+
+from django.db.models import Max
+from rest_framework.generics import GenericAPIView
+from rest_framework.permissions import IsAuthenticated
+
+from project.api.comments.serializers import CommentSerializer
+from project.api.me.serializers import UserCoupnSerializer
+from project.api.pagination import MergedKeysetPagination
+from project.api.restaurant.serializers import OfferSerializer
+from project.api.reviews.serializers import ReviewSerializer
+from project.feed.models import Comment, Review, ReviewLike
+from project.feed.models.user_coupon import UserCoupon
+
+# queryset of the rows of a user, their (-time, id) keyset ordering backed by a (user, -time, id) index,
+# and the function serializing a list of them
+ActivitySource = namedtuple('ActivitySource', ['queryset', 'ordering', 'serialize'])
+
+
+def serialize_reviews(reviews, context):
+    return ReviewSerializer(reviews, many=True, context=context).data
+
+
+ACTIVITY_SOURCES = {
+    'review': ActivitySource(
+        queryset=lambda user: ReviewSerializer.setup_eager_loading(Review.objects.filter(user=user)),
+        ordering=('-created_at', 'id'),
+        serialize=serialize_reviews,
+    ),
+    'comment': ActivitySource(
+        queryset=lambda user: Comment.objects.filter(user=user),
+        ordering=('-created', 'id'),
+        serialize=lambda comments, context: CommentSerializer(comments, many=True, context=context).data,
+    ),
+    'review_like': ActivitySource(
+        queryset=lambda user: ReviewSerializer.setup_eager_loading(
+            ReviewLike.objects.filter(user=user), prefix='review__'
+        ),
+        ordering=('-created_at', 'id'),
+        serialize=lambda likes, context: serialize_reviews([like.review for like in likes], context),
+    ),
+    'redemption': ActivitySource(
+        queryset=lambda user: OfferSerializer.setup_eager_loading(
+            UserCoupon.objects.filter(user=user, coupon__isnull=False), prefix='coupon__coupon_offer__'
+        ),
+        ordering=('-used_at', 'id'),
+        serialize=lambda redemptions, context: UserCoupnSerializer(redemptions, many=True, context=context).data,
+    ),
+    # every review the user commented once, by the time of the last comment
+    'commented_review': ActivitySource(
+        queryset=lambda user: ReviewSerializer.setup_eager_loading(
+            Review.objects.filter(comments__user=user).annotate(commented_at=Max('comments__created'))
+        ),
+        ordering=('-commented_at', 'id'),
+        serialize=serialize_reviews,
+    ),
+}
+
+TIMELINE_TYPES = ['review', 'comment', 'review_like', 'redemption']
+
+
+class ActivityView(GenericAPIView):
+    """
+    One page of the activity of the user across the activity_types sources, newest first,
+    with the cursor of MergedKeysetPagination in the headers. Every item is {'type', 'created_at', 'object'},
+    or only the serialized object for views over a single source (flat = True).
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = MergedKeysetPagination
+    activity_types = TIMELINE_TYPES
+    flat = False
+
+    @property
+    def orderings(self):
+        return {name: ACTIVITY_SOURCES[name].ordering for name in self.get_activity_types()}
+
+    def get_activity_types(self):
+        return self.activity_types
+
+    def get(self, request):
+        querysets = {
+            name: ACTIVITY_SOURCES[name].queryset(request.user)
+            for name in self.get_activity_types()
+        }
+        page = self.paginate_queryset(querysets)
+        context = self.get_serializer_context()
+        # one serializer call per type, then back to the merged order
+        serialized = {}
+        for name in querysets:
+            objects = [obj for obj_name, obj in page if obj_name == name]
+            serialized[name] = iter(ACTIVITY_SOURCES[name].serialize(objects, context) if objects else [])
+        items = []
+        for name, obj in page:
+            data = next(serialized[name])
+            if self.flat:
+                items.append(data)
+            else:
+                time_field = ACTIVITY_SOURCES[name].ordering[0].lstrip('-')
+                items.append({'type': name, 'created_at': getattr(obj, time_field), 'object': data})
+        return self.get_paginated_response(items)
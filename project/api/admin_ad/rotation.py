@@ -0,0 +1,174 @@
+import atexit
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection
+from django.utils import timezone
+
+from project.api.admin_ad.serializer import AdminAdSerializer
+from project.feed.models.admin_ad import AdminAd
+
+logger = logging.getLogger(__name__)
+
+MAX_COUNT = 5
+# longest wait before retrying a failed flush, the wait doubles from AD_FLUSH_SECONDS
+MAX_FLUSH_BACKOFF_SECONDS = 300
+
+# an ad that can be served, data is its serialized form
+Candidate = namedtuple('Candidate', ['id', 'expiry', 'weight', 'data'])
+
+
+class AdRotator(object):
+    """
+    Serves active ads picked at random in proportion to AdminAd.CATEGORY_FREQUENCY, from a candidate set
+    kept in memory so serving and counting runs no query.
+
+    The candidates are reloaded every AD_ROTATION_REFRESH_SECONDS, ads expiring meanwhile are skipped.
+    Impressions and clicks are buffered per ad and added to AdminAd with one UPDATE every
+    AD_FLUSH_SECONDS, or as soon as AD_FLUSH_EVENTS are pending. A failed flush keeps the counts
+    buffered and is retried after a wait doubling up to MAX_FLUSH_BACKOFF_SECONDS. A worker stopped
+    without flushing loses at most what it buffered since the last flush.
+
+    start() runs both in a daemon thread of the worker, without it load() and flush() are called by hand.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.candidates = {}
+        self.loaded_at = None
+        self.pending = {}
+        self.pending_events = 0
+        self.flushed_at = time.monotonic()
+        self.failed_flushes = 0
+        # no flush is due before, after a failed one
+        self.retry_at = 0
+        self.wake = threading.Event()
+        self.thread = None
+
+    def load(self):
+        ads = list(AdminAd.objects.filter(is_active=True, expiry__gt=timezone.now()))
+        candidates = {
+            ad.pk: Candidate(ad.pk, ad.expiry, AdminAd.CATEGORY_FREQUENCY.get(ad.category, 0), data)
+            for ad, data in zip(ads, AdminAdSerializer(ads, many=True).data)
+        }
+        with self.lock:
+            self.candidates = candidates
+            self.loaded_at = time.monotonic()
+
+    def pick(self, count=1):
+        """
+        Returns the data of up to count distinct ads and counts an impression for each of them
+        """
+        if self.loaded_at is None:
+            # only the first request of a worker that was not started
+            self.load()
+        now = timezone.now()
+        with self.lock:
+            candidates = [c for c in self.candidates.values() if c.expiry > now and c.weight > 0]
+        picked = []
+        while candidates and len(picked) < count:
+            candidate = random.choices(candidates, weights=[c.weight for c in candidates])[0]
+            candidates.remove(candidate)
+            picked.append(candidate)
+        for candidate in picked:
+            self.record(candidate.id, impressions=1)
+        return [candidate.data for candidate in picked]
+
+    def click(self, ad_id):
+        """
+        Counts a click and returns the ad, None if it is not served
+        """
+        with self.lock:
+            candidate = self.candidates.get(ad_id)
+        if candidate is None:
+            return None
+        self.record(ad_id, clicks=1)
+        return candidate.data
+
+    def record(self, ad_id, impressions=0, clicks=0):
+        with self.lock:
+            counts = self.pending.setdefault(ad_id, [0, 0])
+            counts[0] += impressions
+            counts[1] += clicks
+            self.pending_events += impressions + clicks
+            full = self.pending_events >= settings.AD_FLUSH_EVENTS and time.monotonic() >= self.retry_at
+        if full:
+            self.wake.set()
+
+    def flush(self):
+        """
+        Adds the buffered impressions and clicks to the ads with a single UPDATE,
+        they stay buffered if it fails
+        """
+        with self.lock:
+            pending, self.pending, self.pending_events = self.pending, {}, 0
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return 0
+        table = connection.ops.quote_name(AdminAd._meta.db_table)
+        rows = list(pending.items())
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET impressions = {table}.impressions + counts.impressions,'
+                    f' clicks = {table}.clicks + counts.clicks'
+                    f' FROM (VALUES {", ".join(["(%s, %s, %s)"] * len(rows))})'
+                    f' AS counts (id, impressions, clicks) WHERE {table}.id = counts.id',
+                    [value for ad_id, (impressions, clicks) in rows for value in (ad_id, impressions, clicks)],
+                )
+        except DatabaseError:
+            logger.exception('Could not flush ad impressions')
+            with self.lock:
+                for ad_id, (impressions, clicks) in rows:
+                    counts = self.pending.setdefault(ad_id, [0, 0])
+                    counts[0] += impressions
+                    counts[1] += clicks
+                    self.pending_events += impressions + clicks
+                self.failed_flushes += 1
+                backoff = settings.AD_FLUSH_SECONDS * 2 ** self.failed_flushes
+                self.retry_at = time.monotonic() + min(backoff, MAX_FLUSH_BACKOFF_SECONDS)
+            return 0
+        with self.lock:
+            self.failed_flushes = 0
+            self.retry_at = 0
+        return len(rows)
+
+    def run(self):
+        refresh_seconds = settings.AD_ROTATION_REFRESH_SECONDS
+        flush_seconds = settings.AD_FLUSH_SECONDS
+        while True:
+            self.wake.wait(min(refresh_seconds, flush_seconds))
+            self.wake.clear()
+            try:
+                now = time.monotonic()
+                due = self.pending_events >= settings.AD_FLUSH_EVENTS or now - self.flushed_at >= flush_seconds
+                if due and now >= self.retry_at:
+                    self.flush()
+                if self.loaded_at is None or time.monotonic() - self.loaded_at >= refresh_seconds:
+                    self.load()
+            except Exception:
+                logger.exception('Ad rotation failed')
+            finally:
+                close_old_connections()
+
+    def start(self):
+        """
+        Loads the candidates and starts the thread refreshing them and flushing the counts
+        """
+        if self.thread is not None:
+            return
+        try:
+            self.load()
+        except DatabaseError:
+            # loaded by the thread instead
+            logger.exception('Could not load the ads')
+        self.thread = threading.Thread(target=self.run, name='ad-rotation', daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+
+ad_rotator = AdRotator()
@@ -4,16 +4,13 @@ from project.feed.models.admin_ad import AdminAd
 
 class AdminAdSerializer(serializers.ModelSerializer):
 
-    CATEGORY_FREQUENCY = {
-        'S': 100,
-        'G': 250,
-        'D': 500
-    }
+    CATEGORY_FREQUENCY = AdminAd.CATEGORY_FREQUENCY
     frequency = serializers.SerializerMethodField()
 
     class Meta:
         model = AdminAd
         fields = [
+            'id',
             'title', 
             'category', 
             'expiry', 
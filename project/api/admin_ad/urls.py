@@ -1,7 +1,10 @@
 from django.urls import path
-from project.api.admin_ad.views import ListAdView
+from project.api.admin_ad.views import ClickAdView, ListAdView, ServeAdView
 
+app_name = 'admin_ad'
 
 urlpatterns = [
-    path('all', ListAdView.as_view())
-]
\ No newline at end of file
+    path('all', ListAdView.as_view(), name='all'),
+    path('serve', ServeAdView.as_view(), name='serve'),
+    path('<int:ad_id>/click', ClickAdView.as_view(), name='click'),
+]
@@ -1,5 +1,11 @@
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
 from project.feed.models.admin_ad import AdminAd
+from project.api.admin_ad.rotation import MAX_COUNT, ad_rotator
 from project.api.admin_ad.serializer import AdminAdSerializer
 
 
@@ -8,4 +14,30 @@ class ListAdView(ListAPIView):
     queryset = AdminAd.objects.all()
 
     def get_queryset(self):
-        return self.queryset.filter(is_active=True)
\ No newline at end of file
+        return self.queryset.filter(is_active=True, expiry__gt=timezone.now())
+
+
+class ServeAdView(APIView):
+    """
+    Up to ?count= (default 1, max 5) distinct active ads picked by category frequency,
+    served from the memory of the worker and counted as impressions
+    """
+
+    def get(self, request):
+        try:
+            count = int(request.query_params.get('count', 1))
+        except ValueError:
+            raise ParseError('count must be an integer')
+        return Response(ad_rotator.pick(min(max(count, 1), MAX_COUNT)))
+
+
+class ClickAdView(APIView):
+    """
+    Counts a click on a served ad and returns it, the client then opens its deeplink
+    """
+
+    def post(self, request, ad_id):
+        ad = ad_rotator.click(ad_id)
+        if ad is None:
+            raise NotFound(f'Object not found with params {ad_id} on model AdminAd')
+        return Response(ad)
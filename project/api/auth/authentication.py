@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from project.api.auth.backends import load_user
+from project.api.auth.tokens import is_revoked
+
+
+class LazyUser(SimpleLazyObject):
+    """
+    The user of a token authenticated request. Its id comes from the token and the user row
+    is only read once another attribute is, with the profile, so views filtering on request.user
+    never query it and the others query it once
+    """
+    # what querysets and model comparisons check on a user, answered without loading it
+    _meta = User._meta
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        self.__dict__['_user_id'] = user_id
+        super().__init__(lambda: self.load())
+
+    @property
+    def __class__(self):
+        return User
+
+    def __bool__(self):
+        return True
+
+    def __getattr__(self, name):
+        # the ORM probes values for attributes (resolve_expression) a user never has
+        if self._wrapped is empty and not name.startswith('_') and not hasattr(User, name):
+            raise AttributeError(name)
+        return super().__getattr__(name)
+
+    @property
+    def pk(self):
+        return self.__dict__['_user_id']
+
+    id = pk
+
+    def load(self):
+        user = load_user(self.pk)
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        return user
+
+
+class TokenAuthentication(JWTAuthentication):
+    """
+    Authenticates requests by the signature of their bearer token, without a query on the user:
+    inactive users and password changes are handled by revoking the tokens of the user,
+    whose revocation time is cached
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+        if is_revoked(validated_token):
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        return LazyUser(validated_token[api_settings.USER_ID_CLAIM])
@@ -0,0 +1,20 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+
+
+def load_user(user_id):
+    """
+    This function returns the user of a request with its profile, loaded in one query, None if it does not exist
+    """
+
+    return User.objects.select_related('profile').filter(pk=user_id).first()
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend loading the session user with its profile, so request.user.profile costs no query
+    """
+
+    def get_user(self, user_id):
+        user = load_user(user_id)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,34 @@
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+    TokenVerifySerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+
+from project.api.auth.tokens import is_revoked, issue_token
+
+
+class ObtainTokenSerializer(TokenObtainPairSerializer):
+
+    @classmethod
+    def get_token(cls, user):
+        return issue_token(user)
+
+
+class RefreshTokenSerializer(TokenRefreshSerializer):
+
+    def validate(self, attrs):
+        if is_revoked(RefreshToken(attrs['refresh'])):
+            raise InvalidToken('Token has been revoked')
+        return super().validate(attrs)
+
+
+class VerifyTokenSerializer(TokenVerifySerializer):
+
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+        if api_settings.USER_ID_CLAIM in token and is_revoked(token):
+            raise InvalidToken('Token has been revoked')
+        return {}
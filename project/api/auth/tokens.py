@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from project.feed.models import Profile
+
+REVOKED_CACHE_KEY = 'auth:revoked:{}'
+
+# lifetimes of the token types, untyped tokens being verified have none of their own
+TOKEN_LIFETIMES = {
+    'access': api_settings.ACCESS_TOKEN_LIFETIME,
+    'refresh': api_settings.REFRESH_TOKEN_LIFETIME,
+}
+
+
+def issue_token(user):
+    """
+    This function returns a new refresh token of a user stamped with the time it is issued at,
+    which the access tokens made from it carry too
+    """
+
+    refresh = RefreshToken.for_user(user)
+    # float seconds, so tokens issued right after a revocation are not refused with it
+    refresh['iat'] = time.time()
+    return refresh
+
+
+def tokens_for_user(user):
+    refresh = issue_token(user)
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def issued_at(token):
+    """
+    This function returns the time a token was issued at, derived from its expiry when it has no iat claim
+    """
+
+    if 'iat' in token:
+        return token['iat']
+    lifetime = TOKEN_LIFETIMES.get(token.get(api_settings.TOKEN_TYPE_CLAIM), token.lifetime)
+    return token['exp'] - lifetime.total_seconds()
+
+
+def revoked_at(user_id):
+    """
+    This function returns the time before which the tokens of a user are revoked, 0 if they never were.
+    It is read from the cache, the profile of the user is only queried on a miss
+    """
+
+    key = REVOKED_CACHE_KEY.format(user_id)
+    value = cache.get(key)
+    if value is None:
+        revoked = Profile.objects.filter(user_id=user_id).values_list('tokens_revoked_at', flat=True).first()
+        value = revoked.timestamp() if revoked else 0
+        cache.set(key, value, settings.AUTH_REVOCATION_CACHE_SECONDS)
+    return value
+
+
+def is_revoked(token):
+    return issued_at(token) < revoked_at(token[api_settings.USER_ID_CLAIM])
+
+
+def revoke_tokens(user):
+    """
+    This function revokes every token issued to a user so far
+    """
+
+    now = timezone.now()
+    if not Profile.objects.filter(user_id=user.pk).update(tokens_revoked_at=now):
+        Profile.objects.create(user_id=user.pk, tokens_revoked_at=now)
+    cache.set(REVOKED_CACHE_KEY.format(user.pk), now.timestamp(), settings.AUTH_REVOCATION_CACHE_SECONDS)
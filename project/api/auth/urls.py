@@ -1,14 +1,14 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from .views import *
+from .views import ObtainTokenView, RefreshTokenView, VerifyTokenView
 from django.contrib.auth import views
 
 # app_name = 'auth'
 
 urlpatterns = [
-    # path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    # path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    # path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('token/', ObtainTokenView.as_view(), name='token_obtain_pair'),
+    path('token/refresh/', RefreshTokenView.as_view(), name='token_refresh'),
+    path('token/verify/', VerifyTokenView.as_view(), name='token_verify'),
     path('authenticate', authenticate),
     path('signup', signup),
     path('login', login),
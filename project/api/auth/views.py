@@ -11,6 +11,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from django.core.exceptions import ObjectDoesNotExist
 from django.forms.models import model_to_dict
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
+
+from project.api.auth.serializers import ObtainTokenSerializer, RefreshTokenSerializer, VerifyTokenSerializer
+from project.api.auth.tokens import revoke_tokens, tokens_for_user
 
 
 PASSWORD_REGEX = r"(?=.*?[0-9])"
@@ -41,7 +45,7 @@ def signup(request):
             last_name=last_name
         )
         user.save()
-        return Response('user successfully registerd')
+        return Response({'message': 'user successfully registerd', **tokens_for_user(user)})
     except:
         return Response('user registration failed.')
 
@@ -52,15 +56,29 @@ def signup(request):
 def login(request, format=None):
     content = {
         'message': 'login successful',
-        'user_info': model_to_dict(request.user, fields=['first_name', 'last_name', 'email', 'username'])
+        'user_info': model_to_dict(request.user, fields=['first_name', 'last_name', 'email', 'username']),
+        **tokens_for_user(request.user),
     }
     return Response(content)
 
 
+class ObtainTokenView(TokenObtainPairView):
+    serializer_class = ObtainTokenSerializer
+
+
+class RefreshTokenView(TokenRefreshView):
+    serializer_class = RefreshTokenSerializer
+
+
+class VerifyTokenView(TokenVerifyView):
+    serializer_class = VerifyTokenSerializer
+
+
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
+        revoke_tokens(request.user)
         logout(request)
         return Response('Logged out successfully.')
 
@@ -80,6 +98,7 @@ class ChangePassowrdView(APIView):
             raise ValidationError('You can not set old password as new password')
         user.password = make_password(new_password)
         user.save()
+        revoke_tokens(user)
         logout(request)
         return Response('Password changed successfully. Please login again with new password')
 
@@ -108,6 +127,7 @@ class ForgotPassowrdView(APIView):
         
         user.password = make_password(new_password)
         user.save()
+        revoke_tokens(user)
         logout(request)
         return Response('Password changed successfully. Please login with new password')
 
@@ -169,6 +189,7 @@ def authenticate(request):
 
         if user:
             data['status'] = 1
+            data.update(tokens_for_user(user))
     except Exception as e:
         print(e)
         pass
@@ -1,4 +1,28 @@
-from rest_framework.exceptions import NotFound
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags
+from rest_framework import status
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.response import Response
+
+
+def etag_matches(request, etag):
+    """
+    This function tells whether the If-None-Match header of a request holds the etag, weak or strong
+    """
+
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in if_none_match or etag in [tag[2:] if tag.startswith('W/') else tag for tag in if_none_match]
+
+
+class NotModified(Exception):
+    """
+    Raised by ConditionalGetMixin before the handler runs, answered with an empty 304
+    """
 
 
 class GetObjectMixin(object):
@@ -9,3 +33,83 @@ class GetObjectMixin(object):
         except model.DoesNotExist:
             raise NotFound(f'Object not found with params {pk} on model {model.__name__}')
         return obj
+
+
+class LimitOffsetMixin(object):
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit_offset(self):
+        """
+        Reads the ?limit=&offset= query params, clamping the limit to max_limit
+        """
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+            offset = int(self.request.query_params.get('offset', 0))
+        except ValueError:
+            raise ParseError('limit and offset must be integers')
+        return min(max(limit, 1), self.max_limit), max(offset, 0)
+
+    def slice_queryset(self, queryset):
+        limit, offset = self.get_limit_offset()
+        return queryset[offset:offset + limit]
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers a GET with 304 Not Modified while the ETag the client holds still matches, without
+    serializing anything. The ETag hashes the url, the user and get_validators(), read with one
+    aggregate query: the latest of the modified_fields over get_validator_queryset() and its count.
+    Last-Modified is sent along, but only If-None-Match is trusted since deleting a row does not
+    move the latest modification time.
+    """
+    # timestamp fields, following relations, of everything the response shows
+    modified_fields = ()
+    # seconds clients may reuse a response before revalidating it
+    max_age = 0
+
+    def get_validator_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validators(self):
+        """
+        Returns (last modified, values the response depends on), or None to answer without validators
+        """
+        aggregates = self.get_validator_queryset().order_by().aggregate(
+            count=Count('pk'), **{f'modified_{index}': Max(field) for index, field in enumerate(self.modified_fields)}
+        )
+        times = [aggregates[f'modified_{index}'] for index in range(len(self.modified_fields))]
+        present = [time for time in times if time is not None]
+        return (max(present) if present else None), [aggregates['count'], *times]
+
+    def get_etag(self, values):
+        parts = [self.request.get_full_path(), self.request.user.pk, values]
+        return f'"{hashlib.md5(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest()}"'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+        validators = self.get_validators()
+        if validators is None:
+            return
+        self.last_modified, values = validators
+        self.etag = self.get_etag(values)
+        if etag_matches(request, self.etag):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = self.etag
+            if self.last_modified is not None:
+                response['Last-Modified'] = http_date(self.last_modified.timestamp())
+            # the response depends on the user, shared caches must not serve it to another one
+            patch_cache_control(response, private=True, max_age=self.max_age)
+        return response
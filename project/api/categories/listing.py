@@ -0,0 +1,48 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from project.api.categories.serializers import CategorySerializer
+from project.feed.models import Category
+
+CACHE_KEY = 'categories:list'
+# dropped on every change anyway, the timeout only bounds a missed invalidation.
+# A default cache local to the worker keeps it LOCAL_CACHE_MAX_TTL at most instead,
+# invalidate() does not reach the copies of the other workers
+CACHE_TTL = 3600
+
+
+def build_listing():
+    """
+    This function returns the serialized categories with the count of their restaurants, in one query
+    """
+
+    categories = CategorySerializer.setup_eager_loading(Category.objects.all()).order_by('id')
+    return [dict(category) for category in CategorySerializer(categories, many=True).data]
+
+
+def get_listing():
+    """
+    This function returns (data, etag) of the category list from the cache, building it on a miss
+    """
+
+    listing = cache.get(CACHE_KEY)
+    if listing is None:
+        data = build_listing()
+        etag = hashlib.md5(json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()).hexdigest()
+        listing = (data, f'"{etag}"')
+        cache.set(CACHE_KEY, listing, CACHE_TTL if settings.DEFAULT_CACHE_SHARED else settings.LOCAL_CACHE_MAX_TTL)
+    return listing
+
+
+def invalidate():
+    """
+    This function drops the cached list once the current transaction commits, for every worker
+    if the default cache is shared
+    """
+
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
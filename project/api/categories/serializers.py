@@ -1,3 +1,4 @@
+from django.db.models import Count
 from rest_framework import serializers
 
 from project.feed.models import Category
@@ -8,11 +9,19 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Counts the restaurants of every category within the query of the categories
+        """
+        return queryset.annotate(restaurants_count=Count('restaurants'))
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
+        restaurants_count = getattr(instance, 'restaurants_count', None)
         return {
             **data,
-            'restaurants_count': instance.restaurants.count(),
+            'restaurants_count': instance.restaurants.count() if restaurants_count is None else restaurants_count,
         }
 
     def create(self, validated_data):
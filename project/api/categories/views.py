@@ -1,12 +1,29 @@
-from rest_framework.generics import ListAPIView
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.generics import GenericAPIView
+from rest_framework.response import Response
 
+from project.api.base import etag_matches
+from project.api.categories.listing import get_listing
 from project.api.categories.serializers import CategorySerializer
-from project.feed.models import Category
 
 
-class ListCategoriesView(ListAPIView):
+class ListCategoriesView(GenericAPIView):
+    """
+    Every category with the count of its restaurants. The list is cached whole and dropped
+    when a category changes or a restaurant is added, deleted or moved to another category,
+    clients revalidate it with If-None-Match and get a 304 while it did not change
+    """
     serializer_class = CategorySerializer
-    queryset = Category.objects.all()
+    # seconds clients and shared caches may reuse the list without asking
+    max_age = 60
 
-    def filter_queryset(self, queryset):
-        return queryset
+    def get(self, request):
+        data, etag = get_listing()
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data, status.HTTP_200_OK)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=self.max_age)
+        return response
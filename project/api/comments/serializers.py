@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from project.feed.models import Comment
+from project.feed.models import Comment, CommentLike
 from project.feed.models.review import Review
 
 
@@ -27,4 +27,4 @@ class CommentSerializer(serializers.ModelSerializer):
         )
 
     def get_likes(self, comment):
-        return comment.likes.count()
+        return CommentLike.count_for(comment)
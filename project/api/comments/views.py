@@ -1,14 +1,16 @@
 from django.contrib.auth.models import User
-from django.http import Http404
 from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.generics import GenericAPIView
 
 from project.api.base import GetObjectMixin
 from project.api.comments.serializers import CommentSerializer
+from project.api.pagination import KeysetPagination
 from project.api.reviews.serializers import ReviewSerializer
-from project.feed.models import Review, Comment, CommentLike
+from project.feed.models import Review, CommentLike
 
 
 # class ReviewGetCreateView(GenericAPIView):
@@ -48,25 +50,29 @@ class DeleteReviewCommentView(GetObjectMixin, APIView):
         return Response('Comment deleted!')
 
 
-class LikeUnlikeReviewCommentView(GetObjectMixin, APIView):
+class LikeUnlikeReviewCommentView(APIView):
+    permission_classes = [
+        IsAuthenticated,
+    ]
 
     def post(self, request, comment_id):
-        comment = self.get_object_by_model(Comment, comment_id)
-        try:
-            CommentLike.objects.create(user=request.user, comment=comment)
-        except CommentLike.DoesNotExist:
-            raise Http404
-        return Response('Comment liked!')
+        created, exists = CommentLike.like(request.user, comment_id)
+        if not exists:
+            raise NotFound(f'Object not found with params {comment_id} on model Comment')
+        return Response('Comment liked!' if created else 'Comment already liked!')
 
     def delete(self, request, comment_id):
-        comment = self.get_object_by_model(Comment, comment_id)
-        CommentLike.objects.get(user=request.user, comment=comment).delete()
+        deleted, exists = CommentLike.unlike(request.user, comment_id)
+        if not exists or not deleted:
+            raise NotFound(f'Object not found with params {comment_id} on model CommentLike')
         return Response('Comment unliked!')
 
 
-class UserCommentsView(GetObjectMixin, APIView):
+class UserCommentsView(GetObjectMixin, GenericAPIView):
+    pagination_class = KeysetPagination
+    ordering = ('-created', 'id')
 
     def get(self, request, user_id):
         user = self.get_object_by_model(User, user_id)
-        comments = user.comments.all()
-        return Response(CommentSerializer(comments, many=True).data, status.HTTP_200_OK)
+        comments = self.paginate_queryset(user.comments.all())
+        return self.get_paginated_response(CommentSerializer(comments, many=True).data)
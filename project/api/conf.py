@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ApiApp(AppConfig):
+    name = 'project.api'
+    verbose_name = "ESR Api"
+
+    def ready(self):
+        from . import signals  # noqa
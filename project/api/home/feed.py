@@ -0,0 +1,120 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from project.api.admin_ad.serializer import AdminAdSerializer
+from project.api.categories.serializers import CategorySerializer
+from project.api.restaurant.serializers import OfferSerializer, OfferUserState, RestaurantSerializer
+from project.feed.models import Category, Offer, Restaurant, Review
+from project.feed.models.admin_ad import AdminAd
+
+CACHE_PREFIX = 'home'
+
+# build returns the serialized section shared by every user, it is cached for ttl seconds
+# and dropped as soon as a row of one of the models is saved or deleted. A default cache local
+# to the worker keeps it LOCAL_CACHE_MAX_TTL at most, the other workers do not see the drop
+HomeSection = namedtuple('HomeSection', ['build', 'ttl', 'models', 'offers'])
+
+# offers and restaurants are serialized as seen by an anonymous user, OfferUserState.overlay adds the user
+SHARED_CONTEXT = {'offer_user_state': OfferUserState(None)}
+
+TOP_RATED_COUNT = 4
+OFFERS_COUNT = 10
+
+
+def build_top_rated():
+    # the rating aggregates are written with UPDATEs that send no signals, reviews invalidate instead
+    restaurants = RestaurantSerializer.setup_eager_loading(
+        Restaurant.objects.filter(rating_aggregate__reviews_count__gt=0)
+    ).order_by('-rating_aggregate__score', 'pk')[:TOP_RATED_COUNT]
+    return RestaurantSerializer(restaurants, many=True, context=dict(SHARED_CONTEXT)).data
+
+
+def build_offers(**filters):
+    def build():
+        offers = OfferSerializer.setup_eager_loading(
+            Offer.objects.filter(approval_status=True, **filters)
+        ).order_by('-created_at', 'id')[:OFFERS_COUNT]
+        return OfferSerializer(offers, many=True, context=dict(SHARED_CONTEXT)).data
+    return build
+
+
+def build_ads():
+    ads = AdminAd.objects.filter(is_active=True, expiry__gt=timezone.now()).order_by('-created_at')
+    return AdminAdSerializer(ads, many=True).data
+
+
+def build_categories():
+    return CategorySerializer(
+        CategorySerializer.setup_eager_loading(Category.objects.all()).order_by('name'), many=True
+    ).data
+
+
+HOME_SECTIONS = {
+    'top_rated_restaurants': HomeSection(
+        build=build_top_rated, ttl=300, models=[Restaurant, Review, Category], offers=False,
+    ),
+    'featured_offers': HomeSection(
+        build=build_offers(is_redeemable=True, restaurant__is_featured=True), ttl=120,
+        models=[Offer, Restaurant, Review, Category], offers=True,
+    ),
+    'bumper_offers': HomeSection(
+        build=build_offers(is_bumper=True), ttl=120, models=[Offer, Restaurant, Review, Category], offers=True,
+    ),
+    # ads also leave the feed when they expire, within a minute
+    'ads': HomeSection(build=build_ads, ttl=60, models=[AdminAd], offers=False),
+    'categories': HomeSection(build=build_categories, ttl=600, models=[Category, Restaurant], offers=False),
+}
+
+
+def section_ttl(section):
+    if settings.DEFAULT_CACHE_SHARED:
+        return section.ttl
+    return min(section.ttl, settings.LOCAL_CACHE_MAX_TTL)
+
+
+def cache_key(name):
+    return f'{CACHE_PREFIX}:{name}'
+
+
+def get_section(name):
+    """
+    This function returns the shared data of a section from the cache, building it on a miss
+    """
+
+    section = HOME_SECTIONS[name]
+    data = cache.get(cache_key(name))
+    if data is None:
+        # plain lists and dicts, the cache pickles them
+        data = [dict(item) for item in section.build()]
+        cache.set(cache_key(name), data, section_ttl(section))
+    return data
+
+
+def get_feed(user):
+    """
+    This function assembles the home feed of a user out of the cached sections,
+    only the can_review and is_redeemable flags of the offers are computed per request
+    """
+
+    state = OfferUserState(user)
+    feed = {}
+    for name, section in HOME_SECTIONS.items():
+        data = get_section(name)
+        feed[name] = state.overlay(data) if section.offers else data
+    return feed
+
+
+def invalidate(model):
+    """
+    This function drops the sections built from a model once the current transaction commits,
+    so a request running meanwhile can not cache the rows as they were before. Only a shared
+    default cache drops them for every worker
+    """
+
+    keys = [cache_key(name) for name, section in HOME_SECTIONS.items() if model in section.models]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,10 +1,10 @@
 from django.urls import path
 
-from project.api.home.views import ListFourBestRatedRestaurants
+from project.api.home.views import HomeFeedView
 
 
 app_name = 'home'
 
 urlpatterns = [
-    path('', ListFourBestRatedRestaurants.as_view(), name='home'),
+    path('', HomeFeedView.as_view(), name='home'),
 ]
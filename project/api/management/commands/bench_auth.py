@@ -0,0 +1,61 @@
+import base64
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from project.api.auth.authentication import TokenAuthentication
+from project.api.auth.tokens import REVOKED_CACHE_KEY, tokens_for_user
+
+BENCH_USERNAME = 'bench_auth_user'
+BENCH_PASSWORD = 'bench_auth_password1'
+
+
+def cpu_time(function, repeat):
+    """
+    This function returns the CPU milliseconds a function takes per run and the queries of its last run
+    """
+
+    function()
+    start = time.process_time()
+    for _ in range(repeat - 1):
+        function()
+    with CaptureQueriesContext(connection) as queries:
+        function()
+    return (time.process_time() - start) * 1000 / repeat, len(queries)
+
+
+class Command(BaseCommand):
+    help = 'Compares the CPU time and queries of authenticating one request with Basic auth and with a token'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Requests authenticated per scheme')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        # the user only lives in this transaction
+        with transaction.atomic():
+            user = User.objects.create_user(username=BENCH_USERNAME, password=BENCH_PASSWORD)
+            credentials = base64.b64encode(f'{BENCH_USERNAME}:{BENCH_PASSWORD}'.encode()).decode()
+            schemes = {
+                'basic': (BasicAuthentication(), f'Basic {credentials}'),
+                'token': (TokenAuthentication(), f'Bearer {tokens_for_user(user)["access"]}'),
+            }
+            results = {}
+            for name, (authentication, header) in schemes.items():
+                request = Request(factory.get('/', HTTP_AUTHORIZATION=header))
+                results[name] = cpu_time(lambda: authentication.authenticate(request), options['repeat'])
+                self.stdout.write(f'{name:6} {results[name][0]:8.3f} ms CPU per request, {results[name][1]} queries')
+            transaction.set_rollback(True)
+        cache.delete(REVOKED_CACHE_KEY.format(user.pk))
+        saved = results['basic'][0] - results['token'][0]
+        speedup = results['basic'][0] / max(results['token'][0], 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'token authentication saves {saved:.3f} ms CPU per request ({speedup:.0f}x)'
+        ))
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from project.api.middleware import COMPRESSORS
+from project.api.renderers import MessagePackRenderer, ORJSONRenderer
+from project.api.restaurant.serializers import OfferSerializer, OfferUserState, RestaurantSerializer
+from project.api.reviews.serializers import ReviewSerializer
+from project.feed.models import Offer, Restaurant, Review
+
+# name: (serializer, queryset, fields) of the big lists, fields None for every default field
+BENCH_LISTS = {
+    'offers': (OfferSerializer, Offer.objects.filter(approval_status=True).order_by('-created_at', 'id'), None),
+    'offer cards': (
+        OfferSerializer, Offer.objects.filter(approval_status=True).order_by('-created_at', 'id'),
+        OfferSerializer.PROFILES['card'],
+    ),
+    'restaurants': (RestaurantSerializer, Restaurant.objects.order_by('-created', 'id'), None),
+    'reviews': (ReviewSerializer, Review.objects.filter(is_active=True).order_by('-created_at', 'id'), None),
+}
+
+RENDERERS = {
+    'json': JSONRenderer(),
+    'orjson': ORJSONRenderer(),
+    'msgpack': MessagePackRenderer(),
+}
+
+
+def best_time(function, repeat):
+    """
+    This function returns the result of a function and its fastest run in milliseconds
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compares the serialization and render time and the wire size of the big list endpoints per renderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help='Rows per list')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measure, the fastest is kept')
+
+    def handle(self, *args, **options):
+        for name, (serializer_class, queryset, fields) in BENCH_LISTS.items():
+            def serialize():
+                rows = serializer_class.setup_eager_loading(queryset, fields=fields)[:options['limit']]
+                context = {'offer_user_state': OfferUserState(None)}
+                return serializer_class(rows, many=True, context=context, fields=fields).data
+
+            data, serialize_ms = best_time(serialize, options['repeat'])
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: {len(data)} rows, serialized in {serialize_ms:.1f} ms'
+            ))
+            for renderer_name, renderer in RENDERERS.items():
+                content, render_ms = best_time(lambda: renderer.render(data), options['repeat'])
+                sizes = ', '.join(
+                    f'{coding} {len(compress(content)) / 1024:.1f} KB' for coding, compress in COMPRESSORS.items()
+                )
+                self.stdout.write(
+                    f'  {renderer_name:8} render {render_ms:7.2f} ms'
+                    f'  total {serialize_ms + render_ms:7.1f} ms  {len(content) / 1024:.1f} KB ({sizes})'
+                )
@@ -3,7 +3,7 @@ from django.urls import path
 from project.api.me.views import (
     GetUpdateUserProfileView, CouponApply,
     GetUserProfileView, UserCouponsView, UserFavOffersView,
-    AddUserFavOfferView, GetUserOfferView, RemoveUserFavOfferView
+    AddUserFavOfferView, GetUserOfferView, RemoveUserFavOfferView, UserActivityView
 )
 
 app_name = 'me'
@@ -17,4 +17,5 @@ urlpatterns = [
     path('add/offer', AddUserFavOfferView.as_view(), name='add_user_fav_offer'),
     path('remove/offer', RemoveUserFavOfferView.as_view(), name='remove_user_fav_offer'),
     path('offer/<int:offer_id>', GetUserOfferView.as_view(), name='user_offer_by_id'),
+    path('activity', UserActivityView.as_view(), name='activity'),
 ]
@@ -3,6 +3,9 @@ from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from rest_framework.exceptions import ParseError
+
+from project.api.activity import ActivityView, TIMELINE_TYPES
 from project.api.me.serializers import UserSerializer, UserProfileUpdateSerializer
 from project.api.permissions import IsUserOrReadOnly
 from rest_framework.decorators import api_view
@@ -10,16 +13,14 @@ from django.contrib import auth
 from django.contrib.auth.models import User
 
 from project.feed.models.coupon import Coupon
-from project.feed.models.user_coupon import UserCoupon
+from project.feed.models.user_coupon import RedemptionError, UserCoupon
 from project.feed.models.user_offers import UserOffers
 from rest_framework import mixins
-from datetime import datetime
-from datetime import timedelta
 from rest_framework.views import APIView
 from project.api.restaurant.serializers import OfferSerializer
 from project.api.me.serializers import UserCoupnSerializer, UserOfferSerializer
+from project.api.pagination import KeysetPagination
 from project.feed.models.offer import Offer
-import pytz
 
 
 User = get_user_model()
@@ -33,7 +34,7 @@ class GetUserProfileView(GenericAPIView):
     ]
 
     def get(self, request, **kwargs):
-        user = User.objects.get(pk=request.user.id)
+        user = request.user
         return Response(
             {
                 "first_name": user.first_name,
@@ -83,63 +84,51 @@ class CouponApply(mixins.CreateModelMixin, GenericAPIView):
         coupon_code = request.data.get('coupon_code')
         offer_id = request.data.get('offer_id')
         try:
-            offer = Offer.objects.get(pk=offer_id)
-            try:
-                coupon = Coupon.objects.get(code=coupon_code, coupon_offer=offer)
-                already_used_coupon = UserCoupon.objects.filter(user=user, coupon=coupon).order_by('-used_at')
-                if already_used_coupon:
-                    re_usable_time = already_used_coupon[0].used_at + timedelta(hours=UserCoupon.REDEEM_HOURS_LIMIT)
-                    if re_usable_time > datetime.now().replace(tzinfo=pytz.UTC):
-                        return Response(
-                            {
-                                'message': "Coupon can not be redeemable before 24 hours.",
-                                'coupon_applied': False
-                            }
-                        )
-                user_coupon = UserCoupon(
-                    user=user,
-                    coupon=coupon,
-                    used_at=datetime.now()
-                )
-                user_coupon.save()
-                return Response(
-                    {
-                        'message': "Coupon successfully applied.",
-                        'coupon_applied': True
-                    }
-                )
-            except Coupon.DoesNotExist:
-                return Response(
+            coupon = Coupon.objects.get(code=coupon_code, coupon_offer_id=offer_id)
+        except Coupon.DoesNotExist:
+            message = "Invalid Coupon code." if Offer.objects.filter(pk=offer_id).exists() else "Invalid offer."
+            return Response(
                 {
-                    'message': "Invalid Coupon code.",
+                    'message': message,
                     'coupon_applied': False
                 }
             )
-        except Offer.DoesNotExist:
+        try:
+            UserCoupon.redeem(user, coupon)
+        except RedemptionError as e:
             return Response(
                 {
-                    'message': "Invalid offer.",
+                    'message': str(e),
                     'coupon_applied': False
                 }
             )
+        return Response(
+            {
+                'message': "Coupon successfully applied.",
+                'coupon_applied': True
+            }
+        )
 
 
-
-class UserCouponsView(APIView):
+class UserCouponsView(GenericAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('-used_at', 'id')
     
     def get(self, request):
-        offers = []
-        info = UserCoupon.objects.filter(user=request.user)
+        info = OfferSerializer.setup_eager_loading(
+            UserCoupon.objects.filter(user=request.user), prefix='coupon__coupon_offer__'
+        )
+        info = self.paginate_queryset(info)
         info = UserCoupnSerializer(info, context={'request': request}, many=True).data
-        return Response(info)
+        return self.get_paginated_response(info)
 
 
 class UserFavOffersView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        info = UserOffers.objects.filter(user=request.user).select_related('offer')
+        info = OfferSerializer.setup_eager_loading(UserOffers.objects.filter(user=request.user), prefix='offer__')
         info = UserOfferSerializer(info, context={'request': request}).data
         return Response(info)
 
@@ -191,3 +180,19 @@ class RemoveUserFavOfferView(APIView):
                 'message': 'Invalid offer id.',
                 'code': 422
             })
+
+
+class UserActivityView(ActivityView):
+    """
+    Reviews, comments, review likes and redemptions of the user, newest first,
+    ?types=review,comment restricts the timeline to some of them
+    """
+
+    def get_activity_types(self):
+        types = self.request.query_params.get('types')
+        if not types:
+            return TIMELINE_TYPES
+        types = types.split(',')
+        if not set(types) <= set(TIMELINE_TYPES):
+            raise ParseError(f'types must be among {", ".join(TIMELINE_TYPES)}')
+        return [name for name in TIMELINE_TYPES if name in types]
@@ -0,0 +1,97 @@
+import gzip
+import logging
+
+import brotli
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from project.api.queries import QUERY_BUDGETS, record_queries
+
+logger = logging.getLogger(__name__)
+
+# fast settings, the responses are compressed on every request
+COMPRESSORS = {
+    'br': lambda content: brotli.compress(content, quality=4),
+    'gzip': lambda content: gzip.compress(content, compresslevel=6, mtime=0),
+}
+
+
+def accepted_encodings(header):
+    """
+    This function returns the content codings of an Accept-Encoding header the client accepts, q > 0
+    """
+
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                continue
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses responses with brotli, or gzip for the clients without it. Bodies shorter than
+    COMPRESSION_MIN_BYTES, streamed and already encoded responses are sent as they are.
+    """
+
+    def process_response(self, request, response):
+        if (response.streaming or response.has_header('Content-Encoding')
+                or len(response.content) < settings.COMPRESSION_MIN_BYTES):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        coding = next((coding for coding in COMPRESSORS if coding in accepted), None)
+        if coding is None:
+            return response
+        content = COMPRESSORS[coding](response.content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = coding
+        # a strong ETag names the uncompressed bytes
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
+
+
+class QueryCountMiddleware(object):
+    """
+    Counts the queries of every request and their time, sent back in the X-Query-Count and Server-Timing
+    headers. Requests over the budget of their endpoint or repeating a query shape are logged with
+    their most repeated shapes. Only installed with QUERY_INSTRUMENTATION.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as log:
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(log.count)
+        timing = f'db;dur={log.duration_ms:.1f};desc="{log.count} queries"'
+        response['Server-Timing'] = ', '.join(filter(None, [response.get('Server-Timing'), timing]))
+
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        budget = QUERY_BUDGETS.get(view_name)
+        duplicates = log.duplicates(settings.QUERY_INSTRUMENTATION_TOP_SHAPES)
+        if (budget is not None and log.count > budget) or duplicates:
+            logger.warning(
+                '%s %s ran %d queries in %.1f ms (budget %s), repeated shapes:%s',
+                request.method, request.path, log.count, log.duration_ms, budget,
+                ''.join(f'\n  {count}x {shape}' for count, shape in duplicates) or ' none',
+            )
+        return response
@@ -0,0 +1,241 @@
+import base64
+import heapq
+import json
+from functools import reduce
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def approximate_count(queryset):
+    """
+    This function returns the number of rows the planner expects the queryset to return,
+    read from its statistics with an EXPLAIN instead of counting the rows
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+def keyset_after(ordering, values):
+    """
+    This function returns the Q of the rows coming after the given values of the ordering fields:
+    (a > x) | (a = x & b > y) | ...
+    """
+
+    conditions = []
+    for index, (field, value) in enumerate(zip(ordering, values)):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {f.lstrip('-'): v for f, v in zip(ordering[:index], values)}
+        conditions.append(Q(**equal, **{f'{name}__{lookup}': value}))
+    return reduce(lambda a, b: a | b, conditions)
+
+
+def keyset_value(obj, field):
+    """
+    This function reads an ordering field, following foreign keys (restaurant__created)
+    """
+
+    for attribute in field.lstrip('-').split('__'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def keyset_field(queryset, field):
+    """
+    This function returns the model field an ordering field of a queryset refers to, following foreign keys,
+    or the output field of the annotation of that name (commented_at)
+    """
+
+    *path, name = field.lstrip('-').split('__')
+    if not path and name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    model = queryset.model
+    for attribute in path:
+        model = model._meta.get_field(attribute).related_model
+    return model._meta.get_field(name)
+
+
+def clean_values(queryset, ordering, values):
+    """
+    This function converts the values of a cursor to the types of the ordering fields of the queryset,
+    a cursor that was tampered with raises NotFound
+    """
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise NotFound('Invalid cursor')
+    try:
+        cleaned = [keyset_field(queryset, field).to_python(value) for field, value in zip(ordering, values)]
+    except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+        raise NotFound('Invalid cursor')
+    # the ordering fields are not null
+    if None in cleaned:
+        raise NotFound('Invalid cursor')
+    return cleaned
+
+
+def encode_values(values):
+    # isoformat keeps the microseconds the json encoder of django drops
+    return [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the ordering attribute of the view, e.g. ordering = ('-created_at', 'id').
+    The next page is selected with a WHERE on the values of the last row instead of an OFFSET,
+    so every page costs the same however deep it is. The ordering must end on a unique field
+    and its fields must not be null.
+
+    The body stays the plain list of results, the pagination goes in the headers:
+    Link (rel="next"), X-Next-Cursor and X-Approximate-Count.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            raise ParseError(f'{self.page_size_query_param} must be an integer')
+        return min(max(page_size, 1), self.max_page_size)
+
+    @staticmethod
+    def encode_cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+    def read_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+
+    def decode_cursor(self, request, queryset):
+        values = self.read_cursor(request)
+        if values is None:
+            return None
+        return clean_values(queryset, self.ordering, values)
+
+    def after(self, values):
+        return keyset_after(self.ordering, values)
+
+    @staticmethod
+    def get_value(obj, field):
+        return keyset_value(obj, field)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = view.ordering
+        page_size = self.get_page_size(request)
+        self.count = approximate_count(queryset)
+        cursor = self.decode_cursor(request, queryset)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor))
+        # one extra row tells whether there is a next page
+        results = list(queryset.order_by(*self.ordering)[:page_size + 1])
+        self.next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            values = [self.get_value(results[-1], field) for field in self.ordering]
+            self.next_cursor = self.encode_cursor(encode_values(values))
+        return results
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        headers = {}
+        if self.next_cursor is not None:
+            headers['Link'] = f'<{self.get_next_link()}>; rel="next"'
+            headers['X-Next-Cursor'] = self.next_cursor
+        if self.count is not None:
+            headers['X-Approximate-Count'] = str(self.count)
+        return Response(data, headers=headers)
+
+
+class MergedKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination of several querysets merged into one stream, newest first, e.g. the activity
+    of a user across reviews, comments and likes. paginate_queryset takes {name: queryset} and the view
+    an orderings attribute {name: ('-time field', 'id')}.
+
+    Every page runs one query per queryset reading at most page_size rows after its own position,
+    the rows are merged lazily and only the first page_size are kept. The cursor holds the position
+    of every queryset, null once it has no rows left, so the next page resumes each one where
+    the merge stopped. Results are (name, obj) pairs, there is no X-Approximate-Count.
+    """
+
+    def decode_cursor(self, request, querysets):
+        positions = self.read_cursor(request) or {}
+        if not isinstance(positions, dict) or any(name not in self.orderings for name in positions):
+            raise NotFound('Invalid cursor')
+        return {
+            name: None if values is None else clean_values(querysets[name], self.orderings[name], values)
+            for name, values in positions.items()
+        }
+
+    def sort_key(self, name, obj):
+        time_field, id_field = self.orderings[name]
+        # newest first, then the lowest id as within every queryset
+        return keyset_value(obj, time_field), -keyset_value(obj, id_field)
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        self.orderings = view.orderings
+        self.count = None
+        page_size = self.get_page_size(request)
+        positions = self.decode_cursor(request, querysets)
+        streams = {}
+        for name, queryset in querysets.items():
+            ordering = self.orderings[name]
+            if name in positions:
+                if positions[name] is None:
+                    continue
+                queryset = queryset.filter(keyset_after(ordering, positions[name]))
+            streams[name] = list(queryset.order_by(*ordering)[:page_size + 1])
+        merged = heapq.merge(
+            *[[(self.sort_key(name, obj), name, obj) for obj in rows] for name, rows in streams.items()],
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        results = [(name, obj) for key, name, obj in islice(merged, page_size)]
+
+        # every queryset resumes after its last row shown, or stays where it was without any
+        taken = {}
+        for name, obj in results:
+            taken[name] = taken.get(name, 0) + 1
+            positions[name] = encode_values([keyset_value(obj, field) for field in self.orderings[name]])
+        has_next = False
+        for name, rows in streams.items():
+            if taken.get(name, 0) < len(rows):
+                has_next = True
+            else:
+                positions[name] = None
+        self.next_cursor = None
+        if has_next:
+            self.next_cursor = self.encode_cursor({
+                name: None if values is None else encode_values(values) for name, values in positions.items()
+            })
+        return results
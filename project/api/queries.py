@@ -0,0 +1,95 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+# most queries a request to each endpoint may run, by url name. Budgets are checked by the
+# tests of test_query_budgets, which fail for an endpoint over its budget or without a test,
+# and logged by QueryCountMiddleware. They are counted with cold caches and hold for pages of
+# any size, so an N+1 goes over.
+QUERY_BUDGETS = {
+    'api:categories:categories_list': 1,
+    'api:home:home': 8,
+    'api:restaurants:all': 3,
+    'api:restaurants:category_restaurants': 3,
+    'api:restaurants:top_rated_restaurants': 2,
+    'api:restaurants:get_update_delete_restaurant': 3,
+    'api:restaurants:offer_by_restaurant': 4,
+    'api:restaurants:offer_by_id': 4,
+    'api:restaurants:all_offers': 5,
+    'api:restaurants:featured_offers': 5,
+    'api:restaurants:non_featured_offers': 5,
+    'api:restaurants:all_bumper_offers': 5,
+    'api:restaurants:top_rated_offers': 1,
+    'api:reviews:restaurant_reviews': 4,
+    'api:reviews:top_reviews': 2,
+    'api:reviews:popular_reviews': 2,
+    'api:reviews:liked_reviews': 2,
+    'api:reviews:user_reviews': 2,
+    'api:reviews:commented_reviews': 2,
+    'api:reviews:restaurant_tags': 2,
+    'api:reviews:tag_reviews': 4,
+    'api:me:user_profile': 1,
+    'api:me:activity': 6,
+    'api:users:list_users': 2,
+    'api:users:user_profile': 1,
+}
+
+# lists of placeholders, whose length varies with the rows they select
+PLACEHOLDER_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+NUMBERS = re.compile(r'\b\d+\b')
+
+
+def sql_shape(sql):
+    """
+    This function returns the shape of a query: its SQL with the lists of placeholders and the numbers collapsed,
+    the queries of an N+1 have the same shape
+    """
+
+    return NUMBERS.sub('N', PLACEHOLDER_LISTS.sub('(%s, ...)', sql))
+
+
+class QueryLog(object):
+    """
+    Execute wrapper recording the SQL and the duration of every query run on the connections it is installed on
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration_ms(self):
+        return sum(duration for sql, duration in self.queries) * 1000
+
+    def duplicates(self, top=5):
+        """
+        Returns the most repeated query shapes run more than once, as (count, shape)
+        """
+        counts = Counter(sql_shape(sql) for sql, duration in self.queries)
+        return [(count, shape) for shape, count in counts.most_common(top) if count > 1]
+
+
+@contextmanager
+def record_queries():
+    """
+    This function records the queries run on every database connection of the thread within its block
+    """
+
+    log = QueryLog()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
@@ -1,44 +1,104 @@
 from rest_framework import serializers
-from project.feed.models import Restaurant, Offer, Review
+from project.feed.models import Restaurant, Offer, Review, RestaurantRating, OfferRating
+from project.feed.images import variant_urls
 from project.feed.models.menu_image import MenuImage
 from project.api.reviews.serializers import ReviewSerializer
-from django.db.models import Avg
+from project.api.sparse import SparseFieldsMixin
+from django.db.models import Prefetch
 from django.core.exceptions import ObjectDoesNotExist
-from project.feed.models.user_coupon import UserCoupon
-from datetime import datetime
+from project.feed.models.user_coupon import DailyRedemption, UserCoupon
+from datetime import datetime, time
+from django.utils import timezone
 
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(SparseFieldsMixin, serializers.ModelSerializer):
 
-    reviews = ReviewSerializer(read_only=True, many=True)
+    PROFILES = {
+        'card': ['id', 'name', 'city', 'category', 'rating', 'reviews_count', 'image', 'logo_image', 'is_featured',
+                 'image_variants'],
+        'detail': None,
+    }
+    # the active reviews, with ?expand=reviews
+    EXPANDABLE_FIELDS = ['reviews']
+    FIELD_SOURCES = {
+        'rating': ['rating_aggregate'],
+        'reviews_count': ['rating_aggregate'],
+        'category': ['category__name'],
+        'reviews': ['review'],
+        'menu_images': ['menuimage'],
+        'menu_image_variants': ['menuimage'],
+    }
+
+    reviews = ReviewSerializer(read_only=True, many=True, source='review_set')
     category = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
     menu_images = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    menu_image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Restaurant
         fields = ['id', 'name', 'country', 'address', 'city', 'zip_code', 'lat', 'long', 'website',
             'phone_number', 'rating', 'email', 'opening_hours', 'price_level', 'category', 'restaurant_type',
-            'reviews', 'image', 'logo_image', 'cover_image', 'menu_images', 'is_featured', 'reviews_count']
+            'reviews', 'image', 'logo_image', 'cover_image', 'menu_images', 'is_featured', 'reviews_count',
+            'image_variants', 'menu_image_variants']
         read_only_fields = ['id', 'reviews',]
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, sources=()):
+        """
+        Attaches category, rating aggregates and ordered menu images to the queryset
+        so a list of restaurants is serialized without any per-row queries,
+        only what the given fields read when there are some
+        """
+        if fields is None:
+            fields = cls.default_fields()
+            queryset = queryset.select_related('category', 'rating_aggregate')
+        else:
+            queryset = cls.shrink_queryset(queryset, fields, sources)
+        if 'menu_images' in fields or 'menu_image_variants' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'menuimage_set',
+                queryset=MenuImage.objects.order_by('sort_order'),
+                to_attr='ordered_menu_images',
+            ))
+        if 'reviews' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'review_set',
+                queryset=ReviewSerializer.setup_eager_loading(Review.objects.filter(is_active=True)),
+            ))
+        return queryset
+
     def get_category(self, restaurant):
-        return restaurant.category.name
+        return restaurant.category.name if restaurant.category else None
 
     def get_reviews_count(self, restaurant):
-        return Review.objects.filter(restaurant=restaurant.id).count()
+        return RestaurantRating.for_target(restaurant).reviews_count
     
     def get_rating(self, restaurant):
-        return Review.objects.filter(restaurant=restaurant.id).aggregate(avg_rating=Avg('rating_overall'))
+        return {'avg_rating': RestaurantRating.for_target(restaurant).avg_rating}
     
+    @staticmethod
+    def get_menu_image_objects(restaurant):
+        if not hasattr(restaurant, 'ordered_menu_images'):
+            restaurant.ordered_menu_images = list(
+                MenuImage.objects.filter(restaurant__pk=restaurant.pk).order_by('sort_order')
+            )
+        return restaurant.ordered_menu_images
+
     def get_menu_images(self, restaurant):
         menu_images = []
-        objs = MenuImage.objects.filter(restaurant__pk=restaurant.pk).order_by('sort_order')
-        for obj in objs:
+        for obj in self.get_menu_image_objects(restaurant):
             menu_images.append(obj.image.url)
         return menu_images
 
+    def get_image_variants(self, restaurant):
+        return {field_name: variant_urls(restaurant, field_name) for field_name in Restaurant.IMAGE_FIELDS}
+
+    def get_menu_image_variants(self, restaurant):
+        return [variant_urls(obj, 'image') for obj in self.get_menu_image_objects(restaurant)]
+
     def create(self, validated_data):
         return Restaurant.objects.create(
             **validated_data,
@@ -53,13 +113,109 @@ class RestaurantImageUploadSerializer(serializers.ModelSerializer):
         fields = ['image']
 
 
-class OfferSerializer(serializers.ModelSerializer):
+class IssueCouponsSerializer(serializers.Serializer):
+
+    MAX_COUNT = 100000
+
+    count = serializers.IntegerField(min_value=1, max_value=MAX_COUNT)
+    discount = serializers.IntegerField(min_value=0, max_value=100)
+    valid_from = serializers.DateTimeField()
+    valid_till = serializers.DateTimeField()
+    active = serializers.BooleanField(default=True)
+
+    def validate(self, data):
+        if data['valid_till'] < data['valid_from']:
+            raise serializers.ValidationError({'valid_till': 'valid_till must be after valid_from'})
+        return data
+
+
+class OfferUserState(object):
+    """
+    The offers a user has reviewed and the coupons they redeemed today, loaded with a query or two
+    so OfferSerializer answers can_review and is_redeemable of a whole list without per-offer queries
+    """
+
+    def __init__(self, user):
+        self.reviewed = set()
+        self.redeemed_offer_ids = set()
+        self.redeemed_today = 0
+        if user is None or not user.is_authenticated:
+            return
+        self.reviewed = set(Review.objects.filter(
+            user=user,
+            offer__isnull=False,
+        ).values_list('offer_id', 'restaurant_id'))
+        today = timezone.localdate()
+        self.redeemed_today = DailyRedemption.objects.filter(
+            user=user,
+            day=today,
+        ).values_list('count', flat=True).first() or 0
+        if self.redeemed_today:
+            day_start = timezone.make_aware(datetime.combine(today, time.min))
+            self.redeemed_offer_ids = set(UserCoupon.objects.filter(
+                user=user,
+                used_at__gte=day_start,
+            ).values_list('coupon__coupon_offer_id', flat=True))
+
+    def can_review(self, offer_id, restaurant_id):
+        return (offer_id, restaurant_id) not in self.reviewed
+
+    def can_redeem(self, offer_id):
+        return offer_id not in self.redeemed_offer_ids and self.redeemed_today < UserCoupon.REDEEM_LIMIT
+
+    def fingerprint(self):
+        """
+        Returns everything can_review and can_redeem depend on, for the ETag of offer responses
+        """
+        return [
+            sorted(self.reviewed, key=lambda pair: (pair[0], pair[1] or 0)),
+            sorted(self.redeemed_offer_ids),
+            self.redeemed_today,
+        ]
+
+    def overlay(self, offers_data):
+        """
+        Returns copies of offers serialized for an anonymous user with can_review and is_redeemable
+        narrowed down for this user, so cached offer lists are shared between users
+        """
+        return [
+            dict(
+                offer,
+                can_review=offer['can_review'] and self.can_review(offer['id'], offer['restaurant_id']),
+                is_redeemable=offer['is_redeemable'] and self.can_redeem(offer['id']),
+            )
+            for offer in offers_data
+        ]
+
+
+class OfferSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+
+    PROFILES = {
+        'card': ['id', 'name', 'discounted_price', 'original_price', 'restaurant_id', 'image_url', 'restaurant_name',
+                 'image_variants'],
+        'detail': None,
+    }
+    FIELD_SOURCES = {
+        'restaurant_name': ['restaurant__name'],
+        'restaurant_category': ['restaurant__category__name'],
+        'reviews_count': ['rating_aggregate'],
+        'rating': ['rating_aggregate'],
+        'cover_image': ['restaurant__cover_image'],
+        'can_review': ['is_bumper', 'restaurant_id'],
+        'is_redeemable': ['is_redeemable', 'is_bumper'],
+        'image_variants': ['image_variants', 'restaurant__image_variants'],
+        'lat': ['restaurant__lat'],
+        'long': ['restaurant__long'],
+        'restaurant_logo': ['restaurant__logo_image'],
+    }
+    # the fields OfferUserState is loaded for
+    USER_STATE_FIELDS = ['can_review', 'is_redeemable']
 
     class Meta:
         model = Offer
         fields = ['id', 'name', 'description', 'discounted_price', 'rating', 'original_price', 'restaurant_id', 'image_url',
             'reviews_count', 'valid_from', 'valid_till', 'restaurant_name', 'restaurant_category', 'is_bumper',
-            'is_redeemable', 'cover_image', 'can_review', 'lat', 'long', 'restaurant_logo'
+            'is_redeemable', 'cover_image', 'can_review', 'lat', 'long', 'restaurant_logo', 'image_variants'
         ]
         read_only_fields = ['approval_status']
 
@@ -70,10 +226,22 @@ class OfferSerializer(serializers.ModelSerializer):
     cover_image = serializers.SerializerMethodField()
     can_review = serializers.SerializerMethodField()
     is_redeemable = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     lat = serializers.FloatField(source='restaurant.lat', read_only=True)
     long = serializers.ReadOnlyField(source='restaurant.long', read_only=True)
     restaurant_logo = serializers.ImageField(source='restaurant.logo_image', read_only=True)
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, prefix='', fields=None, sources=()):
+        """
+        Attaches restaurant, category and rating aggregate to a queryset of offers,
+        or of objects pointing to offers through prefix (e.g. 'offer__'). Offers serialized
+        with some fields only load what they read.
+        """
+        if fields is None or prefix:
+            return queryset.select_related(f'{prefix}restaurant__category', f'{prefix}rating_aggregate')
+        return cls.shrink_queryset(queryset, fields, sources)
+
     def get_restaurant_name(self, offer):
         return offer.restaurant.name
     
@@ -81,47 +249,42 @@ class OfferSerializer(serializers.ModelSerializer):
         return offer.restaurant.category.name
     
     def get_reviews_count(self, offer):
-        return Review.objects.filter(offer=offer.id).count()
+        return OfferRating.for_target(offer).reviews_count
     
     def get_rating(self, offer):
-        return Review.objects.filter(offer=offer.id).aggregate(ave_rating=Avg('rating_overall'))
+        return {'ave_rating': OfferRating.for_target(offer).avg_rating}
     
     def get_cover_image(self, offer):
         return offer.restaurant.cover_image.url if offer.restaurant.cover_image else ''
     
+    def get_image_variants(self, offer):
+        """
+        Returns the variants of every image of the offer card, list views should show the thumb or card ones
+        """
+        return {
+            'image_url': variant_urls(offer, 'image_url'),
+            'cover_image': variant_urls(offer.restaurant, 'cover_image'),
+            'logo_image': variant_urls(offer.restaurant, 'logo_image'),
+        }
+
+    def get_user_state(self):
+        """
+        Returns the OfferUserState of the request, shared by every offer serialized with the same context
+        """
+        if 'offer_user_state' not in self.context:
+            try:
+                user = self.context.get('request').user
+            except AttributeError:
+                user = None
+            self.context['offer_user_state'] = OfferUserState(user)
+        return self.context['offer_user_state']
+
     def get_can_review(self, offer):
-        try:
-            user = self.context.get('request').user
-        except:
-            user = self.context.user
         if offer.is_bumper:
             return False
-        review = Review.objects.filter(
-            offer=offer.id,
-            restaurant=offer.restaurant,
-            user=user
-        )
-        if review:
-            return False
-        
-        return True
+        return self.get_user_state().can_review(offer.id, offer.restaurant_id)
     
     def get_is_redeemable(self, offer):
-        try:
-            user = self.context.get('request').user
-        except:
-            user = self.context.user
-        today = datetime.now()
         if not offer.is_redeemable or offer.is_bumper:
             return False
-        user_coupon = UserCoupon.objects.filter(
-            user=user, 
-            used_at__year=today.year,
-            used_at__month=today.month,
-            used_at__day=today.day,
-        )
-        if user_coupon.filter(coupon__coupon_offer__pk=offer.pk):
-            return False
-        if user_coupon.count() >= UserCoupon.REDEEM_LIMIT:
-            return False
-        return True
+        return self.get_user_state().can_redeem(offer.pk)
@@ -6,7 +6,7 @@ from project.api.restaurant.views import (
     TopRatedRestaurantsView, TopRated4RestaurantsView,
     ListCategoryRestaurantsView, RestaurantImageUploadView,
     OfferByRestaurant, AllOffers, OfferById, BumperOffers, AllTopOffers,
-    ListAllRestaurantsView, FeaturedOffers, NonFeaturedOffers
+    ListAllRestaurantsView, FeaturedOffers, NonFeaturedOffers, NearbyView, IssueCouponsView
 )
 
 from project.api.restaurant import views
@@ -22,12 +22,15 @@ urlpatterns = [
     path('?search=<str:search_string>', ListAllRestaurantsView.as_view(), name='search_restaurant_offers'),
     # top avg rating of reviews based restraurants
     path('top/all', TopRatedRestaurantsView.as_view(), name='top_rated_restaurants'),
+    # restaurants and offers closest to ?lat=&long=
+    path('nearby', NearbyView.as_view(), name='nearby'),
     # category based restaurants
     path('category/<int:pk>/', ListCategoryRestaurantsView.as_view(), name='category_restaurants'),
 
 
     # offers related routes
     path('offer/<int:id>', OfferById.as_view(), name='offer_by_id'),
+    path('offer/<int:id>/coupons', IssueCouponsView.as_view(), name='issue_coupons'),
     path('offers', AllOffers.as_view(), name='all_offers'),
     path('offers/bumper', BumperOffers.as_view(), name='all_bumper_offers'),
     path('offers/featured', FeaturedOffers.as_view(), name='featured_offers'),
@@ -1,17 +1,24 @@
 #from urllib import request
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 from django.shortcuts import redirect
 from django.views.decorators.http import require_POST
 from rest_framework import status
+from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView, GenericAPIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from project.api.base import GetObjectMixin
+from project.api.base import ConditionalGetMixin, GetObjectMixin, LimitOffsetMixin
 from project.api.categories.serializers import CategorySerializer
+from project.api.pagination import KeysetPagination
 from project.api.permissions import IsUserOrReadOnly
-from project.api.restaurant.serializers import RestaurantSerializer, RestaurantImageUploadSerializer, OfferSerializer
+from project.api.restaurant.serializers import (
+    RestaurantSerializer, RestaurantImageUploadSerializer, OfferSerializer, IssueCouponsSerializer, OfferUserState
+)
+from project.api.search import engine as search_engine
+from project.api.sparse import SparseFieldsViewMixin
+from project.feed.geo import bounding_box, covering_cells, haversine_km
 from project.feed.models import Restaurant, Category, Offer, Review
 from project.feed.models.coupon import Coupon
 from project.feed.models.forms import CouponApplyForm
@@ -21,57 +28,165 @@ from django.db.models import Avg
 #from urllib3.util import request
 
 
+class OfferConditionalGetMixin(SparseFieldsViewMixin, ConditionalGetMixin):
+    """
+    Conditional GET of offers: the ETag covers the offers, their restaurant and rating aggregate,
+    and the OfferUserState of the user when the selected fields show it, which is then reused
+    to serialize them
+    """
+    modified_fields = ('updated_at', 'restaurant__modified', 'rating_aggregate__updated_at')
+
+    def uses_user_state(self):
+        fields = self.get_selected_fields()
+        return fields is None or any(name in fields for name in OfferSerializer.USER_STATE_FIELDS)
+
+    def get_user_state(self):
+        if not hasattr(self, '_user_state'):
+            self._user_state = OfferUserState(self.request.user)
+        return self._user_state
+
+    def get_validators(self):
+        last_modified, values = super().get_validators()
+        if self.uses_user_state():
+            values.append(self.get_user_state().fingerprint())
+        return last_modified, values
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.uses_user_state():
+            context['offer_user_state'] = self.get_user_state()
+        return context
+
+
 class ListAllRestaurantsView(GenericAPIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('created', 'id')
 
     def get(self, request):
         
-        queryset_restaurant = Restaurant.objects.all()
+        queryset_restaurant = RestaurantSerializer.setup_eager_loading(Restaurant.objects.all())
         serializer_class_restaurant = RestaurantSerializer
         
         search_string = self.request.query_params.get('search')
         if search_string:
             context = {}
-            offer_query_set = Offer.objects.all().order_by('created')
-            offer_serializer_class = OfferSerializer
-            offers = offer_query_set.filter(
-                Q(name__icontains=search_string) |
-                Q(restaurant__name__icontains=search_string)
-            )
-            if offers:
-                context['offers'] = offer_serializer_class(offers, many=True, context={'request': request}).data
-            
-            restaurants = queryset_restaurant.filter(
-                Q(name__icontains=search_string) |
-                Q(category__name__icontains=search_string) |
-                Q(address__icontains=search_string)
-            )
-            if restaurants:
-                context['restaurants'] = serializer_class_restaurant(restaurants, many=True).data
+            page, page_size = search_engine.get_page_params(self.request.query_params)
+            has_next = {}
+            offers = search_engine.search('offers', search_string, page, page_size)
+            if offers['ids']:
+                offer_query_set = OfferSerializer.setup_eager_loading(Offer.objects.all())
+                context['offers'] = search_engine.serialize(
+                    OfferSerializer, search_engine.load(offer_query_set, offers), context={'request': request}
+                )
+                has_next['offers'] = offers['has_next']
+
+            restaurants = search_engine.search('restaurants', search_string, page, page_size)
+            if restaurants['ids']:
+                context['restaurants'] = search_engine.serialize(
+                    serializer_class_restaurant, search_engine.load(queryset_restaurant, restaurants)
+                )
+                has_next['restaurants'] = restaurants['has_next']
             if context:
+                context['page'] = page
+                context['has_next'] = has_next
                 return Response(context)
             return Response('Nothing Found')
         # if no search query str provided returns all restaurants
-        return Response(serializer_class_restaurant(queryset_restaurant, many=True).data)
+        page = self.paginate_queryset(queryset_restaurant)
+        return self.get_paginated_response(serializer_class_restaurant(page, many=True).data)
 
 
-class TopRatedRestaurantsView(GenericAPIView):
+class TopRatedRestaurantsView(SparseFieldsViewMixin, LimitOffsetMixin, GenericAPIView):
+    """
+    Restaurants ranked by the bayesian score of their rating aggregate, paginated with ?limit=&offset=
+    """
     serializer_class = RestaurantSerializer
-    queryset = Review.objects.all().order_by('restaurant').distinct('restaurant')
+    queryset = Restaurant.objects.filter(
+        rating_aggregate__reviews_count__gt=0
+    ).order_by('-rating_aggregate__score', 'pk')
 
     def get(self, request):
-        restaurant_list = []
-        for review in self.get_queryset():
-            restaurant_list.append(review.restaurant)
-        restaurant_list_serialized = self.serializer_class(restaurant_list, many=True).data
-        sorted_restaurant_list= reversed(sorted(restaurant_list_serialized, key=lambda k: k['rating']['avg_rating'])) 
-        return Response(sorted_restaurant_list)
+        restaurants = self.slice_queryset(self.setup_eager_loading(self.get_queryset()))
+        return Response(self.get_serializer(restaurants, many=True).data)
 
 
 class TopRated4RestaurantsView(TopRatedRestaurantsView):
+    default_limit = 4
+
+
+class NearbyView(GenericAPIView):
+    """
+    Restaurants and offers within ?radius= km (default 5, max 50) of ?lat=&long=,
+    closest first and at most ?limit= (default 20, max 100) of each
+    """
+    permission_classes = [IsAuthenticated]
+    default_radius = 5.0
+    max_radius = 50.0
+    default_limit = 20
+    max_limit = 100
+
+    def get_params(self):
+        params = self.request.query_params
+        try:
+            lat = float(params['lat'])
+            long = float(params['long'])
+            radius = float(params.get('radius', self.default_radius))
+            limit = int(params.get('limit', self.default_limit))
+        except (KeyError, ValueError):
+            raise ParseError('lat and long are required, lat, long and radius must be numbers and limit an integer')
+        if not -90 <= lat <= 90 or not -180 <= long <= 180:
+            raise ParseError('lat or long out of range')
+        return lat, long, min(max(radius, 0.0), self.max_radius), min(max(limit, 1), self.max_limit)
+
+    @staticmethod
+    def get_distances(lat, long, radius):
+        """
+        Returns [(distance, restaurant_id)] of every restaurant within the radius sorted by distance,
+        only the rows of the geohash cells covering the bounding box are read
+        """
+        min_lat, max_lat, min_long, max_long = bounding_box(lat, long, radius)
+        cells = Q()
+        for cell in covering_cells(min_lat, max_lat, min_long, max_long):
+            cells |= Q(geohash__startswith=cell)
+        in_box = Q(lat__gte=min_lat, lat__lte=max_lat)
+        if max_long - min_long < 360:
+            # boxes crossing the antimeridian wrap around to the other side
+            if min_long < -180:
+                in_box &= Q(long__gte=min_long + 360) | Q(long__lte=max_long)
+            elif max_long > 180:
+                in_box &= Q(long__gte=min_long) | Q(long__lte=max_long - 360)
+            else:
+                in_box &= Q(long__gte=min_long, long__lte=max_long)
+        candidates = Restaurant.objects.exclude(geohash='').filter(cells, in_box).values_list('id', 'lat', 'long')
+        distances = [
+            (haversine_km(lat, long, restaurant_lat, restaurant_long), restaurant_id)
+            for restaurant_id, restaurant_lat, restaurant_long in candidates
+        ]
+        return sorted(distance for distance in distances if distance[0] <= radius)
+
+    def get(self, request):
+        lat, long, radius, limit = self.get_params()
+        distances = self.get_distances(lat, long, radius)
+        distance_by_id = {restaurant_id: distance for distance, restaurant_id in distances[:self.max_limit]}
+
+        restaurant_ids = [restaurant_id for distance, restaurant_id in distances[:limit]]
+        restaurants = RestaurantSerializer.setup_eager_loading(Restaurant.objects.filter(pk__in=restaurant_ids))
+        restaurants = sorted(restaurants, key=lambda restaurant: distance_by_id[restaurant.pk])
+        offers = Offer.objects.filter(
+            restaurant_id__in=distance_by_id, approval_status=True
+        ).select_related('restaurant__category', 'rating_aggregate')
+        offers = sorted(offers, key=lambda offer: (distance_by_id[offer.restaurant_id], offer.pk))[:limit]
+
+        context = self.get_serializer_context()
+        restaurants_data = RestaurantSerializer(restaurants, many=True, context=context).data
+        offers_data = OfferSerializer(offers, many=True, context=context).data
+        for data, obj in zip(restaurants_data, restaurants):
+            data['distance'] = round(distance_by_id[obj.pk], 3)
+        for data, obj in zip(offers_data, offers):
+            data['distance'] = round(distance_by_id[obj.restaurant_id], 3)
+        return Response({'restaurants': restaurants_data, 'offers': offers_data})
 
-    queryset = Review.objects.all().select_related('restaurant').order_by('restaurant', 'rating_overall').distinct('restaurant')[:4]
-     
 
 class NewRestaurantView(GenericAPIView):
     serializer_class = RestaurantSerializer
@@ -101,12 +216,31 @@ class RestaurantImageUploadView(APIView):
         return Response('Ok')
 
 
-class RestaurantGetUpdateDeleteView(GenericAPIView):
+class RestaurantGetUpdateDeleteView(SparseFieldsViewMixin, ConditionalGetMixin, GenericAPIView):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
     permission_classes = [
         IsUserOrReadOnly,
     ]
+    # saving a menu image or the category also touches modified
+    modified_fields = ('modified', 'rating_aggregate__updated_at')
+
+    def get_queryset(self):
+        return self.setup_eager_loading(super().get_queryset())
+
+    def get_validators(self):
+        last_modified, values = super().get_validators()
+        if 'reviews' in (self.get_selected_fields() or []):
+            # expanded reviews change with their own timestamps
+            reviews = Review.objects.filter(restaurant_id=self.kwargs.get('pk'), is_active=True).aggregate(
+                count=Count('pk'), modified=Max('updated_at')
+            )
+            values.append([reviews['count'], reviews['modified']])
+            last_modified = max(filter(None, [last_modified, reviews['modified']]), default=None)
+        return last_modified, values
+
+    def get_validator_queryset(self):
+        return Restaurant.objects.filter(pk=self.kwargs.get('pk'))
 
     def get(self, request, **kwargs):
         restaurant = self.get_object()
@@ -126,40 +260,52 @@ class RestaurantGetUpdateDeleteView(GenericAPIView):
         return Response('Deleted', status.HTTP_200_OK)
 
 
-class ListCategoryRestaurantsView(GetObjectMixin, ListAPIView):
+class ListCategoryRestaurantsView(SparseFieldsViewMixin, GetObjectMixin, ListAPIView):
     serializer_class = RestaurantSerializer
     queryset = Restaurant.objects.all()
 
+    def get_queryset(self):
+        return self.setup_eager_loading(super().get_queryset())
+
     def filter_queryset(self, queryset):
         category = self.get_object_by_model(Category, pk=self.kwargs.get('pk'))
         return queryset.filter(category=category)
 
 
-class AllOffers(ListAPIView):
+class AllOffers(OfferConditionalGetMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OfferSerializer
+    pagination_class = KeysetPagination
+    ordering = ('restaurant__created', 'id')
 
     def get_queryset(self):
-        return Offer.objects.filter(approval_status=True,
-                                    is_redeemable=True,
-                                    restaurant__is_featured=False).order_by('restaurant__created')
+        return self.setup_eager_loading(
+            Offer.objects.filter(approval_status=True, is_redeemable=True, restaurant__is_featured=False)
+        )
 
 
-class NonFeaturedOffers(ListAPIView):
+class NonFeaturedOffers(OfferConditionalGetMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OfferSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', 'id')
 
     def get_queryset(self):
-        return Offer.objects.filter(approval_status=True, is_redeemable=True, restaurant__is_featured=False)
+        return self.setup_eager_loading(
+            Offer.objects.filter(approval_status=True, is_redeemable=True, restaurant__is_featured=False)
+        )
 
 
-class FeaturedOffers(ListAPIView):
+class FeaturedOffers(OfferConditionalGetMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OfferSerializer
+    pagination_class = KeysetPagination
+    ordering = ('created_at', 'id')
 
     def get_queryset(self):
-        return Offer.objects.filter(approval_status=True,
-                                    is_redeemable=True, restaurant__is_featured=True).order_by('created_at')
+        return self.setup_eager_loading(
+            Offer.objects.filter(approval_status=True, is_redeemable=True, restaurant__is_featured=True)
+        )
 
 
 class AllTopOffers(GenericAPIView):
@@ -169,38 +315,46 @@ class AllTopOffers(GenericAPIView):
 
     def get(self, request):
         offer_list = []
-        for review in self.get_queryset():
+        for review in OfferSerializer.setup_eager_loading(self.get_queryset(), prefix='offer__'):
             offer_list.append(review.offer)
-        return Response(self.serializer_class(offer_list, many=True).data)
+        return Response(self.get_serializer(offer_list, many=True).data)
 
 
-class BumperOffers(ListAPIView):
+class BumperOffers(OfferConditionalGetMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OfferSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', 'id')
 
     def get_queryset(self):
-        return Offer.objects.filter(approval_status=True, is_bumper=True)
+        return self.setup_eager_loading(Offer.objects.filter(approval_status=True, is_bumper=True))
 
 
-class OfferById(GenericAPIView):
+class OfferById(OfferConditionalGetMixin, GenericAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OfferSerializer
     queryset = Offer.objects.all()
 
+    def get_queryset(self):
+        return self.setup_eager_loading(self.queryset.filter(id=self.kwargs.get('id'), approval_status=True))
+
     def get(self, request, **kwargs):
-        offer = self.queryset.filter(id=kwargs.get('id'), approval_status=True)
-        serializer = self.get_serializer(offer, many=True)
+        serializer = self.get_serializer(self.get_queryset(), many=True)
         return Response(serializer.data, status.HTTP_200_OK)
 
 
-class OfferByRestaurant(GenericAPIView):
+class OfferByRestaurant(OfferConditionalGetMixin, GenericAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Offer.objects.all()
     serializer_class = OfferSerializer
 
+    def get_queryset(self):
+        return self.setup_eager_loading(
+            self.queryset.filter(restaurant_id=self.kwargs.get('restaurant_id'), approval_status=True)
+        )
+
     def get(self, request, **kwargs):
-        offer = self.queryset.filter(restaurant_id=kwargs.get('restaurant_id'), approval_status=True)
-        serializer = self.get_serializer(offer, many=True)
+        serializer = self.get_serializer(self.get_queryset(), many=True)
         return Response(serializer.data, status.HTTP_200_OK)
 
     def post(self, request, **kwargs):
@@ -217,6 +371,27 @@ class OfferByRestaurant(GenericAPIView):
         return Response(offer_serializer.data, status.HTTP_201_CREATED)
 
 
+class IssueCouponsView(GetObjectMixin, GenericAPIView):
+    """
+    Issues count coupons of an offer with one bulk insert and returns their codes, admins only
+    """
+    permission_classes = [IsAdminUser]
+    serializer_class = IssueCouponsSerializer
+
+    def post(self, request, **kwargs):
+        offer = self.get_object_by_model(Offer, kwargs.get('id'))
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        coupons = Coupon.issue(offer, **serializer.validated_data)
+        return Response(
+            {
+                'offer_id': offer.id,
+                'codes': [coupon.code for coupon in coupons],
+            },
+            status.HTTP_201_CREATED
+        )
+
+
 @require_POST
 def coupon_apply(request):
     now = _time.timezone.now()
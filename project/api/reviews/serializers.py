@@ -1,6 +1,11 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
 
+from project.api.sparse import SparseFieldsMixin
+from project.feed.images import read_uploads, schedule, variant_urls
 from project.feed.models import Review
+from project.feed.models.rating_aggregate import record_review
 from project.feed.models.reveiw_images import ReviewImage
 from project.feed.models.tag import Tag
 
@@ -12,12 +17,33 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['name', ]
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class TagMentionsSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Tag
+        fields = ['name', 'key', 'mentions']
+
+
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+
+    PROFILES = {
+        'card': ['id', 'user', 'restaurant_name', 'comment', 'updated_at', 'rating_overall'],
+        'detail': None,
+    }
+    FIELD_SOURCES = {
+        'user': ['user__first_name', 'user__last_name'],
+        'restaurant_name': ['restaurant__name'],
+        'offer_name': ['offer__name'],
+        'review_images': ['reviewimage'],
+        'review_image_variants': ['reviewimage'],
+        'restaurant_logo': ['restaurant__logo_image'],
+    }
 
     user = serializers.SerializerMethodField()
     restaurant_name = serializers.SerializerMethodField()
     offer_name = serializers.SerializerMethodField()
     review_images = serializers.SerializerMethodField()
+    review_image_variants = serializers.SerializerMethodField()
     restaurant_logo = serializers.SerializerMethodField()
     tags = serializers.SerializerMethodField()
     
@@ -37,12 +63,30 @@ class ReviewSerializer(serializers.ModelSerializer):
             'rating_overall',
             'tags',
             'review_images',
+            'review_image_variants',
             'restaurant_logo'
         ]
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, prefix='', fields=None, sources=()):
+        """
+        Attaches user, restaurant, offer and images to a queryset of reviews, or of objects
+        pointing to reviews through prefix (e.g. 'review__'), so a list of reviews is serialized
+        without any per-row queries. Reviews serialized with some fields only load what they read.
+        """
+        if fields is None or prefix:
+            queryset = queryset.select_related(f'{prefix}user', f'{prefix}restaurant', f'{prefix}offer')
+            fields = cls.default_fields() if fields is None else fields
+        else:
+            queryset = cls.shrink_queryset(queryset, fields, sources)
+        if 'review_images' in fields or 'review_image_variants' in fields:
+            queryset = queryset.prefetch_related(Prefetch(f'{prefix}reviewimage_set', to_attr='_review_images'))
+        return queryset
+
+    @transaction.atomic
     def create(self, validated_data):
-        post_data = self.context.get('request').data
         post_data = validated_data
+        user = self.context.get('request').user
         rating_list = [
             int(post_data.get('rating_taste')),
             int(post_data.get('rating_ambiance')),
@@ -51,45 +95,44 @@ class ReviewSerializer(serializers.ModelSerializer):
         ]
         rating_overall = sum(rating_list) / len(rating_list)
 
-        old_reviews = Review.objects.filter(
-            user=self.context.get('request').user,
-            restaurant=post_data.get('restaurant'),
-            offer=post_data.get('offer'),
-        )
-
-        if old_reviews:
-            for review in old_reviews:
-                review.is_active = False
-                review.save()
-
-        review = Review.objects.create(
-            user=self.context.get('request').user,
-            restaurant=post_data.get('restaurant'),
-            offer=post_data.get('offer'),
-            comment=post_data.get('comment'),
-            rating_taste=int(post_data.get('rating_taste')),
-            rating_ambiance=int(post_data.get('rating_ambiance')),
-            rating_quality=int(post_data.get('rating_quality')),
-            rating_money_value=int(post_data.get('rating_money_value')),
-            rating_overall=rating_overall,
-            tags=post_data.get('tags')
-        )
-        image_list = []
-        if post_data.get('image_1'):
-            image_list.append(post_data.get('image_1'))
-        if post_data.get('image_2'):
-            image_list.append(post_data.get('image_2'))
-        if post_data.get('image_3'):
-            image_list.append(post_data.get('image_3'))
-        if post_data.get('image_4'):
-            image_list.append(post_data.get('image_4'))
-        if post_data.get('image_5'):
-            image_list.append(post_data.get('image_5'))
-        for image in image_list:
-            ReviewImage.objects.create(
-                image_url=image,
-                review=review
-            )
+        # the partial unique index on active reviews rejects the insert of a concurrent post,
+        # the second attempt then deactivates the review that request created
+        for attempt in range(2):
+            old_reviews = Review.deactivate_active(user, post_data.get('restaurant'), post_data.get('offer'))
+            for old_review in old_reviews:
+                record_review(old_review, sign=-1)
+            Tag.remove_reviews([old_review.pk for old_review in old_reviews])
+            try:
+                with transaction.atomic():
+                    review = Review.objects.create(
+                        user=user,
+                        restaurant=post_data.get('restaurant'),
+                        offer=post_data.get('offer'),
+                        comment=post_data.get('comment'),
+                        rating_taste=int(post_data.get('rating_taste')),
+                        rating_ambiance=int(post_data.get('rating_ambiance')),
+                        rating_quality=int(post_data.get('rating_quality')),
+                        rating_money_value=int(post_data.get('rating_money_value')),
+                        rating_overall=rating_overall,
+                        tags=post_data.get('tags')
+                    )
+                break
+            except IntegrityError:
+                if attempt:
+                    raise
+        record_review(review)
+        Tag.record_review(review)
+        image_list = [
+            post_data.get(f'image_{number}')
+            for number in range(1, 6)
+            if post_data.get(f'image_{number}')
+        ]
+        # bulk_create sends no signals, the pipeline is driven by hand
+        review_images = [ReviewImage(image_url=image, review=review) for image in image_list]
+        jobs = [read_uploads(review_image) for review_image in review_images]
+        ReviewImage.objects.bulk_create(review_images)
+        for review_image, image_jobs in zip(review_images, jobs):
+            schedule(review_image, image_jobs)
         return review
 
     
@@ -106,15 +149,23 @@ class ReviewSerializer(serializers.ModelSerializer):
         return review.restaurant.name
     
     def get_restaurant_logo(self, review):
-        return review.restaurant.logo_image.url
+        return review.restaurant.logo_image.url if review.restaurant.logo_image else ''
     
+    @staticmethod
+    def get_review_image_objects(review):
+        if not hasattr(review, '_review_images'):
+            review._review_images = list(ReviewImage.objects.filter(review__pk=review.pk))
+        return review._review_images
+
     def get_review_images(self, review):
         reveiw_images = []
-        objs = ReviewImage.objects.filter(review__pk=review.pk)
-        for image in objs:
+        for image in self.get_review_image_objects(review):
             reveiw_images.append(image.image_url.url)
         return reveiw_images
 
+    def get_review_image_variants(self, review):
+        return [variant_urls(image, 'image_url') for image in self.get_review_image_objects(review)]
+
 
 class ReviewImageSerializer(serializers.ModelSerializer):
 
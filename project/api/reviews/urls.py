@@ -3,7 +3,8 @@ from django.urls import path
 from project.api.reviews.views import (
     NewReviewView, RestaurantReviewsView, UserReviewsView, ReviewGetUpdateDeleteView,
     LikeUnlikeReviewView, LikedReviewsView, CommentedReviewsView, GetReviewByRestaurantView, 
-    CreateReview, AddReviewImage, SearchTagsView, TopReviewsView, PopularReviewsView
+    CreateReview, AddReviewImage, SearchTagsView, TopReviewsView, PopularReviewsView,
+    RestaurantTagsView, TagReviewsView
 )
 
 app_name = 'reviews'
@@ -11,11 +12,13 @@ app_name = 'reviews'
 urlpatterns = [
     # path('restaurant/<int:restaurant_id>', GetReviewByRestaurantView.as_view(), name='get_reviews_by_restaurant'),
     path('post', CreateReview.as_view(), name='create_review'),
-    path('post/image', AddReviewImage.as_view(), name='create_review'),
+    path('post/image', AddReviewImage.as_view(), name='add_review_image'),
     path('search/tag', SearchTagsView.as_view(), name='search_tags'),
     path('top', TopReviewsView.as_view(), name='top_reviews'),
     
     path('restaurant/<int:pk>', RestaurantReviewsView.as_view(), name='restaurant_reviews'),
+    path('restaurant/<int:pk>/tags', RestaurantTagsView.as_view(), name='restaurant_tags'),
+    path('restaurant/<int:pk>/tag/<str:key>', TagReviewsView.as_view(), name='tag_reviews'),
     path('like/<int:review_id>', LikeUnlikeReviewView.as_view(), name='like_unlike_review'),
     path('likes/', LikedReviewsView.as_view(), name='liked_reviews'),
     path('popular/', PopularReviewsView.as_view(), name='popular_reviews'),
@@ -1,17 +1,20 @@
 from django.contrib.auth.models import User
 from django.http import Http404
 from rest_framework import status
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.generics import GenericAPIView, ListAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from project.api.base import GetObjectMixin
+from project.api.activity import ActivityView
+from project.api.base import GetObjectMixin, LimitOffsetMixin
+from project.api.pagination import KeysetPagination
 from project.api.permissions import IsUserOrReadOnly
-from project.api.reviews.serializers import ReviewSerializer, TagSerializer
+from project.api.reviews.serializers import ReviewSerializer, TagMentionsSerializer, TagSerializer
+from project.api.sparse import SparseFieldsViewMixin
 from project.feed.models import Restaurant, Review, ReviewLike, Offer
-from project.feed.models.tag import Tag
-from django.db.models import Count
+from project.feed.models.tag import ReviewTag, Tag, normalize_tag
 
 
 class TopReviewsView(GenericAPIView):
@@ -19,7 +22,9 @@ class TopReviewsView(GenericAPIView):
     queryset = Review.objects.all()
 
     def get(self, request):
-        serializer = self.get_serializer(self.queryset.filter().order_by('-rating_overall'), many=True)
+        serializer = self.get_serializer(
+            ReviewSerializer.setup_eager_loading(self.queryset.filter().order_by('-rating_overall')), many=True
+        )
         return Response(serializer.data, status.HTTP_200_OK)
 
 
@@ -32,11 +37,12 @@ class SearchTagsView(GenericAPIView):
             restaurant = Restaurant.objects.get(pk=request.data.get('restaurant_id'))
             if request.data.get('tag'):
                 serializer = self.get_serializer(Tag.objects.filter(
-                    name__contains=request.data.get('tag'), restaurant=restaurant, is_active=True),
-                    many=True
-                )
+                    key__startswith=normalize_tag(request.data.get('tag')), restaurant=restaurant, is_active=True
+                ).order_by('-mentions', 'id'), many=True)
             else:
-                 serializer = self.get_serializer(Tag.objects.filter(restaurant=restaurant, is_active=True), many=True)
+                 serializer = self.get_serializer(
+                     Tag.objects.filter(restaurant=restaurant, is_active=True).order_by('-mentions', 'id'), many=True
+                 )
             if serializer.data:
                 return Response(serializer.data, status.HTTP_200_OK)
             else:
@@ -45,6 +51,44 @@ class SearchTagsView(GenericAPIView):
             return Response('restaurant not found')
 
 
+class RestaurantTagsView(GetObjectMixin, LimitOffsetMixin, GenericAPIView):
+    """
+    The most mentioned tags of a restaurant, paginated with ?limit=&offset=
+    """
+    serializer_class = TagMentionsSerializer
+    queryset = Tag.objects.filter(is_active=True, mentions__gt=0)
+    default_limit = 10
+
+    def get(self, request, pk):
+        restaurant = self.get_object_by_model(Restaurant, pk=pk)
+        tags = self.slice_queryset(self.queryset.filter(restaurant=restaurant).order_by('-mentions', 'id'))
+        return Response(self.get_serializer(tags, many=True).data, status.HTTP_200_OK)
+
+
+class TagReviewsView(SparseFieldsViewMixin, ListAPIView):
+    """
+    The active reviews of a restaurant mentioning a tag, newest first, paged by KeysetPagination
+    over the ReviewTag index
+    """
+    serializer_class = ReviewSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', 'review_id')
+
+    def get_queryset(self):
+        try:
+            tag = Tag.objects.get(restaurant_id=self.kwargs.get('pk'), key=normalize_tag(self.kwargs.get('key')))
+        except Tag.DoesNotExist:
+            raise NotFound('Tag not found')
+        return ReviewSerializer.setup_eager_loading(
+            ReviewTag.objects.filter(tag=tag), prefix='review__', fields=self.get_selected_fields()
+        )
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        reviews = [review_tag.review for review_tag in page]
+        return self.get_paginated_response(self.get_serializer(reviews, many=True).data)
+
+
 class GetReviewByRestaurantView(GenericAPIView):
 
     serializer_class = ReviewSerializer
@@ -63,10 +107,15 @@ class CreateReview(GenericAPIView):
 
     def post(self, request):
         data = request.data.dict()
-        restaurant = Restaurant.objects.get(pk=int(data.pop('restaurant_id')))
-        offer = Offer.objects.get(pk=int(data.pop('offer_id')))
+        try:
+            offer = Offer.objects.select_related('restaurant').get(
+                pk=int(data.pop('offer_id')),
+                restaurant_id=int(data.pop('restaurant_id')),
+            )
+        except Offer.DoesNotExist:
+            raise NotFound('Offer not found for this restaurant')
 
-        data['restaurant'] = restaurant
+        data['restaurant'] = offer.restaurant
         data['offer'] = offer
         serializer = self.get_serializer(
             data=data,
@@ -105,21 +154,23 @@ class NewReviewView(GetObjectMixin, GenericAPIView):
         return Response(ReviewSerializer(new_review).data, status.HTTP_201_CREATED)
 
 
-class RestaurantReviewsView(GetObjectMixin, ListAPIView):
+class RestaurantReviewsView(SparseFieldsViewMixin, GetObjectMixin, ListAPIView):
     serializer_class = ReviewSerializer
     queryset = Review.objects.all()
+    pagination_class = KeysetPagination
+    ordering = ('-created_at', 'id')
+
+    def get_queryset(self):
+        return self.setup_eager_loading(super().get_queryset())
 
     def filter_queryset(self, queryset):
         restaurant = self.get_object_by_model(Restaurant, pk=self.kwargs.get('pk'))
-        return queryset.filter(restaurant=restaurant).order_by('-created_at')
+        return queryset.filter(restaurant=restaurant)
 
 
-class UserReviewsView(ListAPIView):
-    permission_classes = [IsAuthenticated]
-    serializer_class = ReviewSerializer
-
-    def get_queryset(self):
-        return Review.objects.filter(user__username=self.request.user.username)
+class UserReviewsView(ActivityView):
+    activity_types = ['review']
+    flat = True
 
 
 class ReviewGetUpdateDeleteView(GenericAPIView):
@@ -147,14 +198,15 @@ class ReviewGetUpdateDeleteView(GenericAPIView):
         return Response('Deleted')
 
 
-class LikeUnlikeReviewView(GetObjectMixin, APIView):
+class LikeUnlikeReviewView(APIView):
     permission_classes = [
         IsAuthenticated,
     ]
 
     def post(self, request, review_id):
-        review = self.get_object_by_model(Review, review_id)
-        obj, created = ReviewLike.objects.get_or_create(user=request.user, review=review)
+        created, exists = ReviewLike.like(request.user, review_id)
+        if not exists:
+            raise NotFound(f'Object not found with params {review_id} on model Review')
         if created:
             return Response(
                 {
@@ -171,16 +223,17 @@ class LikeUnlikeReviewView(GetObjectMixin, APIView):
             )
 
     def delete(self, request, review_id):
-        review = self.get_object_by_model(Review, review_id)
-        try:
-            ReviewLike.objects.get(user=request.user, review=review).delete()
+        deleted, exists = ReviewLike.unlike(request.user, review_id)
+        if not exists:
+            raise NotFound(f'Object not found with params {review_id} on model Review')
+        if deleted:
             return Response(
                 {
                     'status_code': 200,
                     'message': 'Review unliked!'
                 }
             )
-        except ReviewLike.DoesNotExist:
+        else:
             return Response(
                 {
                     'status_code': 422,
@@ -189,36 +242,38 @@ class LikeUnlikeReviewView(GetObjectMixin, APIView):
             )
 
 
-class PopularReviewsView(GenericAPIView):
+class PopularReviewsView(SparseFieldsViewMixin, LimitOffsetMixin, GenericAPIView):
+    """
+    Active reviews ranked by ?mode=popular (default, most likes, the shards of viral reviews
+    only count once folded) or ?mode=trending
+    (time decayed likes, see Review.TRENDING_HALF_LIFE), paginated with ?limit=&offset=
+    """
     permission_classes = [
         IsAuthenticated,
     ]
+    serializer_class = ReviewSerializer
+    queryset = Review.objects.filter(is_active=True)
 
-    def get(self, request):
-        reviews_like = ReviewLike.objects.values('review__id').annotate(count=Count('review_id')).order_by('-count')
-        reviews = []
-        for obj in reviews_like:
-            review = Review.objects.get(pk=obj.get('review__id'))
-            if review.is_active:
-                reviews.append(review)
-        return Response(ReviewSerializer(reviews, many=True).data, status.HTTP_200_OK)
-
-
-class LikedReviewsView(GetObjectMixin, APIView):
-    permission_classes = [
-        IsAuthenticated,
-    ]
+    def get_queryset(self):
+        mode = self.request.query_params.get('mode', 'popular')
+        if mode == 'popular':
+            queryset = self.queryset.filter(like_count__gt=0).order_by('-like_count', '-id')
+        elif mode == 'trending':
+            queryset = self.queryset.filter(trending_score__isnull=False).order_by('-trending_score', '-id')
+        else:
+            raise ParseError('mode must be popular or trending')
+        return self.setup_eager_loading(queryset)
 
     def get(self, request):
-        reviews = Review.objects.filter(likes__user=request.user)
-        return Response(ReviewSerializer(reviews, many=True).data, status.HTTP_200_OK)
+        reviews = self.slice_queryset(self.get_queryset())
+        return Response(self.get_serializer(reviews, many=True).data, status.HTTP_200_OK)
 
 
-class CommentedReviewsView(GetObjectMixin, APIView):
-    permission_classes = [
-        IsAuthenticated,
-    ]
+class LikedReviewsView(ActivityView):
+    activity_types = ['review_like']
+    flat = True
 
-    def get(self, request):
-        reviews = Review.objects.filter(comments__user=request.user)
-        return Response(ReviewSerializer(reviews, many=True).data, status.HTTP_200_OK)
+
+class CommentedReviewsView(ActivityView):
+    activity_types = ['commented_review']
+    flat = True
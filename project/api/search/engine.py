@@ -0,0 +1,96 @@
+import hashlib
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.core.cache import caches
+from django.db.models import F
+from rest_framework.exceptions import ParseError
+
+from project.feed.models import Comment, Offer, Restaurant
+from project.feed.search import SEARCH_CONFIG
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+# model and field shown in the highlight of every searchable type
+SEARCH_TARGETS = {
+    'restaurants': (Restaurant, 'name'),
+    'offers': (Offer, 'name'),
+    'comments': (Comment, 'content'),
+}
+
+
+def normalize_query(text):
+    """
+    This function returns the lowercase words of a search string,
+    both the cache key and the tsquery are built from them
+    """
+
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def get_page_params(data):
+    """
+    This function reads page (1 based) and page_size out of query params or request data
+    """
+
+    try:
+        page = int(data.get('page', 1))
+        page_size = int(data.get('page_size', PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ParseError('page and page_size must be integers')
+    return max(page, 1), min(max(page_size, 1), MAX_PAGE_SIZE)
+
+
+def search(target, text, page=1, page_size=PAGE_SIZE):
+    """
+    Returns one page of matches of the GIN indexed search vector of a type ranked by relevance:
+    {'ids': [...], 'highlights': {id: highlighted text}, 'has_next': bool}.
+    Pages are cached per normalized query in the LRU/TTL 'search' cache.
+    """
+
+    terms = normalize_query(text)
+    if not terms:
+        return {'ids': [], 'highlights': {}, 'has_next': False}
+    key = hashlib.md5(f'{target}|{" ".join(terms)}|{page}|{page_size}'.encode()).hexdigest()
+    cache = caches['search']
+    result = cache.get(key)
+    if result is None:
+        model, field = SEARCH_TARGETS[target]
+        # every word is matched as a prefix so results show up while typing
+        query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+        offset = (page - 1) * page_size
+        rows = list(model.objects.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query),
+            highlight=SearchHeadline(field, query, config=SEARCH_CONFIG, start_sel='<b>', stop_sel='</b>'),
+        ).order_by('-rank', 'pk').values_list('pk', 'highlight')[offset:offset + page_size + 1])
+        result = {
+            'ids': [pk for pk, highlight in rows[:page_size]],
+            'highlights': dict(rows[:page_size]),
+            'has_next': len(rows) > page_size,
+        }
+        cache.set(key, result)
+    return result
+
+
+def load(queryset, result):
+    """
+    This function returns the objects of a search result in ranking order, with their highlight attached
+    """
+
+    objects = {obj.pk: obj for obj in queryset.filter(pk__in=result['ids'])}
+    ordered = [objects[pk] for pk in result['ids'] if pk in objects]
+    for obj in ordered:
+        obj.highlight = result['highlights'][obj.pk]
+    return ordered
+
+
+def serialize(serializer_class, objects, **kwargs):
+    """
+    This function serializes loaded search results adding their highlight to every item
+    """
+
+    data = serializer_class(objects, many=True, **kwargs).data
+    for item, obj in zip(data, objects):
+        item['highlight'] = obj.highlight
+    return data
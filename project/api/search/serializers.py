@@ -9,3 +9,23 @@ class SearchSerializer(serializers.Serializer):
     search_string = serializers.CharField(
         allow_blank=False
     )
+    page = serializers.IntegerField(
+        required=False,
+        min_value=1
+    )
+    page_size = serializers.IntegerField(
+        required=False,
+        min_value=1
+    )
+
+
+class SuggestSerializer(serializers.Serializer):
+
+    q = serializers.CharField(
+        allow_blank=True,
+        trim_whitespace=False
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1
+    )
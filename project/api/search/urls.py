@@ -1,8 +1,9 @@
 from django.urls import path
-from project.api.search.views import SearchAllView
+from project.api.search.views import SearchAllView, SuggestView
 
 app_name = 'search'
 
 urlpatterns = [
-    path('', SearchAllView.as_view(), name='search_all' )
+    path('', SearchAllView.as_view(), name='search_all' ),
+    path('suggest', SuggestView.as_view(), name='suggest'),
 ]
@@ -6,7 +6,9 @@ from rest_framework.views import APIView
 from project.api.comments.serializers import CommentSerializer
 from project.api.me.serializers import UserSerializer
 from project.api.restaurant.serializers import RestaurantSerializer
-from project.api.search.serializers import SearchSerializer
+from project.api.search import engine
+from project.api.search.serializers import SearchSerializer, SuggestSerializer
+from project.api.search.suggest import DEFAULT_LIMIT, MAX_LIMIT, suggest_index
 from project.feed.models import Restaurant, Comment
 
 User = get_user_model()
@@ -20,11 +22,13 @@ class SearchAllView(APIView):
         serializer.is_valid(raise_exception=True)
         search_type = serializer.validated_data.get('type')
         search_string = serializer.validated_data.get('search_string')
+        page, page_size = engine.get_page_params(serializer.validated_data)
         if search_type == 'restaurants':
-            queryset = Restaurant.objects.filter(name__icontains=search_string)
-            return Response(RestaurantSerializer(queryset, many=True).data)
+            result = engine.search('restaurants', search_string, page, page_size)
+            queryset = RestaurantSerializer.setup_eager_loading(Restaurant.objects.all())
+            return Response(engine.serialize(RestaurantSerializer, engine.load(queryset, result)))
         elif search_type == 'users':
-            queryset = User.objects.all()
+            queryset = User.objects.select_related('profile')
             queryset = queryset.filter(
                 Q(username__contains=search_string) |
                 Q(email__contains=search_string) |
@@ -33,5 +37,15 @@ class SearchAllView(APIView):
             )
             return Response(UserSerializer(queryset, many=True).data)
         else:
-            queryset = Comment.objects.filter(content__icontains=search_string)
-            return Response(CommentSerializer(queryset, many=True).data)
+            result = engine.search('comments', search_string, page, page_size)
+            return Response(engine.serialize(CommentSerializer, engine.load(Comment.objects.all(), result)))
+
+
+class SuggestView(APIView):
+    authentication_classes = []
+
+    def get(self, request, **kwargs):
+        serializer = SuggestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        limit = min(serializer.validated_data.get('limit', DEFAULT_LIMIT), MAX_LIMIT)
+        return Response(suggest_index.suggest(serializer.validated_data.get('q'), limit))
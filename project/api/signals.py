@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from project.api.auth.tokens import revoke_tokens
+from project.api.categories import listing as category_listing
+from project.api.home import feed as home_feed
+from project.api.search.suggest import suggest_index
+from project.feed.models import Category, Offer, Restaurant, Review
+from project.feed.models.admin_ad import AdminAd
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=Category)
+def update_suggest_index(sender, **kwargs):
+    instance = kwargs.get('instance')
+    suggest_index.update(sender.__name__.lower(), instance.pk, instance.name)
+
+
+@receiver(post_save, sender=Offer)
+def update_offer_suggest_index(**kwargs):
+    offer = kwargs.get('instance')
+    # only approved offers are suggested
+    suggest_index.update('offer', offer.pk, offer.name if offer.approval_status else None)
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=Offer)
+@receiver(post_delete, sender=Category)
+def remove_from_suggest_index(sender, **kwargs):
+    suggest_index.update(sender.__name__.lower(), kwargs.get('instance').pk, None)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=Offer)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=AdminAd)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_delete, sender=Offer)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=AdminAd)
+def invalidate_home_sections(sender, **kwargs):
+    home_feed.invalidate(sender)
+
+
+@receiver(pre_save, sender=Restaurant)
+def remember_restaurant_category(**kwargs):
+    instance = kwargs.get('instance')
+    instance._saved_category_id = None if instance._state.adding else Restaurant.objects.filter(
+        pk=instance.pk
+    ).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Restaurant)
+def invalidate_category_listing_on_move(**kwargs):
+    instance = kwargs.get('instance')
+    if kwargs.get('created') or instance.category_id != getattr(instance, '_saved_category_id', None):
+        category_listing.invalidate()
+
+
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_listing(**kwargs):
+    category_listing.invalidate()
+
+
+@receiver(post_save, sender=User)
+def revoke_inactive_user_tokens(**kwargs):
+    # token authentication does not read the user, deactivating it has to refuse its tokens
+    instance = kwargs.get('instance')
+    if not kwargs.get('created') and not instance.is_active:
+        revoke_tokens(instance)
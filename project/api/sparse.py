@@ -0,0 +1,121 @@
+from rest_framework.exceptions import ParseError
+
+
+def split_param(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class SparseFieldsMixin(object):
+    """
+    Serializer mixin picking the fields of a response: ?fields=a,b for exactly those, ?profile=card
+    for one of PROFILES, ?expand=a,b to add fields of EXPANDABLE_FIELDS, which are left out otherwise.
+    Deselected fields are removed from the serializer before it runs, so their SerializerMethodFields
+    never execute, and shrink_queryset loads only the columns and relations the selected fields read.
+    """
+    # name: fields of a named profile, None for the default fields
+    PROFILES = {}
+    # fields only serialized when asked for
+    EXPANDABLE_FIELDS = []
+    # model fields the non model fields read, as ORM paths (restaurant__category);
+    # a field not listed reads the model field of the same name
+    FIELD_SOURCES = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            fields = self.default_fields()
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+
+    @classmethod
+    def default_fields(cls):
+        return [name for name in cls.Meta.fields if name not in cls.EXPANDABLE_FIELDS]
+
+    @classmethod
+    def fields_for(cls, request):
+        """
+        Returns the fields selected by the query params of a request, in the order of Meta.fields
+        """
+        params = request.query_params
+        profile = params.get('profile')
+        if params.get('fields'):
+            fields = split_param(params.get('fields'))
+        elif profile:
+            if profile not in cls.PROFILES:
+                raise ParseError(f'profile must be one of {", ".join(cls.PROFILES)}')
+            fields = cls.PROFILES[profile] or cls.default_fields()
+        else:
+            fields = cls.default_fields()
+        fields = set(fields) | set(split_param(params.get('expand')))
+        unknown = fields - set(cls.Meta.fields)
+        if unknown:
+            raise ParseError(f'Unknown fields {", ".join(sorted(unknown))}')
+        return [name for name in cls.Meta.fields if name in fields]
+
+    @classmethod
+    def shrink_queryset(cls, queryset, fields, sources=()):
+        """
+        Restricts a queryset to the columns the fields and sources (e.g. ordering fields) read
+        and joins the relations they follow. Relations to many rows are left to the prefetches.
+        """
+        # relation path ('' for the model itself): its columns read, None for the whole row
+        columns = {'': {cls.Meta.model._meta.pk.name}}
+        sources = [source.lstrip('-') for source in sources]
+        sources += [source for name in fields for source in cls.FIELD_SOURCES.get(name, [name])]
+        for source in sources:
+            model, path = cls.Meta.model, ''
+            for name in source.split('__'):
+                field = model._meta.get_field(name)
+                if field.concrete and columns.get(path) is not None:
+                    columns[path].add(field.name)
+                # restaurant_id reads the column of the foreign key, not the row it points to
+                if name != field.name or not field.is_relation or field.one_to_many or field.many_to_many:
+                    break
+                path = f'{path}__{name}' if path else name
+                model = field.related_model
+                columns.setdefault(path, {model._meta.pk.name})
+            else:
+                if path:
+                    columns[path] = None
+        related = [path for path in columns if path]
+        if related:
+            # the shortest paths are implied by the longest ones
+            queryset = queryset.select_related(*sorted(
+                path for path in related if not any(other.startswith(f'{path}__') for other in related)
+            ))
+        only = []
+        for path, names in columns.items():
+            if names is None:
+                continue
+            # a relation followed further is a column read too
+            names = names | {other[len(path):].lstrip('_').split('__')[0] for other in related
+                             if other.startswith(f'{path}__' if path else '') and other != path}
+            only += [f'{path}__{name}' if path else name for name in names]
+        return queryset.only(*sorted(only))
+
+
+class SparseFieldsViewMixin(object):
+    """
+    View mixin handing the fields selected by the query params to the serializer of GET requests,
+    get_selected_fields also tells get_queryset what to load
+    """
+
+    def get_selected_fields(self):
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = self.get_serializer_class().fields_for(self.request)
+        return self._selected_fields
+
+    def setup_eager_loading(self, queryset):
+        """
+        Loads what the selected fields and the ordering of the view read
+        """
+        return self.get_serializer_class().setup_eager_loading(
+            queryset, fields=self.get_selected_fields(), sources=getattr(self, 'ordering', None) or ()
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_selected_fields())
+        return super().get_serializer(*args, **kwargs)
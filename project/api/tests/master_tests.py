@@ -4,6 +4,9 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from project.api.auth.tokens import revoked_at
+from project.api.queries import QUERY_BUDGETS, record_queries
+
 
 class MasterTestWrapper:
     class BasicMasterTests(APITestCase):
@@ -25,6 +28,8 @@ class MasterTestWrapper:
             self.refresh = RefreshToken.for_user(user)
             self.access_token = self.refresh.access_token
             self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+            # requests are measured with the revocation time of the user cached, as they run once warm
+            revoked_at(user.pk)
 
         def setUp(self):
             self.user = User.objects.create_user(
@@ -49,3 +54,19 @@ class MasterTestWrapper:
                         self.assertEquals(response.status_code, status.HTTP_401_UNAUTHORIZED)
                 except AttributeError:
                     raise Exception(f'No such method: {m}')
+
+    class QueryBudgetTests(BasicMasterTests):
+        def assertWithinQueryBudget(self, url_name, kwargs=None, method='get', data=None):
+            """
+            Requests an endpoint and fails if it runs more queries than its budget in QUERY_BUDGETS
+            """
+            budget = QUERY_BUDGETS[url_name]
+            with record_queries() as log:
+                response = getattr(self.client, method)(reverse(url_name, kwargs=kwargs), data)
+            self.assertLess(response.status_code, 400, f'{url_name} answered {response.status_code}')
+            duplicates = ''.join(f'\n  {count}x {shape}' for count, shape in log.duplicates())
+            self.assertLessEqual(
+                log.count, budget,
+                f'{url_name} ran {log.count} queries, its budget is {budget}, repeated shapes:{duplicates or " none"}'
+            )
+            return response
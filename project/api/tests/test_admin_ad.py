@@ -0,0 +1,101 @@
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from project.api.admin_ad.rotation import ad_rotator
+from project.api.tests.master_tests import MasterTestWrapper
+from project.feed.models.admin_ad import AdminAd
+
+
+class ServeAdTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:admin_ad:serve'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        tomorrow = timezone.now() + timedelta(days=1)
+        self.silver = AdminAd.objects.create(title='Silver', category=AdminAd.SILVER, expiry=tomorrow, is_active=True)
+        self.diamond = AdminAd.objects.create(
+            title='Diamond', category=AdminAd.DIAMOND, expiry=tomorrow, is_active=True
+        )
+        AdminAd.objects.create(title='Expired', expiry=timezone.now() - timedelta(days=1), is_active=True)
+        AdminAd.objects.create(title='Inactive', expiry=tomorrow, is_active=False)
+        ad_rotator.load()
+        ad_rotator.pending, ad_rotator.pending_events = {}, 0
+        ad_rotator.failed_flushes, ad_rotator.retry_at = 0, 0
+
+    @staticmethod
+    def get_click_url(ad_id):
+        return reverse('api:admin_ad:click', kwargs={'ad_id': ad_id})
+
+    def test_serving_runs_no_query(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.get_url(), {'count': 5})
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(sorted(ad['title'] for ad in response.data), ['Diamond', 'Silver'])
+
+    def test_picks_follow_category_frequency(self):
+        served = Counter(ad_rotator.pick()[0]['title'] for i in range(3000))
+        # 500 to 100
+        self.assertGreater(served['Diamond'], 3 * served['Silver'])
+
+    def test_expired_ads_are_skipped(self):
+        AdminAd.objects.filter(pk=self.diamond.pk).update(expiry=timezone.now() - timedelta(seconds=1))
+        ad_rotator.candidates[self.diamond.pk] = ad_rotator.candidates[self.diamond.pk]._replace(
+            expiry=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEquals([ad['title'] for ad in ad_rotator.pick(5)], ['Silver'])
+
+    def test_impressions_and_clicks_are_flushed_in_one_query(self):
+        for i in range(3):
+            self.client.get(self.get_url(), {'count': 2})
+        response = self.client.post(self.get_click_url(self.silver.pk))
+        self.assertEquals(response.data['title'], 'Silver')
+        self.assertEquals(AdminAd.objects.get(pk=self.silver.pk).impressions, 0)
+        with self.assertNumQueries(1):
+            self.assertEquals(ad_rotator.flush(), 2)
+        self.assertEquals(
+            list(AdminAd.objects.filter(pk__in=[self.silver.pk, self.diamond.pk]).order_by('category').values_list(
+                'title', 'impressions', 'clicks'
+            )),
+            [('Diamond', 3, 0), ('Silver', 3, 1)],
+        )
+        self.assertEquals(ad_rotator.flush(), 0)
+
+    def test_click_on_unknown_ad(self):
+        response = self.client.post(self.get_click_url(self.silver.pk + 100))
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(AD_FLUSH_EVENTS=2)
+    def test_full_buffer_wakes_the_flush(self):
+        with mock.patch.object(ad_rotator.wake, 'set') as wake:
+            ad_rotator.pick()
+            wake.assert_not_called()
+            ad_rotator.pick()
+            wake.assert_called_once()
+
+    @override_settings(AD_FLUSH_EVENTS=2)
+    def test_failed_flush_keeps_the_counts_and_backs_off(self):
+        ad_rotator.pick()
+        ad_rotator.pick()
+        with mock.patch.object(ad_rotator.wake, 'set') as wake:
+            with mock.patch('project.api.admin_ad.rotation.connection.cursor', side_effect=DatabaseError):
+                with self.assertLogs('project.api.admin_ad.rotation', logging.ERROR):
+                    self.assertEquals(ad_rotator.flush(), 0)
+            self.assertEquals(ad_rotator.pending_events, 2)
+            self.assertGreater(ad_rotator.retry_at, time.monotonic())
+            # the buffer is full, but the retry waits for the backoff
+            ad_rotator.pick()
+            wake.assert_not_called()
+        pending_ads = len(ad_rotator.pending)
+        self.assertEquals(ad_rotator.flush(), pending_ads)
+        self.assertEquals(ad_rotator.retry_at, 0)
+        self.assertEquals(sum(AdminAd.objects.values_list('impressions', flat=True)), 3)
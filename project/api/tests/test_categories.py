@@ -1,7 +1,13 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
 from rest_framework import status
 
+from project.api.categories.listing import CACHE_KEY, CACHE_TTL, get_listing
 from project.api.tests.master_tests import MasterTestWrapper
-from project.feed.models import Category
+from project.feed.models import Category, Restaurant
 
 
 class ListCategoriesTests(MasterTestWrapper.BasicMasterTests):
@@ -10,6 +16,7 @@ class ListCategoriesTests(MasterTestWrapper.BasicMasterTests):
 
     def setUp(self):
         super().setUp()
+        cache.clear()
         for i in range(5):
             Category.objects.create(
                 name=f'Category {i}',
@@ -20,3 +27,79 @@ class ListCategoriesTests(MasterTestWrapper.BasicMasterTests):
         response = self.client.get(self.get_url())
         self.assertEquals(response.status_code, status.HTTP_200_OK)
         self.assertEquals(len(response.data), 5)
+
+
+class CategoryListingCacheTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:categories:categories_list'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.categories = [Category.objects.create(name=f'Category {i}') for i in range(3)]
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            category=self.categories[0],
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        self.commit()
+
+    @staticmethod
+    def commit():
+        # the test transaction never commits, run what the commit would
+        for savepoints, callback in connection.run_on_commit:
+            callback()
+        connection.run_on_commit = []
+
+    def counts(self):
+        return {category['id']: category['restaurants_count'] for category in self.client.get(self.get_url()).data}
+
+    def test_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.get_url())
+        self.assertEquals(response.data[0], {'id': self.categories[0].id, 'name': 'Category 0', 'restaurants_count': 1})
+        with self.assertNumQueries(0):
+            self.client.get(self.get_url())
+
+    def test_etag(self):
+        response = self.client.get(self.get_url())
+        self.assertIn('max-age=60', response['Cache-Control'])
+        response = self.client.get(self.get_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEquals(response.content, b'')
+        etag = response['ETag']
+        Category.objects.create(name='Category 3')
+        self.commit()
+        response = self.client.get(self.get_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertNotEquals(response['ETag'], etag)
+
+    def test_restaurant_changes_invalidate(self):
+        self.counts()
+        self.restaurant.category = self.categories[1]
+        self.restaurant.save()
+        self.commit()
+        self.assertEquals(self.counts()[self.categories[1].id], 1)
+        self.restaurant.delete()
+        self.commit()
+        self.assertEquals(self.counts()[self.categories[1].id], 0)
+
+    def test_other_restaurant_changes_keep_the_cache(self):
+        self.counts()
+        self.restaurant.name = 'Restaurant 2'
+        self.restaurant.save()
+        self.commit()
+        self.assertIsNotNone(cache.get(CACHE_KEY))
+
+    def test_local_cache_keeps_the_list_briefly(self):
+        # the other workers only see a change once their copy expires
+        for shared, ttl in ((True, CACHE_TTL), (False, 60)):
+            with self.subTest(shared=shared), override_settings(DEFAULT_CACHE_SHARED=shared, LOCAL_CACHE_MAX_TTL=60):
+                cache.clear()
+                with mock.patch.object(cache, 'set') as cache_set:
+                    get_listing()
+                self.assertEquals(cache_set.call_args[0][2], ttl)
@@ -0,0 +1,58 @@
+from django.urls import reverse
+from rest_framework import status
+
+from project.api.tests.master_tests import MasterTestWrapper
+from project.feed.models import Comment, CommentLike, Restaurant, Review
+
+
+class CommentLikeTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:comments:like_unlike_review_comment'
+    methods = ['POST', 'DELETE']
+
+    def get_kwargs(self):
+        return {
+            'comment_id': self.comment.id
+        }
+
+    def setUp(self):
+        super().setUp()
+        restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        review = Review.objects.create(
+            user=self.user,
+            restaurant=restaurant,
+            rating_taste=4,
+            rating_ambiance=4,
+            rating_quality=4,
+            rating_money_value=4,
+            rating_overall=4,
+            tags='',
+        )
+        self.comment = Comment.objects.create(user=self.user, review=review, content='nice')
+
+    def get_likes(self):
+        response = self.client.get(reverse('api:comments:user_comments', kwargs={'user_id': self.user.id}))
+        return response.data[0]['likes']
+
+    def test_like_and_unlike(self):
+        self.authorize()
+        self.assertEquals(self.client.post(self.get_url()).data, 'Comment liked!')
+        self.assertEquals(self.client.post(self.get_url()).data, 'Comment already liked!')
+        self.authorize(self.other_user)
+        self.client.post(self.get_url())
+        self.assertEquals(self.get_likes(), 2)
+        self.assertEquals(self.client.delete(self.get_url()).status_code, status.HTTP_200_OK)
+        self.assertEquals(self.client.delete(self.get_url()).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEquals(self.get_likes(), 1)
+        self.assertEquals(CommentLike.objects.count(), 1)
+
+    def test_like_missing_comment(self):
+        self.authorize()
+        response = self.client.post(self.get_url(comment_id=self.comment.id + 1))
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+
+from project.api.home.feed import HOME_SECTIONS, cache_key, get_section
+from project.api.tests.master_tests import MasterTestWrapper
+from project.feed.models import Category, Offer, Restaurant, Review
+from project.feed.models.admin_ad import AdminAd
+from project.feed.models.rating_aggregate import record_review
+
+
+class HomeFeedTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:home:home'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.category = Category.objects.create(name='Pizza')
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            category=self.category,
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+            is_featured=True,
+        )
+        self.offer = Offer.objects.create(
+            name='Lunch deal',
+            restaurant=self.restaurant,
+            image_url='offer.jpg',
+            approval_status=True,
+            is_redeemable=True,
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+        )
+        AdminAd.objects.create(title='Active', expiry=timezone.now() + timedelta(days=1), is_active=True)
+        AdminAd.objects.create(title='Expired', expiry=timezone.now() - timedelta(days=1), is_active=True)
+
+    def review(self):
+        record_review(Review.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            offer=self.offer,
+            rating_taste=4,
+            rating_ambiance=4,
+            rating_quality=4,
+            rating_money_value=4,
+            rating_overall=4,
+            tags='',
+        ))
+
+    def test_feed_sections(self):
+        self.review()
+        response = self.client.get(self.get_url())
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals([r['id'] for r in response.data['top_rated_restaurants']], [self.restaurant.id])
+        self.assertEquals([o['id'] for o in response.data['featured_offers']], [self.offer.id])
+        self.assertEquals(response.data['bumper_offers'], [])
+        self.assertEquals([ad['title'] for ad in response.data['ads']], ['Active'])
+        self.assertEquals([c['name'] for c in response.data['categories']], ['Pizza'])
+
+    def test_shared_sections_are_cached(self):
+        self.client.get(self.get_url())
+        self.authorize()
+        # the state of the user, nothing of the sections nor of the user of the token
+        with self.assertNumQueries(2):
+            self.client.get(self.get_url())
+
+    def test_user_overlay(self):
+        self.authorize()
+        self.assertTrue(self.client.get(self.get_url()).data['featured_offers'][0]['can_review'])
+        self.review()
+        self.assertFalse(self.client.get(self.get_url()).data['featured_offers'][0]['can_review'])
+        self.authorize(self.other_user)
+        self.assertTrue(self.client.get(self.get_url()).data['featured_offers'][0]['can_review'])
+
+    def test_save_invalidates_sections(self):
+        self.client.get(self.get_url())
+        self.assertIsNotNone(cache.get(cache_key('featured_offers')))
+        self.offer.name = 'Dinner deal'
+        self.offer.save()
+        self.assertIsNotNone(cache.get(cache_key('featured_offers')))
+        # the test transaction never commits, run what the commit would
+        for savepoints, callback in connection.run_on_commit:
+            callback()
+        self.assertIsNone(cache.get(cache_key('featured_offers')))
+        self.assertEquals(self.client.get(self.get_url()).data['featured_offers'][0]['name'], 'Dinner deal')
+
+    def test_review_invalidates_offer_sections(self):
+        # offer cards show the rating aggregate and the review count
+        self.client.get(self.get_url())
+        self.review()
+        for savepoints, callback in connection.run_on_commit:
+            callback()
+        self.assertIsNone(cache.get(cache_key('featured_offers')))
+        self.assertIsNone(cache.get(cache_key('bumper_offers')))
+
+    @override_settings(DEFAULT_CACHE_SHARED=False, LOCAL_CACHE_MAX_TTL=30)
+    def test_local_cache_keeps_sections_briefly(self):
+        with mock.patch.object(cache, 'set') as cache_set:
+            get_section('categories')
+            get_section('ads')
+        self.assertEquals([call[0][2] for call in cache_set.call_args_list], [30, 30])
+        with override_settings(DEFAULT_CACHE_SHARED=True), mock.patch.object(cache, 'set') as cache_set:
+            get_section('categories')
+        self.assertEquals(cache_set.call_args[0][2], HOME_SECTIONS['categories'].ttl)
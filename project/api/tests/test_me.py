@@ -0,0 +1,280 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from project.api.pagination import KeysetPagination
+from project.api.tests.master_tests import MasterTestWrapper
+from project.feed.models import Category, Comment, Offer, Profile, Restaurant, Review, ReviewLike
+from project.feed.models.coupon import Coupon
+from project.feed.models.user_coupon import DailyRedemption, RedemptionError, UserCoupon
+
+
+def create_coupons(count):
+    offer = Offer.objects.create(
+        name='Lunch deal',
+        image_url='offer.jpg',
+        approval_status=True,
+        valid_from=timezone.now(),
+        valid_till=timezone.now(),
+    )
+    return [
+        Coupon.objects.create(
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+            discount=10,
+            active=True,
+            coupon_offer=offer,
+        )
+        for i in range(count)
+    ]
+
+
+class CouponApplyTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:me:apply_coupon'
+    methods = ['POST']
+
+    def setUp(self):
+        super().setUp()
+        self.coupons = create_coupons(UserCoupon.REDEEM_LIMIT + 1)
+
+    def apply(self, coupon, offer_id=None):
+        return self.client.post(self.get_url(), {
+            'coupon_code': coupon.code,
+            'offer_id': offer_id or coupon.coupon_offer_id,
+        })
+
+    def test_apply_coupon(self):
+        self.authorize()
+        response = self.apply(self.coupons[0])
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['coupon_applied'])
+        response = self.apply(self.coupons[0])
+        self.assertFalse(response.data['coupon_applied'])
+        self.assertEquals(response.data['message'], 'Coupon can not be redeemable before 24 hours.')
+        self.assertEquals(UserCoupon.objects.filter(user=self.user).count(), 1)
+
+    def test_daily_limit(self):
+        self.authorize()
+        for coupon in self.coupons[:UserCoupon.REDEEM_LIMIT]:
+            self.assertTrue(self.apply(coupon).data['coupon_applied'])
+        self.assertFalse(self.apply(self.coupons[-1]).data['coupon_applied'])
+        self.assertEquals(DailyRedemption.objects.get(user=self.user).count, UserCoupon.REDEEM_LIMIT)
+
+    def test_invalid_coupon_and_offer(self):
+        self.authorize()
+        coupon = self.coupons[0]
+        coupon.code = 'wrong'
+        self.assertEquals(self.apply(coupon).data['message'], 'Invalid Coupon code.')
+        self.assertEquals(self.apply(self.coupons[0], offer_id=-1).data['message'], 'Invalid offer.')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'relies on row level locks')
+class CouponRedemptionConcurrencyTests(APITransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='super_secure')
+        self.coupons = create_coupons(10)
+
+    def redeem(self, coupon):
+        try:
+            UserCoupon.redeem(self.user, coupon)
+            return True
+        except RedemptionError:
+            return False
+        finally:
+            # every worker thread opened its own connection
+            connection.close()
+
+    def redeem_in_parallel(self, coupons):
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            return sum(pool.map(self.redeem, coupons))
+
+    def test_daily_limit_holds(self):
+        redeemed = self.redeem_in_parallel([self.coupons[i % 10] for i in range(300)])
+        self.assertEquals(redeemed, UserCoupon.REDEEM_LIMIT)
+        self.assertEquals(UserCoupon.objects.filter(user=self.user).count(), UserCoupon.REDEEM_LIMIT)
+        self.assertEquals(DailyRedemption.objects.get(user=self.user).count, UserCoupon.REDEEM_LIMIT)
+
+    def test_reuse_window_holds(self):
+        redeemed = self.redeem_in_parallel([self.coupons[0]] * 200)
+        self.assertEquals(redeemed, 1)
+        self.assertEquals(DailyRedemption.objects.get(user=self.user).count, 1)
+
+
+class UserActivityTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:me:activity'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            category=Category.objects.create(name='Pizza'),
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        offer = Offer.objects.create(
+            name='Lunch deal',
+            restaurant=restaurant,
+            image_url='offer.jpg',
+            approval_status=True,
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+        )
+        coupon = Coupon.objects.create(
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+            discount=10,
+            active=True,
+            coupon_offer=offer,
+        )
+        self.review = Review.objects.create(
+            user=self.other_user,
+            restaurant=restaurant,
+            offer=offer,
+            rating_taste=4,
+            rating_ambiance=4,
+            rating_quality=4,
+            rating_money_value=4,
+            rating_overall=4,
+            tags='',
+        )
+        now = timezone.now()
+        # newest first: comment, like, redemption, review, comment, redemption
+        self.expected = [
+            ('comment', Comment.objects.create(user=self.user, review=self.review, content='again'), 'created', 1),
+            ('review_like', ReviewLike.objects.create(user=self.user, review=self.review), 'created_at', 2),
+            ('redemption', UserCoupon.objects.create(user=self.user, coupon=coupon), 'used_at', 3),
+            ('review', Review.objects.create(
+                user=self.user,
+                restaurant=restaurant,
+                offer=offer,
+                rating_taste=2,
+                rating_ambiance=2,
+                rating_quality=2,
+                rating_money_value=2,
+                rating_overall=2,
+                tags='',
+            ), 'created_at', 4),
+            ('comment', Comment.objects.create(user=self.user, review=self.review, content='first'), 'created', 5),
+            ('redemption', UserCoupon.objects.create(user=self.user, coupon=coupon), 'used_at', 6),
+        ]
+        for name, obj, time_field, hours_ago in self.expected:
+            type(obj).objects.filter(pk=obj.pk).update(**{time_field: now - timedelta(hours=hours_ago)})
+        # activity of someone else
+        Comment.objects.create(user=self.other_user, review=self.review, content='mine')
+
+    def get_pages(self, url, **params):
+        pages = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEquals(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            url, params = response.get('Link', '')[1:].split('>')[0], {}
+        return pages
+
+    def test_timeline_is_merged_newest_first(self):
+        self.authorize()
+        pages = self.get_pages(self.get_url(), page_size=4)
+        self.assertEquals([len(page) for page in pages], [4, 2])
+        items = [item for page in pages for item in page]
+        self.assertEquals(
+            [(item['type'], item['object'].get('id')) for item in items],
+            [
+                ('comment', self.expected[0][1].pk),
+                ('review_like', self.review.pk),
+                ('redemption', None),
+                ('review', self.expected[3][1].pk),
+                ('comment', self.expected[4][1].pk),
+                ('redemption', None),
+            ],
+        )
+
+    def test_one_query_per_type(self):
+        self.authorize()
+        self.client.get(self.get_url(), {'types': 'comment'})
+        # the comments, the token is verified without a query
+        with self.assertNumQueries(1):
+            response = self.client.get(self.get_url(), {'types': 'comment'})
+        self.assertEquals([item['object']['content'] for item in response.data], ['again', 'first'])
+
+    def test_invalid_types_and_cursor(self):
+        self.authorize()
+        self.assertEquals(self.client.get(self.get_url(), {'types': 'rating'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(self.client.get(self.get_url(), {'cursor': 'eyJ4Ijo'}).status_code, status.HTTP_404_NOT_FOUND)
+        for positions in ({'review': 5}, {'review': ['not-a-date', 1]}, {'review': [{'a': 1}, 1]}, {'rating': None}):
+            with self.subTest(positions):
+                response = self.client.get(self.get_url(), {'cursor': KeysetPagination.encode_cursor(positions)})
+                self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_commented_reviews_are_distinct(self):
+        self.authorize()
+        response = self.client.get(reverse('api:reviews:commented_reviews'))
+        self.assertEquals([review['id'] for review in response.data], [self.review.id])
+        response = self.client.get(reverse('api:reviews:liked_reviews'))
+        self.assertEquals([review['id'] for review in response.data], [self.review.id])
+        response = self.client.get(reverse('api:reviews:user_reviews'))
+        self.assertEquals([review['id'] for review in response.data], [self.expected[3][1].pk])
+
+    def test_commented_reviews_follow_the_cursor(self):
+        self.authorize()
+        own_review = self.expected[3][1]
+        Comment.objects.create(user=self.user, review=own_review, content='latest')
+        pages = self.get_pages(reverse('api:reviews:commented_reviews'), page_size=1)
+        self.assertEquals([[review['id'] for review in page] for page in pages], [[own_review.pk], [self.review.pk]])
+        cursor = KeysetPagination.encode_cursor({'commented_review': ['not-a-date', 1]})
+        response = self.client.get(reverse('api:reviews:commented_reviews'), {'cursor': cursor})
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class UserProfileTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:me:user_profile'
+    methods = ['GET']
+
+    def test_token_user_is_loaded_with_its_profile(self):
+        self.authorize()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.get_url())
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data['profile']['location'], '')
+        self.assertEquals(len(queries), 1)
+        self.assertIn('"feed_profile"', queries[0]['sql'])
+
+    def test_session_user_is_loaded_with_its_profile(self):
+        self.client.login(username='test_user', password='super_secure')
+        self.client.get(self.get_url())
+        # the session is read from its cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.get_url())
+        self.assertEquals(response.data['username'], 'test_user')
+        self.assertEquals(len(queries), 1)
+        self.assertIn('"feed_profile"', queries[0]['sql'])
+
+    def test_sessions_of_the_model_backend_still_resolve(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(self.get_url())
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data['username'], 'test_user')
+
+    def test_update_saves_the_profile(self):
+        self.authorize()
+        response = self.client.post(self.get_url(), {'location': 'Lahore', 'description': 'hungry'})
+        self.assertEquals(response.data['profile']['location'], 'Lahore')
+        self.assertEquals(Profile.objects.get(user=self.user).description, 'hungry')
+
+    def test_saving_a_user_does_not_touch_its_profile(self):
+        self.assertTrue(Profile.objects.filter(user=self.user).exists())
+        with self.assertNumQueries(1):
+            self.user.first_name = 'Renamed'
+            self.user.save()
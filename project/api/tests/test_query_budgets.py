@@ -0,0 +1,139 @@
+import logging
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from project.api.queries import QUERY_BUDGETS, sql_shape
+from project.api.tests.master_tests import MasterTestWrapper
+from project.feed.models import Category, Comment, Offer, Restaurant, Review, ReviewLike
+from project.feed.models.coupon import Coupon
+from project.feed.models.menu_image import MenuImage
+from project.feed.models.rating_aggregate import record_review
+from project.feed.models.tag import Tag
+from project.feed.models.user_coupon import UserCoupon
+
+# every budgeted endpoint and the url kwargs it is requested with
+BUDGET_REQUESTS = {
+    'api:categories:categories_list': lambda test: {},
+    'api:home:home': lambda test: {},
+    'api:restaurants:all': lambda test: {},
+    'api:restaurants:category_restaurants': lambda test: {'pk': test.category.pk},
+    'api:restaurants:top_rated_restaurants': lambda test: {},
+    'api:restaurants:get_update_delete_restaurant': lambda test: {'pk': test.restaurants[0].pk},
+    'api:restaurants:offer_by_restaurant': lambda test: {'restaurant_id': test.restaurants[0].pk},
+    'api:restaurants:offer_by_id': lambda test: {'id': test.offers[0].pk},
+    'api:restaurants:all_offers': lambda test: {},
+    'api:restaurants:featured_offers': lambda test: {},
+    'api:restaurants:non_featured_offers': lambda test: {},
+    'api:restaurants:all_bumper_offers': lambda test: {},
+    'api:restaurants:top_rated_offers': lambda test: {},
+    'api:reviews:restaurant_reviews': lambda test: {'pk': test.restaurants[0].pk},
+    'api:reviews:top_reviews': lambda test: {},
+    'api:reviews:popular_reviews': lambda test: {},
+    'api:reviews:liked_reviews': lambda test: {},
+    'api:reviews:user_reviews': lambda test: {},
+    'api:reviews:commented_reviews': lambda test: {},
+    'api:reviews:restaurant_tags': lambda test: {'pk': test.restaurants[0].pk},
+    'api:reviews:tag_reviews': lambda test: {'pk': test.restaurants[0].pk, 'key': 'tasty'},
+    'api:me:user_profile': lambda test: {},
+    'api:me:activity': lambda test: {},
+    'api:users:list_users': lambda test: {},
+    'api:users:user_profile': lambda test: {'pk': test.other_user.pk},
+}
+
+
+class QueryBudgetTests(MasterTestWrapper.QueryBudgetTests):
+    # rows of every kind, enough for an N+1 to go over any budget
+    rows = 4
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.category = Category.objects.create(name='Food')
+        self.restaurants, self.offers, self.reviews = [], [], []
+        for i in range(self.rows):
+            restaurant = Restaurant.objects.create(
+                name=f'Restaurant {i}',
+                country='CH',
+                city='Zurich',
+                phone_number='+1234567890',
+                opening_hours='24/7',
+                price_level='HIGH',
+                category=self.category,
+                is_featured=i % 2 == 0,
+            )
+            MenuImage.objects.create(image='menu.jpg', sort_order=1, restaurant=restaurant)
+            offer = Offer.objects.create(
+                name=f'Offer {i}',
+                restaurant=restaurant,
+                image_url='offer.jpg',
+                approval_status=True,
+                is_bumper=True,
+                valid_from=timezone.now(),
+                valid_till=timezone.now(),
+            )
+            for user in (self.user, self.other_user):
+                review = Review.objects.create(
+                    user=user,
+                    restaurant=restaurant,
+                    offer=offer,
+                    rating_taste=4,
+                    rating_ambiance=4,
+                    rating_quality=4,
+                    rating_money_value=4,
+                    rating_overall=4,
+                    tags='tasty, cheap',
+                )
+                record_review(review)
+                Tag.record_review(review)
+                ReviewLike.like(self.user, review.pk)
+                Comment.objects.create(user=self.user, review=review, content='nice')
+                self.reviews.append(review)
+            coupon = Coupon.objects.create(
+                valid_from=timezone.now(),
+                valid_till=timezone.now(),
+                discount=10,
+                active=True,
+                coupon_offer=offer,
+            )
+            UserCoupon.objects.create(user=self.user, coupon=coupon)
+            self.restaurants.append(restaurant)
+            self.offers.append(offer)
+        self.authorize()
+
+    def test_every_budget_is_requested(self):
+        self.assertEquals(set(BUDGET_REQUESTS), set(QUERY_BUDGETS))
+
+    def test_endpoints_stay_within_their_budget(self):
+        for url_name, kwargs in BUDGET_REQUESTS.items():
+            with self.subTest(url_name):
+                self.assertWithinQueryBudget(url_name, kwargs(self))
+
+    def test_repeated_queries_have_one_shape(self):
+        self.assertEquals(
+            sql_shape('SELECT * FROM "feed_offer" WHERE "id" IN (%s, %s) LIMIT 21'),
+            sql_shape('SELECT * FROM "feed_offer" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+        )
+
+    @override_settings(QUERY_INSTRUMENTATION=True, QUERY_INSTRUMENTATION_TOP_SHAPES=5)
+    def test_instrumentation_headers(self):
+        url = reverse('api:reviews:restaurant_reviews', kwargs={'pk': self.restaurants[0].pk})
+        response = self.client.get(url)
+        count = int(response['X-Query-Count'])
+        self.assertLessEqual(count, QUERY_BUDGETS['api:reviews:restaurant_reviews'])
+        self.assertIn(f'desc="{count} queries"', response['Server-Timing'])
+
+    @override_settings(QUERY_INSTRUMENTATION=True, QUERY_INSTRUMENTATION_TOP_SHAPES=5)
+    def test_requests_over_budget_are_logged(self):
+        url = reverse('api:reviews:restaurant_reviews', kwargs={'pk': self.restaurants[0].pk})
+        with mock.patch.dict(QUERY_BUDGETS, {'api:reviews:restaurant_reviews': 0}):
+            with self.assertLogs('project.api.middleware', logging.WARNING) as logs:
+                self.client.get(url)
+        self.assertIn('(budget 0)', logs.output[0])
+
+    def test_instrumentation_is_off_by_default(self):
+        response = self.client.get(reverse('api:categories:categories_list'))
+        self.assertNotIn('X-Query-Count', response)
@@ -0,0 +1,76 @@
+import gzip
+import json
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import brotli
+import msgpack
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from project.api.middleware import accepted_encodings
+from project.api.renderers import MessagePackRenderer, ORJSONRenderer
+from project.api.tests.master_tests import MasterTestWrapper
+from project.feed.models import Category
+
+
+class RenderersTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:categories:categories_list'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        for i in range(50):
+            Category.objects.create(name=f'Category {i}')
+
+    def test_orjson_matches_json(self):
+        data = {
+            'created_at': datetime(2021, 3, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'price': Decimal('12.50'),
+            'histogram': {1: 0, 5: 2},
+            'label': gettext_lazy('Category'),
+            'text': 'line\u2028break',
+            'items': [None, True, 1.5],
+        }
+        self.assertEquals(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertIn(b'\\u2028', ORJSONRenderer().render(data))
+        self.assertEquals(ORJSONRenderer().render(None), b'')
+
+    def test_msgpack_negotiation(self):
+        response = self.client.get(self.get_url())
+        self.assertEquals(response['Content-Type'], 'application/json')
+        packed = self.client.get(self.get_url(), HTTP_ACCEPT='application/msgpack')
+        self.assertEquals(packed['Content-Type'], 'application/msgpack')
+        self.assertEquals(msgpack.unpackb(packed.content), json.loads(response.content))
+        self.assertEquals(
+            msgpack.unpackb(MessagePackRenderer().render({'at': datetime(2021, 3, 1, tzinfo=dt_timezone.utc)})),
+            {'at': '2021-03-01T00:00:00Z'},
+        )
+
+    def test_compression(self):
+        plain = self.client.get(self.get_url())
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        response = self.client.get(self.get_url(), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEquals(response['Content-Encoding'], 'br')
+        self.assertEquals(brotli.decompress(response.content), plain.content)
+        self.assertTrue(response['ETag'].startswith('W/'))
+        response = self.client.get(self.get_url(), HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEquals(response['Content-Encoding'], 'gzip')
+        self.assertEquals(gzip.decompress(response.content), plain.content)
+        # the weak ETag still revalidates
+        response = self.client.get(self.get_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(COMPRESSION_MIN_BYTES=10 ** 6)
+    def test_small_bodies_are_not_compressed(self):
+        response = self.client.get(self.get_url(), HTTP_ACCEPT_ENCODING='br')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_accepted_encodings(self):
+        self.assertEquals(accepted_encodings('gzip;q=0.8, BR, identity;q=0, *;q=bad'), {'gzip', 'br'})
+        self.assertEquals(accepted_encodings(''), set())
@@ -1,7 +1,28 @@
+import io
+import logging
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
 
+from project.api.pagination import KeysetPagination
+from project.api.restaurant.serializers import OfferSerializer, RestaurantSerializer
 from project.api.tests.master_tests import MasterTestWrapper
-from project.feed.models import Restaurant, Category
+from project.feed.geo import bounding_box, covering_cells, encode_geohash
+from project.feed.models import Restaurant, Category, Offer, Review
+from project.feed.models.coupon import Coupon
+from project.feed.models.menu_image import MenuImage
+from project.feed.models.rating_aggregate import record_review
+from project.feed.models.user_coupon import UserCoupon
 
 
 class ListAllRestaurantsTests(MasterTestWrapper.BasicMasterTests):
@@ -29,6 +50,48 @@ class ListAllRestaurantsTests(MasterTestWrapper.BasicMasterTests):
         self.assertEquals(len(response.data), 5)
 
 
+class KeysetPaginationTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:restaurants:all'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            Restaurant.objects.create(
+                name=f'Restaurant {i}',
+                country='CH',
+                city='Zurich',
+                phone_number='+1234567890',
+                opening_hours='24/7',
+                price_level='HIGH',
+            )
+        # ties on the first ordering field are broken by the id
+        Restaurant.objects.update(created=timezone.now())
+
+    def test_pages_follow_the_cursor(self):
+        self.authorize()
+        names = []
+        response = self.client.get(self.get_url(), {'page_size': 2})
+        while True:
+            self.assertEquals(response.status_code, status.HTTP_200_OK)
+            self.assertIn('X-Approximate-Count', response)
+            names += [restaurant['name'] for restaurant in response.data]
+            if 'X-Next-Cursor' not in response:
+                break
+            self.assertIn('rel="next"', response['Link'])
+            response = self.client.get(self.get_url(), {'page_size': 2, 'cursor': response['X-Next-Cursor']})
+        self.assertEquals(names, [f'Restaurant {i}' for i in range(5)])
+
+    def test_invalid_cursor(self):
+        self.authorize()
+        response = self.client.get(self.get_url(), {'cursor': 'not a cursor'})
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+        for values in (['not-a-date', 1], [{'a': 1}, 1], [None, 1], ['2020-01-01T00:00:00+00:00', 'x']):
+            with self.subTest(values):
+                response = self.client.get(self.get_url(), {'cursor': KeysetPagination.encode_cursor(values)})
+                self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class NewRestaurantTests(MasterTestWrapper.MasterTests):
     endpoint = 'api:restaurants:new_restaurant'
     methods = ['POST']
@@ -170,3 +233,552 @@ class UserRestaurantsTests(MasterTestWrapper.BasicMasterTests):
         self.assertEquals(len(response.data), 5)
         self.assertEquals(Restaurant.objects.first().name, 'Restaurant 0')
         self.assertEquals(Restaurant.objects.first().user, self.user)
+
+
+class RestaurantListQueryCountTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:restaurants:all'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='swiss')
+
+    def create_restaurants(self, count):
+        for i in range(count):
+            restaurant = Restaurant.objects.create(
+                name=f'Restaurant {Restaurant.objects.count()}',
+                country='CH',
+                city='Zurich',
+                phone_number='+1234567890',
+                opening_hours='24/7',
+                price_level='HIGH',
+                category=self.category,
+            )
+            MenuImage.objects.create(image='menu.jpg', sort_order=1, restaurant=restaurant)
+            review = Review.objects.create(
+                user=self.user,
+                restaurant=restaurant,
+                rating_taste=4,
+                rating_ambiance=4,
+                rating_quality=4,
+                rating_money_value=4,
+                rating_overall=4,
+                tags='tasty',
+            )
+            record_review(review)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_restaurants(self):
+        self.authorize()
+        self.create_restaurants(2)
+        few = self.count_queries(self.get_url())
+        self.create_restaurants(8)
+        many = self.count_queries(self.get_url())
+        self.assertEquals(few, many)
+
+    def test_category_query_count_does_not_grow_with_restaurants(self):
+        url = reverse('api:restaurants:category_restaurants', kwargs={'pk': self.category.id})
+        self.create_restaurants(2)
+        few = self.count_queries(url)
+        self.create_restaurants(8)
+        many = self.count_queries(url)
+        self.assertEquals(few, many)
+
+    def test_batch_loaded_values(self):
+        self.authorize()
+        self.create_restaurants(1)
+        response = self.client.get(self.get_url())
+        restaurant = response.data[0]
+        self.assertEquals(restaurant['reviews_count'], 1)
+        self.assertEquals(restaurant['rating']['avg_rating'], 4)
+        self.assertEquals(restaurant['category'], 'swiss')
+        self.assertEquals(len(restaurant['menu_images']), 1)
+
+
+class OfferListQueryCountTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:restaurants:all_offers'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='swiss')
+
+    def create_offers(self, count):
+        offers = []
+        for i in range(count):
+            restaurant = Restaurant.objects.create(
+                name=f'Restaurant {i}',
+                country='CH',
+                city='Zurich',
+                phone_number='+1234567890',
+                opening_hours='24/7',
+                price_level='HIGH',
+                category=self.category,
+            )
+            offers.append(Offer.objects.create(
+                name=f'Offer {i}',
+                restaurant=restaurant,
+                image_url='offer.jpg',
+                approval_status=True,
+                valid_from=timezone.now(),
+                valid_till=timezone.now(),
+            ))
+        return offers
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.get_url())
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_offers(self):
+        self.authorize()
+        self.create_offers(2)
+        few = self.count_queries()
+        self.create_offers(8)
+        many = self.count_queries()
+        self.assertEquals(few, many)
+
+    def test_per_user_fields(self):
+        self.authorize()
+        reviewed, redeemed, other = self.create_offers(3)
+        Review.objects.create(
+            user=self.user,
+            restaurant=reviewed.restaurant,
+            offer=reviewed,
+            rating_taste=4,
+            rating_ambiance=4,
+            rating_quality=4,
+            rating_money_value=4,
+            rating_overall=4,
+            tags='tasty',
+        )
+        coupon = Coupon.objects.create(
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+            discount=10,
+            active=True,
+            coupon_offer=redeemed,
+        )
+        UserCoupon.redeem(self.user, coupon)
+        offers = {offer['id']: offer for offer in self.client.get(self.get_url()).data}
+        self.assertEquals(
+            [(offers[o.id]['can_review'], offers[o.id]['is_redeemable']) for o in [reviewed, redeemed, other]],
+            [(False, True), (True, False), (True, True)],
+        )
+
+
+class TopRatedRestaurantsTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:restaurants:top_rated_restaurants'
+    methods = ['GET']
+
+    def create_restaurant(self, name, ratings):
+        restaurant = Restaurant.objects.create(
+            name=name,
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        for rating in ratings:
+            record_review(Review.objects.create(
+                user=self.user,
+                restaurant=restaurant,
+                rating_taste=rating,
+                rating_ambiance=rating,
+                rating_quality=rating,
+                rating_money_value=rating,
+                rating_overall=rating,
+                tags='',
+            ))
+        return restaurant
+
+    def setUp(self):
+        super().setUp()
+        self.create_restaurant('single five', [5])
+        self.create_restaurant('many fours', [4] * 20)
+        self.create_restaurant('many threes', [3] * 20)
+        self.create_restaurant('not reviewed', [])
+
+    def test_weighted_ranking(self):
+        response = self.client.get(self.get_url())
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals([r['name'] for r in response.data], ['many fours', 'single five', 'many threes'])
+
+    def test_limit_offset(self):
+        response = self.client.get(self.get_url(), {'limit': 1, 'offset': 1})
+        self.assertEquals([r['name'] for r in response.data], ['single five'])
+
+    def test_query_count_does_not_grow_with_restaurants(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.get_url(), {'limit': 2})
+        for i in range(10):
+            self.create_restaurant(f'extra {i}', [4])
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(self.get_url(), {'limit': 2})
+        self.assertEquals(len(few), len(many))
+
+    def test_top_4(self):
+        response = self.client.get(reverse('api:restaurants:top_rated_4_restaurants'))
+        self.assertEquals(response.data[0]['name'], 'many fours')
+
+
+class NearbyTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:restaurants:nearby'
+    methods = ['GET']
+
+    def create_restaurant(self, name, lat, long):
+        return Restaurant.objects.create(
+            name=name,
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+            lat=lat,
+            long=long,
+        )
+
+    def setUp(self):
+        super().setUp()
+        # Zurich main station, Bellevue (~1.1 km), Oerlikon (~4 km) and Bern (~95 km)
+        self.create_restaurant('station', 47.3779, 8.5403)
+        self.create_restaurant('bellevue', 47.3667, 8.5450)
+        self.create_restaurant('oerlikon', 47.4115, 8.5441)
+        self.create_restaurant('bern', 46.9480, 7.4474)
+        self.create_restaurant('unknown location', None, None)
+
+    def test_geohash_kept_in_sync(self):
+        restaurant = Restaurant.objects.get(name='station')
+        self.assertTrue(restaurant.geohash.startswith('u0qj'))
+        restaurant.lat, restaurant.long = None, None
+        restaurant.save()
+        self.assertEquals(restaurant.geohash, '')
+
+    def test_nearby_sorted_by_distance(self):
+        self.authorize()
+        response = self.client.get(self.get_url(), {'lat': 47.3780, 'long': 8.5400, 'radius': 5})
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        names = [r['name'] for r in response.data['restaurants']]
+        self.assertEquals(names, ['station', 'bellevue', 'oerlikon'])
+        self.assertLess(response.data['restaurants'][1]['distance'], 1.5)
+
+    def test_nearby_limit_and_radius(self):
+        self.authorize()
+        response = self.client.get(self.get_url(), {'lat': 47.3780, 'long': 8.5400, 'radius': 2, 'limit': 1})
+        self.assertEquals([r['name'] for r in response.data['restaurants']], ['station'])
+
+    def test_nearby_requires_coordinates(self):
+        self.authorize()
+        response = self.client.get(self.get_url(), {'lat': 47.3780})
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_covering_cells_cross_antimeridian(self):
+        cells = covering_cells(*bounding_box(0.0, 179.99, 5))
+        self.assertIn(encode_geohash(0.0, 179.99)[:len(cells[0])], cells)
+        self.assertIn(encode_geohash(0.0, -179.99)[:len(cells[0])], cells)
+
+
+class IssueCouponsTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:restaurants:issue_coupons'
+    methods = ['POST']
+
+    def setUp(self):
+        super().setUp()
+        self.offer = Offer.objects.create(
+            name='Lunch deal',
+            image_url='offer.jpg',
+            approval_status=True,
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+        )
+        self.user.is_staff = True
+        self.user.save()
+
+    def get_kwargs(self):
+        return {'id': self.offer.id}
+
+    def issue(self, count):
+        return self.client.post(self.get_url(), {
+            'count': count,
+            'discount': 10,
+            'valid_from': '2030-01-01T00:00:00Z',
+            'valid_till': '2030-02-01T00:00:00Z',
+        })
+
+    def test_issue_coupons(self):
+        self.authorize()
+        Coupon.objects.create(
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+            discount=10,
+            active=True,
+            coupon_offer=self.offer,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.issue(1000)
+        self.assertEquals(response.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(queries), 10)
+        codes = set(response.data['codes'])
+        self.assertEquals(len(codes), 1000)
+        self.assertEquals(Coupon.objects.filter(coupon_offer=self.offer).values('code').distinct().count(), 1001)
+
+    def test_admin_only(self):
+        self.authorize(self.other_user)
+        self.assertEquals(self.issue(1).status_code, status.HTTP_403_FORBIDDEN)
+
+
+def image_upload(width, height, name='photo.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'orange').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImagePipelineTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:restaurants:all_offers'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            MEDIA_ROOT=self.media_root,
+            IMAGE_PIPELINE_SYNC=True,
+        )
+        self.settings.enable()
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+            category=Category.objects.create(name='swiss'),
+            cover_image=image_upload(1600, 900),
+        )
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_offer(self):
+        return Offer.objects.create(
+            name='Offer 1',
+            restaurant=self.restaurant,
+            image_url=image_upload(2000, 1000),
+            approval_status=True,
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+        )
+
+    def test_variants_are_rendered(self):
+        offer = self.create_offer()
+        offer.refresh_from_db()
+        variants = offer.image_variants['image_url']
+        self.assertEquals((variants['thumb']['width'], variants['thumb']['height']), (160, 80))
+        self.assertEquals((variants['card']['width'], variants['full']['width']), (480, 1280))
+        self.assertTrue(offer.image_url.storage.exists(offer.image_url.name))
+        self.assertTrue(offer.image_url.storage.exists(variants['card']['webp']['name']))
+        self.assertLess(variants['card']['webp']['bytes'], variants['original']['bytes'])
+
+        self.authorize()
+        data = self.client.get(self.get_url()).data[0]['image_variants']
+        self.assertTrue(data['image_url']['thumb']['webp'].endswith('_thumb.webp'))
+        self.assertTrue(data['cover_image']['card']['jpeg'].endswith('_card.jpeg'))
+        self.assertEquals(data['logo_image'], {})
+
+        out = io.StringIO()
+        call_command('image_bytes_report', stdout=out)
+        self.assertIn('1 offer cards, 0 images not processed yet', out.getvalue())
+
+    def test_upload_is_deferred(self):
+        with override_settings(IMAGE_PIPELINE_SYNC=False):
+            offer = self.create_offer()
+        offer.refresh_from_db()
+        # the original is stored with the row, the worker pool only gets the variants once the transaction commits
+        self.assertEquals(offer.image_variants, {})
+        self.assertTrue(offer.image_url.storage.exists(offer.image_url.name))
+
+    def test_failed_processing_is_retried(self):
+        with mock.patch('project.feed.images.render_variants', side_effect=OSError('storage down')):
+            with self.assertLogs('project.feed.images', logging.ERROR):
+                offer = self.create_offer()
+        offer.refresh_from_db()
+        self.assertEquals(offer.image_variants['image_url'], {'pending': True})
+        out = io.StringIO()
+        call_command('image_bytes_report', stdout=out)
+        self.assertIn('1 images not processed yet', out.getvalue())
+
+        call_command('process_images', stdout=io.StringIO())
+        offer.refresh_from_db()
+        self.assertNotIn('pending', offer.image_variants['image_url'])
+        self.assertEquals(offer.image_variants['image_url']['card']['width'], 480)
+
+    def test_process_existing_images(self):
+        offer = self.create_offer()
+        Offer.objects.filter(pk=offer.pk).update(image_variants={})
+        call_command('process_images', stdout=io.StringIO())
+        offer.refresh_from_db()
+        self.assertEquals(offer.image_variants['image_url']['card']['width'], 480)
+
+
+class ConditionalGetTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:restaurants:offer_by_restaurant'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Pizza')
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            category=self.category,
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        self.offer = Offer.objects.create(
+            name='Lunch deal',
+            restaurant=self.restaurant,
+            image_url='offer.jpg',
+            approval_status=True,
+            is_redeemable=True,
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+        )
+
+    def get_kwargs(self):
+        return {'restaurant_id': self.restaurant.id}
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_skips_serialization(self):
+        self.authorize()
+        response = self.client.get(self.get_url())
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        # the validators and the reviews and redemptions of the user
+        with self.assertNumQueries(3):
+            not_modified = self.revalidate(self.get_url(), response['ETag'])
+        self.assertEquals(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEquals(not_modified.content, b'')
+        self.assertEquals(not_modified['ETag'], response['ETag'])
+
+    def test_changes_move_the_etag(self):
+        self.authorize()
+        etag = self.client.get(self.get_url())['ETag']
+        self.offer.name = 'Dinner deal'
+        self.offer.save()
+        response = self.revalidate(self.get_url(), etag)
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data[0]['name'], 'Dinner deal')
+
+        etag = response['ETag']
+        self.category.name = 'Pasta'
+        self.category.save()
+        response = self.revalidate(self.get_url(), etag)
+        self.assertEquals(response.data[0]['restaurant_category'], 'Pasta')
+
+        etag = response['ETag']
+        Offer.objects.create(
+            name='Bumper', restaurant=self.restaurant, image_url='offer.jpg', approval_status=True,
+            valid_from=timezone.now(), valid_till=timezone.now(),
+        ).delete()
+        self.assertEquals(self.revalidate(self.get_url(), etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        Offer.objects.filter(pk=self.offer.pk).delete()
+        self.assertEquals(self.revalidate(self.get_url(), etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_the_user(self):
+        self.authorize()
+        etag = self.client.get(self.get_url())['ETag']
+        record_review(Review.objects.create(
+            user=self.user, restaurant=self.restaurant, offer=self.offer, rating_taste=4, rating_ambiance=4,
+            rating_quality=4, rating_money_value=4, rating_overall=4, tags='',
+        ))
+        response = self.revalidate(self.get_url(), etag)
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data[0]['can_review'])
+        self.authorize(self.other_user)
+        self.assertEquals(self.revalidate(self.get_url(), response['ETag']).status_code, status.HTTP_200_OK)
+
+    def test_restaurant_and_offer_lists(self):
+        self.authorize()
+        for url in [
+            reverse('api:restaurants:get_update_delete_restaurant', kwargs={'pk': self.restaurant.id}),
+            reverse('api:restaurants:offer_by_id', kwargs={'id': self.offer.id}),
+            reverse('api:restaurants:all_offers'),
+            reverse('api:restaurants:all_bumper_offers'),
+        ]:
+            etag = self.client.get(url)['ETag']
+            self.assertEquals(self.revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+    def test_rating_and_menu_images_move_the_restaurant_etag(self):
+        url = reverse('api:restaurants:get_update_delete_restaurant', kwargs={'pk': self.restaurant.id})
+        etag = self.client.get(url)['ETag']
+        review = Review.objects.create(
+            user=self.user, restaurant=self.restaurant, offer=self.offer, rating_taste=4, rating_ambiance=4,
+            rating_quality=4, rating_money_value=4, rating_overall=4, tags='',
+        )
+        record_review(review)
+        response = self.revalidate(url, etag)
+        self.assertEquals(response.data['reviews_count'], 1)
+        MenuImage.objects.create(restaurant=self.restaurant, image='menu.jpg', sort_order=0)
+        response = self.revalidate(url, response['ETag'])
+        self.assertEquals(len(response.data['menu_images']), 1)
+        updated_at = review.updated_at
+        review.comment = 'edited'
+        review.save()
+        self.assertGreater(review.updated_at, updated_at)
+
+
+class SparseFieldsTests(OfferListQueryCountTests):
+
+    def get_offers(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.get_url(), params)
+        return response, queries
+
+    def test_card_profile(self):
+        self.authorize()
+        self.create_offers(3)
+        response, queries = self.get_offers()
+        with mock.patch.object(OfferSerializer, 'get_can_review') as get_can_review:
+            card, card_queries = self.get_offers(profile='card')
+        get_can_review.assert_not_called()
+        self.assertEquals(list(card.data[0]), OfferSerializer.PROFILES['card'])
+        self.assertEquals(card.data[0]['name'], response.data[0]['name'])
+        # neither the state of the user nor the category of the restaurant
+        self.assertEquals(len(card_queries), len(queries) - 2)
+        page_query = card_queries[-1]['sql']
+        self.assertNotIn('"description"', page_query)
+        self.assertNotIn('feed_category', page_query)
+
+    def test_fields_and_expand(self):
+        self.authorize()
+        offer, = self.create_offers(1)
+        response, queries = self.get_offers(fields='id,name')
+        self.assertEquals(response.data, [{'id': offer.id, 'name': offer.name}])
+        # the restaurant is only joined for the ordering of the pages
+        self.assertIn('"feed_restaurant"."id", "feed_restaurant"."created" FROM', queries[-1]['sql'])
+        self.assertEquals(self.get_offers(fields='id,secret')[0].status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEquals(self.get_offers(profile='tiny')[0].status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = reverse('api:restaurants:get_update_delete_restaurant', kwargs={'pk': offer.restaurant_id})
+        self.assertNotIn('reviews', self.client.get(url).data)
+        Review.objects.create(
+            user=self.user, restaurant=offer.restaurant, offer=offer, rating_taste=4, rating_ambiance=4,
+            rating_quality=4, rating_money_value=4, rating_overall=4, tags='',
+        )
+        response = self.client.get(url, {'profile': 'card', 'expand': 'reviews'})
+        self.assertEquals(set(response.data), set(RestaurantSerializer.PROFILES['card']) | {'reviews'})
+        self.assertEquals(response.data['reviews'][0]['rating_overall'], '4.00')
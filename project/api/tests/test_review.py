@@ -1,7 +1,20 @@
+import math
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
+from project.api.pagination import KeysetPagination
 from project.api.tests.master_tests import MasterTestWrapper
-from project.feed.models import Restaurant, Category, Review
+from project.feed.models import Restaurant, Category, Review, ReviewLike, ReviewLikeShard, Offer, RestaurantRating, \
+    OfferRating
+from project.feed.models.tag import ReviewTag, Tag
 
 
 class NewReviewTests(MasterTestWrapper.MasterTests):
@@ -171,3 +184,402 @@ class UserReviewsTests(MasterTestWrapper.BasicMasterTests):
         self.assertEquals(len(response.data), 1)
         self.assertEquals(Review.objects.first().content, 'test reviews')
         self.assertEquals(Review.objects.first().user, self.user)
+
+
+class ReviewRatingAggregateTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:reviews:create_review'
+    methods = ['POST']
+
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        self.offer = Offer.objects.create(
+            name='Offer 1',
+            restaurant=self.restaurant,
+            image_url='offer.jpg',
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+            approval_status=True,
+        )
+
+    def post_review(self, rating):
+        return self.client.post(self.get_url(), {
+            'restaurant_id': self.restaurant.id,
+            'offer_id': self.offer.id,
+            'comment': 'nice',
+            'rating_taste': rating,
+            'rating_ambiance': rating,
+            'rating_quality': rating,
+            'rating_money_value': rating,
+            'tags': 'tasty,cheap',
+        })
+
+    def test_create_review_updates_aggregates(self):
+        self.authorize()
+        response = self.post_review(4)
+        self.assertEquals(response.status_code, status.HTTP_201_CREATED)
+        aggregate = RestaurantRating.objects.get(pk=self.restaurant.id)
+        self.assertEquals(aggregate.reviews_count, 1)
+        self.assertEquals(aggregate.avg_rating, 4)
+        self.assertEquals(aggregate.taste_sum, 4)
+        self.assertEquals(aggregate.histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0})
+        self.assertEquals(OfferRating.objects.get(pk=self.offer.id).reviews_count, 1)
+
+    def test_new_review_replaces_deactivated_one(self):
+        self.authorize()
+        self.post_review(4)
+        self.post_review(2)
+        aggregate = RestaurantRating.objects.get(pk=self.restaurant.id)
+        self.assertEquals(aggregate.reviews_count, 1)
+        self.assertEquals(aggregate.avg_rating, 2)
+        self.assertEquals(aggregate.histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+    def test_one_active_review_per_offer(self):
+        self.authorize()
+        self.post_review(4)
+        self.post_review(3)
+        self.assertEquals(Review.objects.filter(user=self.user, is_active=True).count(), 1)
+        self.assertEquals(Review.objects.filter(user=self.user, is_active=False).count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Review.objects.create(
+                user=self.user,
+                restaurant=self.restaurant,
+                offer=self.offer,
+                rating_taste=4,
+                rating_ambiance=4,
+                rating_quality=4,
+                rating_money_value=4,
+                rating_overall=4,
+                tags='',
+            )
+
+    def test_offer_of_another_restaurant(self):
+        self.authorize()
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 2',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        self.assertEquals(self.post_review(4).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.authorize()
+        self.post_review(4)
+        RestaurantRating.objects.filter(pk=self.restaurant.id).update(reviews_count=7)
+        out = StringIO()
+        call_command('rebuild_rating_aggregates', stdout=out)
+        self.assertIn(f'restaurant {self.restaurant.id}: reviews_count 7 != 1', out.getvalue())
+        self.assertEquals(RestaurantRating.objects.get(pk=self.restaurant.id).reviews_count, 1)
+
+
+class PopularReviewsTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:reviews:popular_reviews'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        self.offer = Offer.objects.create(
+            name='Offer 1',
+            restaurant=self.restaurant,
+            image_url='offer.jpg',
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+            approval_status=True,
+        )
+        self.other_offer = Offer.objects.create(
+            name='Offer 2',
+            restaurant=self.restaurant,
+            image_url='offer.jpg',
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+            approval_status=True,
+        )
+        self.reviews = [
+            Review.objects.create(
+                user=user,
+                restaurant=self.restaurant,
+                offer=offer,
+                rating_taste=4,
+                rating_ambiance=4,
+                rating_quality=4,
+                rating_money_value=4,
+                rating_overall=4,
+                tags='',
+            )
+            for user, offer in [(self.user, self.other_offer), (self.user, self.offer), (self.other_user, self.offer)]
+        ]
+
+    def like(self, review, user, hours_ago=0):
+        like = ReviewLike.objects.create(user=user, review=review)
+        if hours_ago:
+            # the score is maintained from the like time, move the like back through the same path
+            ReviewLike.record(like, sign=-1)
+            like.created_at -= timedelta(hours=hours_ago)
+            ReviewLike.objects.filter(pk=like.pk).update(created_at=like.created_at)
+            ReviewLike.record(like)
+        return like
+
+    def test_popular_ranks_by_likes(self):
+        self.authorize()
+        self.like(self.reviews[0], self.user)
+        self.like(self.reviews[1], self.user)
+        self.like(self.reviews[1], self.other_user)
+        Review.objects.filter(pk=self.reviews[0].pk).update(is_active=False)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.get_url())
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals([review['id'] for review in response.data], [self.reviews[1].id])
+
+    def test_trending_decays_old_likes(self):
+        self.authorize()
+        # two likes two days ago weigh half of one like now
+        self.like(self.reviews[0], self.user, hours_ago=48)
+        self.like(self.reviews[0], self.other_user, hours_ago=48)
+        self.like(self.reviews[1], self.user)
+        response = self.client.get(self.get_url(), {'mode': 'trending'})
+        self.assertEquals([review['id'] for review in response.data], [self.reviews[1].id, self.reviews[0].id])
+        scores = dict(Review.objects.values_list('id', 'trending_score'))
+        self.assertAlmostEqual(scores[self.reviews[1].id] - scores[self.reviews[0].id], math.log(2), places=3)
+        self.assertIsNone(scores[self.reviews[2].id])
+
+    def test_unlike_removes_score(self):
+        self.authorize()
+        like = self.like(self.reviews[0], self.user, hours_ago=5)
+        other_like = self.like(self.reviews[0], self.other_user)
+        like.delete()
+        review = Review.objects.get(pk=self.reviews[0].pk)
+        self.assertAlmostEqual(review.trending_score, Review.trending_weight(other_like.created_at), places=6)
+        other_like.delete()
+        self.assertIsNone(Review.objects.get(pk=self.reviews[0].pk).trending_score)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.like(self.reviews[0], self.user, hours_ago=5)
+        self.like(self.reviews[0], self.other_user)
+        expected = Review.objects.get(pk=self.reviews[0].pk).trending_score
+        Review.objects.filter(pk=self.reviews[0].pk).update(trending_score=1.0)
+        Review.objects.filter(pk=self.reviews[1].pk).update(trending_score=1.0)
+        out = StringIO()
+        call_command('rebuild_trending_scores', stdout=out)
+        self.assertIn('2 trending scores rewritten', out.getvalue())
+        scores = dict(Review.objects.values_list('id', 'trending_score'))
+        self.assertAlmostEqual(scores[self.reviews[0].id], expected, places=6)
+        self.assertIsNone(scores[self.reviews[1].id])
+
+    def test_invalid_mode(self):
+        self.authorize()
+        response = self.client.get(self.get_url(), {'mode': 'newest'})
+        self.assertEquals(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReviewLikeCountTests(MasterTestWrapper.MasterTests):
+    endpoint = 'api:reviews:like_unlike_review'
+    methods = ['POST', 'DELETE']
+
+    def get_kwargs(self):
+        return {
+            'review_id': self.review.id
+        }
+
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        self.review = Review.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            rating_taste=4,
+            rating_ambiance=4,
+            rating_quality=4,
+            rating_money_value=4,
+            rating_overall=4,
+            tags='',
+        )
+
+    def like_count(self):
+        return ReviewLike.count_for(Review.objects.get(pk=self.review.pk))
+
+    def test_like_and_unlike(self):
+        self.authorize()
+        self.assertEquals(self.client.post(self.get_url()).data['status_code'], 200)
+        self.assertEquals(self.client.post(self.get_url()).data['status_code'], 422)
+        self.assertEquals(self.like_count(), 1)
+        self.assertIsNotNone(Review.objects.get(pk=self.review.pk).trending_score)
+        self.assertEquals(self.client.delete(self.get_url()).data['status_code'], 200)
+        self.assertEquals(self.client.delete(self.get_url()).data['status_code'], 422)
+        self.assertEquals(self.like_count(), 0)
+        self.assertIsNone(Review.objects.get(pk=self.review.pk).trending_score)
+
+    def test_like_is_one_statement(self):
+        self.authorize()
+        self.client.get(reverse('api:reviews:liked_reviews'))
+        # the like, the token is verified without a query
+        with self.assertNumQueries(1):
+            self.client.post(self.get_url())
+
+    def test_like_missing_review(self):
+        self.authorize()
+        response = self.client.post(self.get_url(review_id=self.review.id + 1))
+        self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(ReviewLike.objects.exists())
+
+    @override_settings(LIKE_COUNT_SHARD_THRESHOLD=1)
+    def test_viral_review_counts_on_shards(self):
+        self.authorize()
+        self.client.post(self.get_url())
+        self.authorize(self.other_user)
+        self.client.post(self.get_url())
+        self.assertEquals(Review.objects.get(pk=self.review.pk).like_count, 1)
+        self.assertEquals(ReviewLikeShard.objects.get(review=self.review).count, 1)
+        self.assertEquals(self.like_count(), 2)
+        self.client.delete(self.get_url())
+        self.assertEquals(self.like_count(), 1)
+        self.client.post(self.get_url())
+        call_command('reconcile_like_counts', stdout=StringIO())
+        self.assertEquals(Review.objects.get(pk=self.review.pk).like_count, 2)
+        self.assertFalse(ReviewLikeShard.objects.exists())
+
+    def test_orm_likes_are_counted(self):
+        like = ReviewLike.objects.create(user=self.user, review=self.review)
+        self.assertEquals(self.like_count(), 1)
+        like.delete()
+        self.assertEquals(self.like_count(), 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        ReviewLike.like(self.user, self.review.id)
+        Review.objects.filter(pk=self.review.pk).update(like_count=7)
+        out = StringIO()
+        call_command('reconcile_like_counts', '--check', stdout=out)
+        self.assertIn(f'review {self.review.id}: like_count 7 != 1', out.getvalue())
+        self.assertEquals(self.like_count(), 7)
+        call_command('reconcile_like_counts', stdout=StringIO())
+        self.assertEquals(self.like_count(), 1)
+
+
+class TagIndexTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:reviews:create_review'
+    methods = ['POST']
+
+    def setUp(self):
+        super().setUp()
+        self.restaurant = Restaurant.objects.create(
+            name='Restaurant 1',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+        )
+        self.offers = [
+            Offer.objects.create(
+                name=f'Offer {i}',
+                restaurant=self.restaurant,
+                image_url='offer.jpg',
+                valid_from=timezone.now(),
+                valid_till=timezone.now(),
+                approval_status=True,
+            ) for i in range(2)
+        ]
+
+    def post_review(self, offer, tags):
+        return self.client.post(self.get_url(), {
+            'restaurant_id': self.restaurant.id,
+            'offer_id': offer.id,
+            'comment': 'nice',
+            'rating_taste': 4,
+            'rating_ambiance': 4,
+            'rating_quality': 4,
+            'rating_money_value': 4,
+            'tags': tags,
+        })
+
+    def mentions(self):
+        return dict(Tag.objects.filter(restaurant=self.restaurant).values_list('key', 'mentions'))
+
+    def test_tags_are_normalized_and_counted(self):
+        self.authorize()
+        self.post_review(self.offers[0], 'Tasty, cheap ,tasty')
+        self.post_review(self.offers[1], ' TASTY,Spicy  food')
+        self.assertEquals(self.mentions(), {'tasty': 2, 'cheap': 1, 'spicy food': 1})
+        self.assertEquals(Tag.objects.get(key='tasty').name, 'Tasty')
+
+    def test_tags_are_locked_in_key_order(self):
+        self.authorize()
+        with CaptureQueriesContext(connection) as queries:
+            self.post_review(self.offers[0], 'tasty, cheap, Spicy food')
+        insert = next(query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "feed_tag"'))
+        self.assertLess(insert.index("'cheap'"), insert.index("'spicy food'"))
+        self.assertLess(insert.index("'spicy food'"), insert.index("'tasty'"))
+
+    def test_deactivated_review_loses_its_mentions(self):
+        self.authorize()
+        self.post_review(self.offers[0], 'tasty,cheap')
+        self.post_review(self.offers[0], 'cheap')
+        self.assertEquals(self.mentions(), {'tasty': 0, 'cheap': 1})
+        self.assertEquals(ReviewTag.objects.count(), 1)
+
+    def test_deleted_review_loses_its_mentions(self):
+        self.authorize()
+        self.post_review(self.offers[0], 'tasty')
+        Review.objects.get(user=self.user).delete()
+        self.assertEquals(self.mentions(), {'tasty': 0})
+
+    def test_top_tags(self):
+        self.authorize()
+        self.post_review(self.offers[0], 'tasty,cheap')
+        self.post_review(self.offers[1], 'tasty')
+        url = reverse('api:reviews:restaurant_tags', kwargs={'pk': self.restaurant.id})
+        response = self.client.get(url, {'limit': 1})
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data, [{'name': 'tasty', 'key': 'tasty', 'mentions': 2}])
+
+    def test_reviews_of_a_tag(self):
+        self.authorize()
+        self.post_review(self.offers[0], 'tasty')
+        self.post_review(self.offers[1], 'Tasty,cheap')
+        url = reverse('api:reviews:tag_reviews', kwargs={'pk': self.restaurant.id, 'key': 'TASTY'})
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        newest = Review.objects.get(offer=self.offers[1])
+        self.assertEquals([review['id'] for review in response.data], [newest.id])
+        response = self.client.get(url, {'page_size': 1, 'cursor': response['X-Next-Cursor']})
+        self.assertEquals([review['id'] for review in response.data], [Review.objects.get(offer=self.offers[0]).id])
+        self.assertNotIn('X-Next-Cursor', response)
+        for values in (['not-a-date', newest.id], [{'a': 1}, newest.id], [newest.created_at.isoformat(), [1]]):
+            response = self.client.get(url, {'cursor': KeysetPagination.encode_cursor(values)})
+            self.assertEquals(response.status_code, status.HTTP_404_NOT_FOUND)
+        url = reverse('api:reviews:tag_reviews', kwargs={'pk': self.restaurant.id, 'key': 'missing'})
+        self.assertEquals(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_tags_by_prefix(self):
+        self.authorize()
+        self.post_review(self.offers[0], 'tasty,cheap,taco')
+        self.post_review(self.offers[1], 'taco')
+        response = self.client.post(reverse('api:reviews:search_tags'), {
+            'restaurant_id': self.restaurant.id,
+            'tag': 'TA',
+        })
+        self.assertEquals([tag['name'] for tag in response.data], ['taco', 'tasty'])
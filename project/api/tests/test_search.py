@@ -0,0 +1,186 @@
+import logging
+
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework import status
+
+from project.api.search.suggest import suggest_index
+from project.api.tests.master_tests import MasterTestWrapper
+from project.feed.models import Restaurant, Category, Offer, Review, Comment
+
+
+class SearchRestaurantsAndOffersTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:restaurants:all'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        caches['search'].clear()
+        pizza = Category.objects.create(name='Pizza')
+        burgers = Category.objects.create(name='Burgers')
+        self.napoli = Restaurant.objects.create(
+            name='Napoli',
+            country='CH',
+            city='Zurich',
+            address='Langstrasse 1',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+            category=pizza,
+        )
+        Restaurant.objects.create(
+            name='Pizza Palace',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+            category=burgers,
+        )
+        Offer.objects.create(
+            name='Margherita deal',
+            restaurant=self.napoli,
+            image_url='offer.jpg',
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+        )
+
+    def search(self, text, **params):
+        return self.client.get(self.get_url(), {'search': text, **params})
+
+    def test_ranked_restaurants_with_highlight(self):
+        self.authorize()
+        response = self.search('pizz')
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        restaurants = response.data['restaurants']
+        # a name match ranks above a category match
+        self.assertEquals([r['name'] for r in restaurants], ['Pizza Palace', 'Napoli'])
+        self.assertEquals(restaurants[0]['highlight'], '<b>Pizza</b> Palace')
+
+    def test_offers_found_by_restaurant_name(self):
+        self.authorize()
+        response = self.search('napoli')
+        self.assertEquals([o['name'] for o in response.data['offers']], ['Margherita deal'])
+
+    def test_pagination(self):
+        self.authorize()
+        response = self.search('pizza', page_size=1)
+        self.assertEquals(len(response.data['restaurants']), 1)
+        self.assertTrue(response.data['has_next']['restaurants'])
+        response = self.search('pizza', page_size=1, page=2)
+        self.assertEquals(response.data['restaurants'][0]['name'], 'Napoli')
+        self.assertFalse(response.data['has_next']['restaurants'])
+
+    def test_renamed_category_is_searchable(self):
+        self.authorize()
+        Category.objects.filter(name='Pizza').update(name='old')
+        category = Category.objects.get(name='old')
+        category.name = 'Neapolitan'
+        category.save()
+        response = self.search('neapolitan')
+        self.assertEquals([r['name'] for r in response.data['restaurants']], ['Napoli'])
+
+    def test_nothing_found(self):
+        self.authorize()
+        self.assertEquals(self.search('sushi').data, 'Nothing Found')
+
+
+class SearchCommentsTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:search:search_all'
+    methods = ['POST']
+
+    def setUp(self):
+        super().setUp()
+        caches['search'].clear()
+        review = Review.objects.create(
+            user=self.user,
+            rating_taste=4,
+            rating_ambiance=4,
+            rating_quality=4,
+            rating_money_value=4,
+            rating_overall=4,
+            tags='',
+        )
+        Comment.objects.create(user=self.user, review=review, content='The crust was perfect')
+        Comment.objects.create(user=self.user, review=review, content='Too salty')
+
+    def test_search_comments(self):
+        response = self.client.post(self.get_url(), {'type': 'comments', 'search_string': 'crust'})
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(len(response.data), 1)
+        self.assertEquals(response.data[0]['highlight'], 'The <b>crust</b> was perfect')
+
+
+class SuggestTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:search:suggest'
+    methods = ['GET']
+
+    def setUp(self):
+        super().setUp()
+        self.pizza = Category.objects.create(name='Pizza')
+        self.restaurant = Restaurant.objects.create(
+            name='Pizza Palace',
+            country='CH',
+            city='Zurich',
+            phone_number='+1234567890',
+            opening_hours='24/7',
+            price_level='HIGH',
+            category=self.pizza,
+        )
+        self.offer = Offer.objects.create(
+            name='Pizzeria lunch',
+            restaurant=self.restaurant,
+            image_url='offer.jpg',
+            approval_status=True,
+            valid_from=timezone.now(),
+            valid_till=timezone.now(),
+        )
+        suggest_index.build()
+
+    def suggest(self, q, **params):
+        return self.client.get(self.get_url(), {'q': q, **params})
+
+    def test_suggest_prefix(self):
+        response = self.suggest('piz')
+        self.assertEquals(response.status_code, status.HTTP_200_OK)
+        self.assertEquals(response.data, [
+            {'type': 'category', 'id': self.pizza.id, 'name': 'Pizza'},
+            {'type': 'restaurant', 'id': self.restaurant.id, 'name': 'Pizza Palace'},
+            {'type': 'offer', 'id': self.offer.id, 'name': 'Pizzeria lunch'},
+        ])
+        self.assertEquals(len(self.suggest('PIZZA ', limit=1).data), 1)
+        self.assertEquals(self.suggest('pizza p').data[0]['name'], 'Pizza Palace')
+        self.assertEquals(self.suggest('').data, [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.restaurant.name = 'Burger Barn'
+        self.restaurant.save()
+        self.offer.approval_status = False
+        self.offer.save()
+        self.assertEquals([s['name'] for s in self.suggest('piz').data], ['Pizza'])
+        self.assertEquals(self.suggest('bur').data, [
+            {'type': 'restaurant', 'id': self.restaurant.id, 'name': 'Burger Barn'},
+        ])
+        self.restaurant.delete()
+        self.assertEquals(self.suggest('bur').data, [])
+
+    def test_max_entries_bound(self):
+        suggest_index.max_entries = 2
+        try:
+            with self.assertLogs('project.api.search.suggest', logging.WARNING):
+                suggest_index.build()
+            # categories and restaurants are kept before offers
+            self.assertEquals([s['type'] for s in self.suggest('piz').data], ['category', 'restaurant'])
+            Category.objects.create(name='Pizza napoletana')
+            self.assertEquals(len(self.suggest('piz').data), 2)
+        finally:
+            suggest_index.max_entries = 250000
+
+    def test_stale_index_is_served_while_rebuilding(self):
+        suggest_index.built_at -= suggest_index.refresh_seconds + 1
+        # a write of another worker, the signals of this one do not see it
+        Category.objects.filter(pk=self.pizza.pk).update(name='Pasta')
+        # another thread is rebuilding, the request answers from the index it has
+        with suggest_index.build_lock:
+            self.assertEquals(len(self.suggest('piz').data), 3)
+        self.assertEquals(len(self.suggest('piz').data), 2)
@@ -0,0 +1,119 @@
+import base64
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from project.api.auth.tokens import tokens_for_user
+from project.api.tests.master_tests import MasterTestWrapper
+
+
+class TokenAuthenticationTests(MasterTestWrapper.BasicMasterTests):
+    endpoint = 'api:me:activity'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def use_tokens(self, tokens):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+
+    def test_authenticates_without_reading_the_user(self):
+        self.authorize()
+        self.client.get(self.get_url())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('FROM "auth_user"', sql)
+        # the revocation time of the user is cached after the first request
+        self.assertNotIn('"feed_profile"', sql)
+
+    def test_invalid_token_is_refused(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not.a.token')
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_tokens(self):
+        tokens = tokens_for_user(self.user)
+        self.use_tokens(tokens)
+        response = self.client.post('/backend/api/auth/logout')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('api:token_refresh'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        # tokens issued afterwards work
+        self.use_tokens(tokens_for_user(self.user))
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_password_change_revokes_tokens(self):
+        self.use_tokens(tokens_for_user(self.user))
+        response = self.client.post(
+            '/backend/api/auth/change/password', {'old_password': 'super_secure', 'new_password': 'new_password1'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tokens_issued_before_the_revocation_time_are_refused(self):
+        # test tokens have no iat claim, theirs is derived from their expiry
+        self.authorize()
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_returns_tokens(self):
+        credentials = base64.b64encode(b'test_user:super_secure').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        response = self.client.post('/backend/api/auth/login')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user_info']['username'], 'test_user')
+        self.use_tokens(response.data)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_signup_returns_tokens(self):
+        response = self.client.post('/backend/api/auth/signup', {
+            'mobile_number': '03001234567',
+            'password': 'password1',
+            'first_name': 'Test',
+            'last_name': 'User',
+        })
+        self.assertEqual(response.data['message'], 'user successfully registerd')
+        self.use_tokens(response.data)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_authenticate_returns_tokens(self):
+        response = self.client.post('/backend/api/auth/authenticate', {
+            'uid': 'firebase_uid1',
+            'phone': '+923001234567',
+        })
+        self.assertEqual(response.data['status'], 1)
+        self.use_tokens(response.data)
+        response = self.client.get(self.get_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_endpoints(self):
+        response = self.client.post(
+            reverse('api:token_obtain_pair'), {'username': 'test_user', 'password': 'super_secure'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        refresh = response.data['refresh']
+        response = self.client.post(reverse('api:token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        access = response.data['access']
+        response = self.client.post(reverse('api:token_verify'), {'token': access})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.client.post('/backend/api/auth/logout')
+        response = self.client.post(reverse('api:token_verify'), {'token': access})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('api:token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
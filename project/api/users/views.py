@@ -3,13 +3,16 @@ from django.db.models import Q
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 
 from project.api.me.serializers import UserSerializer
+from project.api.pagination import KeysetPagination
 
 User = get_user_model()
 
 
 class ListUsersView(ListAPIView):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
     serializer_class = UserSerializer
+    pagination_class = KeysetPagination
+    ordering = ('id',)
 
     def filter_queryset(self, queryset):
         search_string = self.request.query_params.get('search')
@@ -25,4 +28,4 @@ class ListUsersView(ListAPIView):
 
 class UserProfileView(RetrieveAPIView):
     serializer_class = UserSerializer
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
@@ -6,12 +6,13 @@ from project.feed.models import Restaurant, Review, Comment, Profile, Category,
 from project.feed.models import Offer
 from .models import coupon
 from .models.coupon import Coupon
-from .models.user_coupon import UserCoupon
+from .models.user_coupon import DailyRedemption, UserCoupon
 from .models.user_offers import UserOffers
 from project.feed.models.admin_ad import AdminAd
 from project.feed.models.tag import Tag
 from project.feed.models.reveiw_images import ReviewImage
 from project.feed.models.menu_image import MenuImage
+from project.feed.models.rating_aggregate import RestaurantRating, OfferRating
 
 
 class RestaurantAdmin(admin.ModelAdmin):
@@ -63,6 +64,15 @@ class UserCouponAdmin(admin.ModelAdmin):
     readonly_fields = ('used_at', )
 
 
+class DailyRedemptionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'day', 'count']
+    list_filter = ['day']
+
+
+class RatingAggregateAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'reviews_count', 'avg_rating', 'updated_at']
+    readonly_fields = ['updated_at']
+
 
 admin.site.register(Restaurant, RestaurantAdmin)
 admin.site.register(Comment, CommentAdmin)
@@ -73,9 +83,12 @@ admin.site.register(CommentLike, CommentLikeAdmin)
 admin.site.register(Offer, OfferAdmin)
 admin.site.register(Coupon, CouponAdmin)
 admin.site.register(UserCoupon, UserCouponAdmin)
+admin.site.register(DailyRedemption, DailyRedemptionAdmin)
 admin.site.register(Review)
 admin.site.register(AdminAd)
 admin.site.register(UserOffers)
 admin.site.register(Tag)
 admin.site.register(ReviewImage)
-admin.site.register(MenuImage)
\ No newline at end of file
+admin.site.register(MenuImage)
+admin.site.register(RestaurantRating, RatingAggregateAdmin)
+admin.site.register(OfferRating, RatingAggregateAdmin)
@@ -0,0 +1,67 @@
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+
+FEISTEL_ROUNDS = 4
+
+
+class CodePermutation(object):
+    """
+    Keyed bijection of [0, alphabet ** length) onto itself, a Feistel network over the
+    smallest even number of bits covering the space with cycle walking back into it.
+    Coupon codes are the permuted positions of a sequence, so they never collide
+    while looking random, and allocating one costs no query.
+    """
+
+    def __init__(self, key, alphabet, length):
+        self.key = hashlib.sha256(key.encode()).digest()
+        self.alphabet = alphabet
+        self.length = length
+        self.size = len(alphabet) ** length
+        bits = max((self.size - 1).bit_length(), 2)
+        self.half_bits = (bits + 1) // 2
+        self.mask = (1 << self.half_bits) - 1
+
+    def round_function(self, round_number, value):
+        digest = hashlib.blake2b(
+            value.to_bytes(16, 'big'), key=self.key, salt=round_number.to_bytes(16, 'big'), digest_size=16
+        ).digest()
+        return int.from_bytes(digest, 'big') & self.mask
+
+    def permute(self, index):
+        if not 0 <= index < self.size:
+            raise ValueError(f'{index} is out of the code space of {self.size} codes')
+        value = index
+        while True:
+            left, right = value >> self.half_bits, value & self.mask
+            for round_number in range(FEISTEL_ROUNDS):
+                left, right = right, left ^ self.round_function(round_number, right)
+            value = (left << self.half_bits) | right
+            # the network permutes the whole bit range, walk until back inside the code space
+            if value < self.size:
+                return value
+
+    def encode(self, value):
+        base = len(self.alphabet)
+        characters = []
+        for i in range(self.length):
+            value, digit = divmod(value, base)
+            characters.append(self.alphabet[digit])
+        return ''.join(reversed(characters))
+
+    def code(self, index):
+        return self.encode(self.permute(index))
+
+
+@lru_cache(maxsize=4)
+def _permutation(key, alphabet, length):
+    return CodePermutation(key, alphabet, length)
+
+
+def get_permutation():
+    """
+    This function returns the permutation configured by COUPON_CODE_KEY, COUPON_CODE_ALPHABET and COUPON_CODE_LENGTH
+    """
+
+    return _permutation(settings.COUPON_CODE_KEY, settings.COUPON_CODE_ALPHABET, settings.COUPON_CODE_LENGTH)
@@ -0,0 +1,100 @@
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+GEOHASH_LENGTH = 12
+
+
+def encode_geohash(lat, long, length=GEOHASH_LENGTH):
+    """
+    This function returns the geohash of a point, every extra character splits the cell in 32
+    """
+
+    lat_range = [-90.0, 90.0]
+    long_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(geohash) < length:
+        value_range, value = (long_range, long) if even else (lat_range, lat)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            value_range[0] = middle
+        else:
+            bits = bits * 2
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(geohash)
+
+
+def cell_size(length):
+    """
+    This function returns the (lat, long) size in degrees of a geohash cell of the given length
+    """
+
+    bits = length * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def bounding_box(lat, long, radius_km):
+    """
+    This function returns (min_lat, max_lat, min_long, max_long) around a point,
+    the longitude span grows towards the poles and is the whole globe close to them
+    """
+
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+        long_delta = 180.0
+    else:
+        long_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    return max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0), long - long_delta, long + long_delta
+
+
+def covering_cells(min_lat, max_lat, min_long, max_long, max_cells=16):
+    """
+    This function returns the smallest set of geohash prefixes covering the box,
+    using the longest prefix for which at most max_cells cells are needed
+    """
+
+    for length in range(GEOHASH_LENGTH, 0, -1):
+        lat_step, long_step = cell_size(length)
+        rows = int((max_lat - min_lat) / lat_step) + 2
+        columns = int((max_long - min_long) / long_step) + 2
+        if rows * columns > max_cells * 4:
+            continue
+        cells = set()
+        for lat in _steps(min_lat, max_lat, lat_step):
+            for long in _steps(min_long, max_long, long_step):
+                # wrap points across the antimeridian back into [-180, 180)
+                cells.add(encode_geohash(lat, (long + 180.0) % 360.0 - 180.0, length))
+        if len(cells) <= max_cells:
+            return sorted(cells)
+    return ['']
+
+
+def _steps(start, stop, step):
+    value = start
+    while value < stop:
+        yield value
+        value += step
+    yield stop
+
+
+def haversine_km(lat_1, long_1, lat_2, long_2):
+    """
+    This function returns the great circle distance between two points in kilometers
+    """
+
+    lat_1, long_1, lat_2, long_2 = map(math.radians, [lat_1, long_1, lat_2, long_2])
+    a = (math.sin((lat_2 - lat_1) / 2) ** 2
+         + math.cos(lat_1) * math.cos(lat_2) * math.sin((long_2 - long_1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
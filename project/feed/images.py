@@ -0,0 +1,151 @@
+import io
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, models, transaction
+from django.db.models import F, Func, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# longest side in pixels of every variant
+VARIANT_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1280,
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+class JSONMerge(Func):
+    """
+    jsonb || jsonb, replaces the keys of the right side in the left one within the UPDATE
+    """
+    arg_joiner = ' || '
+    template = '(%(expressions)s)'
+    output_field = models.JSONField()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_PIPELINE_WORKERS, thread_name_prefix='images')
+    return _executor
+
+
+def render_variants(data):
+    """
+    This function yields (size name, extension, (width, height), bytes) of every variant of an image
+    """
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size_name, size in VARIANT_SIZES.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            for extension, (image_format, options) in VARIANT_FORMATS.items():
+                buffer = io.BytesIO()
+                variant.save(buffer, image_format, **options)
+                yield size_name, extension, variant.size, buffer.getvalue()
+
+
+def record_variants(model, pk, field_name, name, variants):
+    """
+    This function merges the variants of an image into image_variants, unless the row got another image meanwhile
+    """
+
+    # .update() skips auto_now, the row changed all the same
+    touched = {
+        field.name: timezone.now() for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)
+    }
+    model.objects.filter(pk=pk, **{field_name: name}).update(**touched, image_variants=JSONMerge(
+        F('image_variants'), Cast(Value(json.dumps({field_name: variants})), models.JSONField())
+    ))
+
+
+def process(model, pk, field_name, name, data):
+    """
+    This function renders the variants of a stored image and records them on the row. An image it
+    could not process is marked pending, process_images renders it again from the stored original
+    """
+
+    try:
+        storage = model._meta.get_field(field_name).storage
+        root = os.path.splitext(name)[0]
+        variants = {'original': {'bytes': len(data)}}
+        for size_name, extension, (width, height), content in render_variants(data):
+            variant = variants.setdefault(size_name, {'width': width, 'height': height})
+            variant[extension] = {
+                'name': storage.save(f'{root}_{size_name}.{extension}', ContentFile(content)),
+                'bytes': len(content),
+            }
+        record_variants(model, pk, field_name, name, variants)
+    except Exception:
+        logger.exception(f'Could not process {field_name} of {model.__name__} {pk}, marked pending')
+        try:
+            record_variants(model, pk, field_name, name, {'pending': True})
+        except Exception:
+            logger.exception(f'Could not mark {field_name} of {model.__name__} {pk} pending')
+    finally:
+        if not settings.IMAGE_PIPELINE_SYNC:
+            close_old_connections()
+
+
+def read_uploads(instance):
+    """
+    This function returns the (field name, bytes) of the files uploaded to the IMAGE_FIELDS of an instance.
+    Saving the row stores the originals as usual, so they exist once it points to them,
+    only the variants are rendered afterwards
+    """
+
+    jobs = []
+    for field_name in instance.IMAGE_FIELDS:
+        file = getattr(instance, field_name)
+        if not file or file._committed:
+            continue
+        file.open()
+        data = file.read()
+        file.seek(0)
+        jobs.append((field_name, data))
+    return jobs
+
+
+def schedule(instance, jobs):
+    """
+    This function renders the variants of the images of a saved instance in the worker pool once
+    the transaction commits, or right away with IMAGE_PIPELINE_SYNC. Jobs lost with the process
+    leave their images without variants, which process_images renders from the stored originals.
+    """
+
+    for field_name, data in jobs:
+        args = (type(instance), instance.pk, field_name, getattr(instance, field_name).name, data)
+        if settings.IMAGE_PIPELINE_SYNC:
+            process(*args)
+        else:
+            transaction.on_commit(lambda args=args: get_executor().submit(process, *args))
+
+
+def variant_urls(instance, field_name):
+    """
+    This function returns {size: {extension: url}} of the processed variants of an image field,
+    empty until the pipeline processed it
+    """
+
+    storage = instance._meta.get_field(field_name).storage
+    variants = (instance.image_variants or {}).get(field_name, {})
+    return {
+        size_name: {extension: storage.url(variants[size_name][extension]['name']) for extension in VARIANT_FORMATS}
+        for size_name in VARIANT_SIZES
+        if size_name in variants
+    }
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from project.feed.models import Offer
+
+# variant shown for every image of an offer card
+OFFER_CARD_IMAGES = [
+    ('offer', 'image_url', 'card'),
+    ('restaurant', 'cover_image', 'card'),
+    ('restaurant', 'logo_image', 'thumb'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Reports the image bytes sent per offer card with the original uploads and with the variants'
+
+    def handle(self, *args, **options):
+        cards = original_bytes = variant_bytes = pending = 0
+        for offer in Offer.objects.filter(approval_status=True).select_related('restaurant').iterator():
+            cards += 1
+            for owner, field_name, size_name in OFFER_CARD_IMAGES:
+                instance = offer if owner == 'offer' else offer.restaurant
+                if instance is None or not getattr(instance, field_name):
+                    continue
+                variants = instance.image_variants.get(field_name)
+                if not variants or variants.get('pending'):
+                    pending += 1
+                    continue
+                original_bytes += variants['original']['bytes']
+                variant_bytes += variants[size_name]['webp']['bytes']
+        if not cards:
+            self.stdout.write('No approved offers')
+            return
+        self.stdout.write(f'{cards} offer cards, {pending} images not processed yet')
+        self.stdout.write(f'originals: {original_bytes / cards / 1024:.1f} KB per card')
+        self.stdout.write(f'webp variants: {variant_bytes / cards / 1024:.1f} KB per card')
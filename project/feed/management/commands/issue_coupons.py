@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from project.feed.models import Offer
+from project.feed.models.coupon import Coupon
+
+
+class Command(BaseCommand):
+    help = 'Issues coupons for an offer with a single bulk insert'
+
+    def add_arguments(self, parser):
+        parser.add_argument('offer_id', type=int)
+        parser.add_argument('count', type=int)
+        parser.add_argument('--discount', type=int, required=True, help='Discount in percent')
+        parser.add_argument('--valid-from', help='ISO datetime, now by default')
+        parser.add_argument('--valid-days', type=int, default=30, help='Days the coupons stay valid')
+        parser.add_argument('--inactive', action='store_true', help='Issue the coupons deactivated')
+
+    def handle(self, *args, **options):
+        try:
+            offer = Offer.objects.get(pk=options['offer_id'])
+        except Offer.DoesNotExist:
+            raise CommandError(f'Offer {options["offer_id"]} does not exist')
+        if options['count'] < 1:
+            raise CommandError('count must be positive')
+        if not 0 <= options['discount'] <= 100:
+            raise CommandError('discount must be between 0 and 100')
+        valid_from = timezone.now()
+        if options['valid_from']:
+            valid_from = parse_datetime(options['valid_from'])
+            if valid_from is None:
+                raise CommandError('valid-from must be an ISO datetime')
+            if timezone.is_naive(valid_from):
+                valid_from = timezone.make_aware(valid_from)
+        started = time.monotonic()
+        coupons = Coupon.issue(
+            offer,
+            options['count'],
+            valid_from=valid_from,
+            valid_till=valid_from + timedelta(days=options['valid_days']),
+            discount=options['discount'],
+            active=not options['inactive'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Issued {len(coupons)} coupons for offer {offer.pk} in {time.monotonic() - started:.2f}s'
+        ))
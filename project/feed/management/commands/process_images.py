@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from project.feed.images import process
+from project.feed.models import Offer, Restaurant
+from project.feed.models.menu_image import MenuImage
+from project.feed.models.reveiw_images import ReviewImage
+
+
+class Command(BaseCommand):
+    help = 'Renders the missing variants of the images stored before the image pipeline existed or left pending'
+
+    def handle(self, *args, **options):
+        processed = 0
+        for model in [Restaurant, Offer, MenuImage, ReviewImage]:
+            for field_name in model.IMAGE_FIELDS:
+                # rows with an image and no variants of it yet, or whose processing failed
+                queryset = model.objects.exclude(Q(**{field_name: ''}) | Q(image_variants__has_key=field_name) & ~Q(
+                    **{f'image_variants__{field_name}__has_key': 'pending'}
+                ))
+                for pk, name in queryset.values_list('pk', field_name).iterator():
+                    storage = model._meta.get_field(field_name).storage
+                    try:
+                        with storage.open(name) as file:
+                            data = file.read()
+                    except Exception as e:
+                        self.stderr.write(f'{model.__name__} {pk} {field_name}: {e}')
+                        continue
+                    process(model, pk, field_name, name, data)
+                    processed += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} images'))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from project.feed.models import Review, RestaurantRating, OfferRating
+from project.feed.models.rating_aggregate import compute_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the restaurant and offer rating aggregates from the reviews and reports any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report the drift, do not rewrite the aggregates',
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for model in [RestaurantRating, OfferRating]:
+            drifted += self.rebuild(model, check_only=options['check'])
+        if drifted:
+            self.stdout.write(self.style.WARNING(f'{drifted} aggregate rows drifted'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Aggregates are in sync'))
+
+    def rebuild(self, model, check_only):
+        target_field = model.target_field
+        expected = {
+            row.pop(target_field): dict(row, score=model.bayesian_score(row['rating_sum'], row['reviews_count']))
+            for row in compute_aggregates(Review.objects.all(), target_field)
+        }
+        stored = {
+            aggregate.pk: aggregate
+            for aggregate in model.objects.all()
+        }
+        drifted = 0
+        for target_id in sorted(set(expected) | set(stored)):
+            values = expected.get(target_id, {})
+            aggregate = stored.get(target_id, model())
+            differences = [
+                f'{field} {getattr(aggregate, field)} != {values.get(field, 0)}'
+                for field in model.AGGREGATE_FIELDS
+                if getattr(aggregate, field) != values.get(field, 0)
+            ]
+            # scores also drift when PRIOR_MEAN or PRIOR_WEIGHT are changed
+            if abs(aggregate.score - values.get('score', 0)) > 1e-9:
+                differences.append(f'score {aggregate.score} != {values.get("score", 0)}')
+            if differences:
+                drifted += 1
+                self.stdout.write(f'{target_field} {target_id}: {", ".join(differences)}')
+        if drifted and not check_only:
+            with transaction.atomic():
+                model.objects.all().delete()
+                model.objects.bulk_create([
+                    model(**{f'{target_field}_id': target_id}, **values)
+                    for target_id, values in expected.items()
+                ], batch_size=1000)
+        return drifted
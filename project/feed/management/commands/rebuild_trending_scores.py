@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from project.feed.models import Review
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the trending score of every review from its likes, meant to run periodically'
+
+    def handle(self, *args, **options):
+        updated = Review.rebuild_trending_scores()
+        self.stdout.write(self.style.SUCCESS(f'{updated} trending scores rewritten'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from project.feed.models import CommentLike, ReviewLike
+
+
+class Command(BaseCommand):
+    help = 'Folds the like count shards and recomputes the like counts of reviews and comments from their likes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report the drift, do not rewrite the counts',
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for model in [ReviewLike, CommentLike]:
+            drift = model.reconcile(check_only=options['check'])
+            for pk, (stored, counted) in sorted(drift.items()):
+                self.stdout.write(f'{model.target_field} {pk}: like_count {stored} != {counted}')
+            drifted += len(drift)
+        if drifted:
+            self.stdout.write(self.style.WARNING(f'{drifted} like counts drifted'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Like counts are in sync'))
@@ -0,0 +1,87 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:21
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def backfill_aggregates(apps, schema_editor):
+    # the aggregates of compute_aggregates as of this migration
+    Review = apps.get_model('feed', 'Review')
+    for model_name, target_field in [('RestaurantRating', 'restaurant'), ('OfferRating', 'offer')]:
+        model = apps.get_model('feed', model_name)
+        rows = Review.objects.filter(is_active=True, **{f'{target_field}__isnull': False}).values(
+            target_field
+        ).annotate(
+            reviews_count=Count('id'),
+            rating_sum=Sum('rating_overall'),
+            taste_sum=Sum('rating_taste'),
+            ambiance_sum=Sum('rating_ambiance'),
+            quality_sum=Sum('rating_quality'),
+            money_value_sum=Sum('rating_money_value'),
+            stars_1=Count('id', filter=Q(rating_overall__lt=Decimal('1.5'))),
+            stars_2=Count('id', filter=Q(rating_overall__gte=Decimal('1.5'), rating_overall__lt=Decimal('2.5'))),
+            stars_3=Count('id', filter=Q(rating_overall__gte=Decimal('2.5'), rating_overall__lt=Decimal('3.5'))),
+            stars_4=Count('id', filter=Q(rating_overall__gte=Decimal('3.5'), rating_overall__lt=Decimal('4.5'))),
+            stars_5=Count('id', filter=Q(rating_overall__gte=Decimal('4.5'))),
+        ).order_by()
+        model.objects.bulk_create([
+            model(**{f'{target_field}_id': row.pop(target_field)}, **row) for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0011_auto_20210511_1613'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfferRating',
+            fields=[
+                ('reviews_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('taste_sum', models.PositiveIntegerField(default=0)),
+                ('ambiance_sum', models.PositiveIntegerField(default=0)),
+                ('quality_sum', models.PositiveIntegerField(default=0)),
+                ('money_value_sum', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('offer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_aggregate', serialize=False, to='feed.offer')),
+            ],
+            options={
+                'verbose_name': 'Offer rating',
+                'verbose_name_plural': 'Offer ratings',
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantRating',
+            fields=[
+                ('reviews_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('taste_sum', models.PositiveIntegerField(default=0)),
+                ('ambiance_sum', models.PositiveIntegerField(default=0)),
+                ('quality_sum', models.PositiveIntegerField(default=0)),
+                ('money_value_sum', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_aggregate', serialize=False, to='feed.restaurant')),
+            ],
+            options={
+                'verbose_name': 'Restaurant rating',
+                'verbose_name_plural': 'Restaurant ratings',
+            },
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:22
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# RatingAggregate.PRIOR_MEAN and PRIOR_WEIGHT as of this migration
+PRIOR_MEAN = Decimal('3.00')
+PRIOR_WEIGHT = 5
+
+
+def compute_scores(apps, schema_editor):
+    for model_name in ['RestaurantRating', 'OfferRating']:
+        model = apps.get_model('feed', model_name)
+        aggregates = list(model.objects.all())
+        for aggregate in aggregates:
+            aggregate.score = float(
+                (PRIOR_WEIGHT * PRIOR_MEAN + aggregate.rating_sum) / (PRIOR_WEIGHT + aggregate.reviews_count)
+            )
+        model.objects.bulk_update(aggregates, ['score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0012_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offerrating',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='restaurantrating',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='offerrating',
+            index=models.Index(fields=['-score', 'offer'], name='offer_rating_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantrating',
+            index=models.Index(fields=['-score', 'restaurant'], name='restaurant_rating_rank_idx'),
+        ),
+        migrations.RunPython(compute_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:23
+
+from django.db import migrations, models
+
+from project.feed.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Restaurant = apps.get_model('feed', 'Restaurant')
+    restaurants = list(Restaurant.objects.filter(lat__isnull=False, long__isnull=False))
+    for restaurant in restaurants:
+        restaurant.geohash = encode_geohash(restaurant.lat, restaurant.long)
+    Restaurant.objects.bulk_update(restaurants, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0013_rating_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
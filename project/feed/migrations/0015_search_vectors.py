@@ -0,0 +1,53 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from project.feed.search import comment_vector, offer_vector, restaurant_vector
+
+
+def backfill_search_vectors(apps, schema_editor):
+    Category = apps.get_model('feed', 'Category')
+    Restaurant = apps.get_model('feed', 'Restaurant')
+    Restaurant.objects.update(search_vector=restaurant_vector(Category))
+    apps.get_model('feed', 'Offer').objects.update(search_vector=offer_vector(Restaurant))
+    apps.get_model('feed', 'Comment').objects.update(search_vector=comment_vector())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0014_restaurant_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='comment_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='offer_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='restaurant_search_idx'),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_daily_redemptions(apps, schema_editor):
+    UserCoupon = apps.get_model('feed', 'UserCoupon')
+    DailyRedemption = apps.get_model('feed', 'DailyRedemption')
+    days = UserCoupon.objects.filter(user__isnull=False).annotate(
+        day=TruncDate('used_at'),
+    ).values('user_id', 'day').annotate(count=Count('id')).order_by()
+    DailyRedemption.objects.bulk_create(
+        [DailyRedemption(user_id=row['user_id'], day=row['day'], count=row['count']) for row in days.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('feed', '0016_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRedemption',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily redemption',
+                'verbose_name_plural': 'Daily redemptions',
+                'unique_together': {('user', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_redemptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0017_daily_redemption'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CouponCodeSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_index', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
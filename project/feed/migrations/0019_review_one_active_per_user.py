@@ -0,0 +1,33 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+# keeps only the latest of the active reviews a user left for the same restaurant and offer,
+# run rebuild_rating_aggregates afterwards if any row was deactivated
+DEACTIVATE_DUPLICATES = '''
+    UPDATE feed_review AS old SET is_active = false
+    WHERE old.is_active AND EXISTS (
+        SELECT 1 FROM feed_review AS new
+        WHERE new.is_active
+          AND new.user_id = old.user_id
+          AND new.restaurant_id = old.restaurant_id
+          AND new.offer_id = old.offer_id
+          AND (new.created_at, new.id) > (old.created_at, old.id)
+    )
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0018_coupon_code_sequence'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DEACTIVATE_DUPLICATES, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(condition=models.Q(is_active=True), fields=('user', 'restaurant', 'offer'), name='review_one_active_per_user'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.1.7 on 2026-10-18 09:20
+
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.utils.timezone
+
+# Review.TRENDING_HALF_LIFE and TRENDING_EPOCH as of this migration
+TRENDING_HALF_LIFE = timedelta(hours=24)
+TRENDING_EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+def backfill_trending_scores(apps, schema_editor):
+    Review = apps.get_model('feed', 'Review')
+    ReviewLike = apps.get_model('feed', 'ReviewLike')
+    # the existing likes all get the time of the migration, n likes at once weigh ln(n) more than one
+    rate = math.log(2) / TRENDING_HALF_LIFE.total_seconds()
+    weight = rate * (django.utils.timezone.now() - TRENDING_EPOCH).total_seconds()
+    counts = ReviewLike.objects.values('review_id').annotate(count=Count('id')).order_by()
+    for row in counts.iterator():
+        Review.objects.filter(pk=row['review_id']).update(trending_score=weight + math.log(row['count']))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0020_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewlike',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='trending_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-trending_score', '-id'], name='review_trending_idx'),
+        ),
+        migrations.RunPython(backfill_trending_scores, migrations.RunPython.noop),
+    ]
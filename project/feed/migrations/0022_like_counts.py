@@ -0,0 +1,84 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:52
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def backfill_like_counts(apps, schema_editor):
+    for model_name, like_model_name, target_field in [('Review', 'ReviewLike', 'review'),
+                                                      ('Comment', 'CommentLike', 'comment')]:
+        model = apps.get_model('feed', model_name)
+        like_model = apps.get_model('feed', like_model_name)
+        counted = like_model.objects.filter(**{target_field: OuterRef('pk')}).order_by().values(
+            target_field
+        ).annotate(count=Count('pk')).values('count')
+        model.objects.update(like_count=Coalesce(Subquery(counted), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0021_review_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentLikeShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Comment like shard',
+                'verbose_name_plural': 'Comment like shards',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewLikeShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Review like shard',
+                'verbose_name_plural': 'Review like shards',
+            },
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-like_count', '-id'], name='review_popular_idx'),
+        ),
+        migrations.AddField(
+            model_name='reviewlikeshard',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_shards', to='feed.review'),
+        ),
+        migrations.AddField(
+            model_name='commentlikeshard',
+            name='comment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_shards', to='feed.comment'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reviewlikeshard',
+            unique_together={('review', 'shard')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='commentlikeshard',
+            unique_together={('comment', 'shard')},
+        ),
+        migrations.RunPython(backfill_like_counts, migrations.RunPython.noop),
+    ]
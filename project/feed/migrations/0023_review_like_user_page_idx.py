@@ -0,0 +1,17 @@
+# Generated by Django 3.1.7 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0022_like_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reviewlike',
+            index=models.Index(fields=['user', '-created_at', 'id'], name='review_like_user_page_idx'),
+        ),
+    ]
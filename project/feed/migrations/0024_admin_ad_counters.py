@@ -0,0 +1,23 @@
+# Generated by Django 3.1.7 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0023_review_like_user_page_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adminad',
+            name='clicks',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='adminad',
+            name='impressions',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 3.1.7 on 2026-10-18 09:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def normalize_tag(name):
+    return ' '.join(name.lower().split())[:50]
+
+
+def build_tag_index(apps, schema_editor):
+    Tag = apps.get_model('feed', 'Tag')
+    Review = apps.get_model('feed', 'Review')
+    ReviewTag = apps.get_model('feed', 'ReviewTag')
+
+    # one tag per normalized name and restaurant, the oldest one is kept
+    tag_ids = {}
+    duplicates = []
+    for tag in Tag.objects.order_by('id'):
+        key = (tag.restaurant_id, normalize_tag(tag.name))
+        if key in tag_ids:
+            duplicates.append(tag.pk)
+            continue
+        tag_ids[key] = tag.pk
+        Tag.objects.filter(pk=tag.pk).update(key=key[1])
+    Tag.objects.filter(pk__in=duplicates).delete()
+
+    mentions = {}
+    review_tags = []
+    reviews = Review.objects.filter(is_active=True, restaurant__isnull=False).exclude(tags='').exclude(tags__isnull=True)
+    for review in reviews.only('id', 'restaurant_id', 'tags', 'created_at').iterator(chunk_size=1000):
+        names = {}
+        for name in review.tags.split(','):
+            name = ' '.join(name.split())[:50]
+            if name:
+                names.setdefault(normalize_tag(name), name)
+        for key, name in names.items():
+            tag_id = tag_ids.get((review.restaurant_id, key))
+            if tag_id is None:
+                tag_id = Tag.objects.create(name=name, key=key, restaurant_id=review.restaurant_id).pk
+                tag_ids[(review.restaurant_id, key)] = tag_id
+            mentions[tag_id] = mentions.get(tag_id, 0) + 1
+            review_tags.append(ReviewTag(review_id=review.pk, tag_id=tag_id, created_at=review.created_at))
+        if len(review_tags) >= 1000:
+            ReviewTag.objects.bulk_create(review_tags)
+            review_tags = []
+    ReviewTag.objects.bulk_create(review_tags)
+    for tag_id, count in mentions.items():
+        Tag.objects.filter(pk=tag_id).update(mentions=count)
+    # checks the deferred foreign keys now, the tables are altered next in the same transaction
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0024_admin_ad_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Review tag',
+                'verbose_name_plural': 'Review tags',
+            },
+        ),
+        migrations.AddField(
+            model_name='reviewtag',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_tags', to='feed.review'),
+        ),
+        migrations.AddField(
+            model_name='reviewtag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_tags', to='feed.tag'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reviewtag',
+            unique_together={('review', 'tag')},
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='key',
+            field=models.CharField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='mentions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(build_tag_index, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'key'), name='tag_unique_key'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['restaurant', '-mentions', 'id'], name='tag_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['restaurant', 'key'], name='tag_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='reviewtag',
+            index=models.Index(fields=['tag', '-created_at', 'review'], name='review_tag_page_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feed', '0026_updated_at_auto_now'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='tokens_revoked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
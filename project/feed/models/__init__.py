@@ -3,5 +3,6 @@ from .restaurant import Restaurant
 from .review import Review
 from .user_profile import Profile
 from .comment import Comment
-from .likes import ReviewLike, CommentLike
-from .offer import Offer
\ No newline at end of file
+from .likes import ReviewLike, CommentLike, ReviewLikeShard, CommentLikeShard
+from .offer import Offer
+from .rating_aggregate import RestaurantRating, OfferRating
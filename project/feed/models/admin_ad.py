@@ -23,6 +23,13 @@ class AdminAd(models.Model):
         (DIAMOND, 'Diamond'),
     ]
 
+    # relative number of impressions of an ad of every category
+    CATEGORY_FREQUENCY = {
+        SILVER: 100,
+        GOLD: 250,
+        DIAMOND: 500,
+    }
+
     title = models.CharField(max_length=50)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default=SILVER)
     expiry = models.DateTimeField(auto_now=False, auto_now_add=False)
@@ -31,3 +38,6 @@ class AdminAd(models.Model):
     is_active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # buffered by every worker and added in batches, see project/api/admin_ad/rotation.py
+    impressions = models.PositiveBigIntegerField(default=0, editable=False)
+    clicks = models.PositiveBigIntegerField(default=0, editable=False)
@@ -1,4 +1,6 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from project.feed.models import Review
@@ -33,7 +35,17 @@ class Comment(models.Model):
         auto_now=True,
     )
 
+    # likes maintained by project/feed/models/likes.py, viral comments also count the likes of their shards
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # maintained by the post_save signals in project/feed/signals.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
         ordering = ['-modified']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='comment_search_idx'),
+            models.Index(fields=['user', '-created', 'id'], name='comment_user_page_idx'),
+        ]
@@ -1,8 +1,31 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from project.feed.coupon_codes import get_permutation
 from project.feed.models.offer import Offer
-import random
+
+
+class CouponCodeSequence(models.Model):
+    """
+    Single row holding the next position of the coupon code permutation
+    """
+
+    next_index = models.BigIntegerField(default=0)
+
+    @classmethod
+    @transaction.atomic
+    def allocate(cls, count):
+        """
+        Returns count new coupon codes, the row lock serializes concurrent allocations
+        """
+        permutation = get_permutation()
+        sequence, created = cls.objects.select_for_update().get_or_create(pk=1)
+        start = sequence.next_index
+        if start + count > permutation.size:
+            raise ValueError(f'The coupon code space of {permutation.size} codes is exhausted')
+        sequence.next_index = start + count
+        sequence.save(update_fields=['next_index'])
+        return [permutation.code(index) for index in range(start, start + count)]
 
 
 class Coupon(models.Model):
@@ -20,17 +43,29 @@ class Coupon(models.Model):
         null=True,)
 
     def save(self, *args, **kwargs):
-        if self._state.adding:
-
-            while(1):
-                code1 = str(random.randint(1000, 9999))
-                if not Coupon.objects.filter(code=code1).exists():
-                    break
-
-            self.code=code1
-            pass
+        if self._state.adding and not self.code:
+            self.code = CouponCodeSequence.allocate(1)[0]
 
         super(Coupon, self).save(*args, **kwargs)
 
     def __str__(self):
         return self.code
+
+    @classmethod
+    @transaction.atomic
+    def issue(cls, offer, count, valid_from, valid_till, discount, active=True):
+        """
+        Creates count coupons of an offer with a single bulk insert
+        """
+        coupons = [
+            cls(
+                code=code,
+                coupon_offer_id=offer.pk,
+                valid_from=valid_from,
+                valid_till=valid_till,
+                discount=discount,
+                active=active,
+            )
+            for code in CouponCodeSequence.allocate(count)
+        ]
+        return cls.objects.bulk_create(coupons, batch_size=5000)
@@ -1,10 +1,254 @@
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from project.feed.models import Comment, Review
 
 
-class ReviewLike(models.Model):
+class Like(models.Model):
+    """
+    A like of a user on a target row whose like_count column is kept in sync by like and unlike,
+    each a single statement inserting or deleting the like and counting it.
+
+    Once like_count reaches LIKE_COUNT_SHARD_THRESHOLD the target is viral: further likes and unlikes
+    add +1/-1 to one of LIKE_COUNT_SHARDS random shard rows instead of locking the target row,
+    count_for adds the shards back and reconcile folds them into like_count.
+    """
+
+    # name of the foreign key to the liked row and model of its counter shards
+    target_field = None
+    shard_model = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def shard_threshold(cls):
+        # None turns the shards off
+        return getattr(settings, 'LIKE_COUNT_SHARD_THRESHOLD', None) or 2 ** 31 - 1
+
+    @classmethod
+    def target_model(cls):
+        return cls._meta.get_field(cls.target_field).related_model
+
+    @classmethod
+    def target_updates(cls, row_alias, sign):
+        """
+        Returns the SQL and params of the columns of the target to update next to like_count,
+        row_alias names the inserted or deleted like
+        """
+        return '', []
+
+    @classmethod
+    def count_and_shard_sql(cls, row_alias, sign):
+        """
+        Returns the SQL and params of the CTEs counting the like of row_alias
+        on the target row, or on a random shard once the target is viral
+        """
+        quote = connection.ops.quote_name
+        target_table = quote(cls.target_model()._meta.db_table)
+        shard_table = quote(cls.shard_model._meta.db_table)
+        target_column = quote(f'{cls.target_field}_id')
+        updates, update_params = cls.target_updates(row_alias, sign)
+        sql = (
+            f', counted AS ('
+            f' UPDATE {target_table} SET like_count = GREATEST(like_count + %s, 0){updates} FROM {row_alias}'
+            f' WHERE {target_table}.id = {row_alias}.{target_column} AND like_count < %s'
+            f' RETURNING {target_table}.id'
+            f'), sharded AS ('
+            f' INSERT INTO {shard_table} ({target_column}, shard, count)'
+            f' SELECT {target_column}, FLOOR(RANDOM() * %s), %s FROM {row_alias}'
+            f' WHERE NOT EXISTS (SELECT 1 FROM counted)'
+            f' ON CONFLICT ({target_column}, shard) DO UPDATE SET count = {shard_table}.count + %s'
+            f')'
+        )
+        params = [sign] + update_params + [cls.shard_threshold(), settings.LIKE_COUNT_SHARDS, sign, sign]
+        return sql, params
+
+    @classmethod
+    def like(cls, user, target_id):
+        """
+        Inserts the like of a user in one round trip, returning (created, target exists).
+        The target is neither fetched nor locked before, INSERT ... ON CONFLICT DO NOTHING
+        skips likes already given
+        """
+        quote = connection.ops.quote_name
+        like_table = quote(cls._meta.db_table)
+        target_table = quote(cls.target_model()._meta.db_table)
+        # the like of a missing target inserts nothing, the foreign key would only fail on commit
+        columns = ['user_id', f'{cls.target_field}_id']
+        values = ['%s', f'{target_table}.id']
+        params = [user.pk]
+        for field in cls._meta.concrete_fields:
+            if getattr(field, 'auto_now_add', False):
+                columns.append(field.column)
+                values.append('%s')
+                params.append(timezone.now())
+        count_sql, count_params = cls.count_and_shard_sql('inserted', 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH inserted AS ('
+                f' INSERT INTO {like_table} ({", ".join(quote(column) for column in columns)})'
+                f' SELECT {", ".join(values)} FROM {target_table} WHERE {target_table}.id = %s'
+                f' ON CONFLICT DO NOTHING RETURNING *'
+                f'){count_sql}'
+                f' SELECT (SELECT COUNT(*) FROM inserted), EXISTS (SELECT 1 FROM {target_table} WHERE id = %s)',
+                params + [target_id] + count_params + [target_id],
+            )
+            created, exists = cursor.fetchone()
+        return bool(created), exists
+
+    @classmethod
+    def unlike(cls, user, target_id):
+        """
+        Deletes the like of a user in one round trip, returning (deleted, target exists)
+        """
+        quote = connection.ops.quote_name
+        like_table = quote(cls._meta.db_table)
+        target_table = quote(cls.target_model()._meta.db_table)
+        target_column = quote(f'{cls.target_field}_id')
+        count_sql, count_params = cls.count_and_shard_sql('deleted', -1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH deleted AS ('
+                f' DELETE FROM {like_table} WHERE user_id = %s AND {target_column} = %s RETURNING *'
+                f'){count_sql}'
+                f' SELECT (SELECT COUNT(*) FROM deleted), EXISTS (SELECT 1 FROM {target_table} WHERE id = %s)',
+                [user.pk, target_id] + count_params + [target_id],
+            )
+            deleted, exists = cursor.fetchone()
+        return bool(deleted), exists
+
+    @classmethod
+    def record(cls, like, sign=1):
+        """
+        Counts a like saved or deleted through the ORM (admin, cascades) on its target row
+        """
+        quote = connection.ops.quote_name
+        target_table = quote(cls.target_model()._meta.db_table)
+        updates, update_params = cls.target_updates('liked', sign)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {target_table} SET like_count = GREATEST(like_count + %s, 0){updates}'
+                f' FROM (SELECT %s::timestamptz AS created_at) AS liked WHERE {target_table}.id = %s',
+                [sign] + update_params + [getattr(like, 'created_at', None), getattr(like, f'{cls.target_field}_id')],
+            )
+
+    @classmethod
+    def count_for(cls, target):
+        """
+        Returns the likes of a target, only viral targets pay for a query on their shards
+        """
+        if target.like_count < cls.shard_threshold():
+            return target.like_count
+        sharded = cls.shard_model.objects.filter(**{cls.target_field: target}).aggregate(count=Sum('count'))
+        return target.like_count + (sharded['count'] or 0)
+
+    @classmethod
+    def fold_shards(cls):
+        """
+        Moves the counts of the shards into like_count, returns the number of targets updated.
+        Shard rows are deleted and their counts added back in one statement, so likes
+        counted meanwhile are never lost
+        """
+        quote = connection.ops.quote_name
+        target_table = quote(cls.target_model()._meta.db_table)
+        shard_table = quote(cls.shard_model._meta.db_table)
+        target_column = quote(f'{cls.target_field}_id')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH folded AS (DELETE FROM {shard_table} RETURNING {target_column}, count)'
+                f' UPDATE {target_table} SET like_count = GREATEST(like_count + sums.count, 0)'
+                f' FROM (SELECT {target_column}, SUM(count) AS count FROM folded GROUP BY {target_column}) AS sums'
+                f' WHERE {target_table}.id = sums.{target_column}',
+            )
+            return cursor.rowcount
+
+    @classmethod
+    def drift(cls):
+        """
+        Returns {target id: (stored count, counted likes)} of the targets whose like_count
+        plus shards does not match their likes
+        """
+        target_model = cls.target_model()
+        counted = cls.objects.filter(**{cls.target_field: OuterRef('pk')}).order_by().values(
+            cls.target_field
+        ).annotate(count=Count('pk')).values('count')
+        sharded = cls.shard_model.objects.filter(**{cls.target_field: OuterRef('pk')}).order_by().values(
+            cls.target_field
+        ).annotate(count=Sum('count')).values('count')
+        rows = target_model.objects.annotate(
+            counted=Coalesce(Subquery(counted), 0),
+            stored=F('like_count') + Coalesce(Subquery(sharded), 0),
+        ).exclude(stored=F('counted')).values_list('pk', 'stored', 'counted')
+        return {pk: (stored, counted) for pk, stored, counted in rows}
+
+    @classmethod
+    def reconcile(cls, check_only=False):
+        """
+        Folds the shards and rewrites the counters that drifted from the like table,
+        returns the drift found
+        """
+        drift = cls.drift()
+        if check_only:
+            return drift
+        with transaction.atomic():
+            cls.fold_shards()
+            for pk, (stored, counted) in drift.items():
+                cls.target_model().objects.filter(pk=pk).update(like_count=counted)
+        return drift
+
+
+class LikeCountShard(models.Model):
+    """
+    One of the counters a viral target spreads its likes over, count may go negative
+    """
+
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ReviewLikeShard(LikeCountShard):
+    review = models.ForeignKey(
+        Review,
+        related_name='like_shards',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Review like shard'
+        verbose_name_plural = 'Review like shards'
+        unique_together = [(
+            'review', 'shard'
+        )]
+
+
+class CommentLikeShard(LikeCountShard):
+    comment = models.ForeignKey(
+        Comment,
+        related_name='like_shards',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Comment like shard'
+        verbose_name_plural = 'Comment like shards'
+        unique_together = [(
+            'comment', 'shard'
+        )]
+
+
+class ReviewLike(Like):
+
+    target_field = 'review'
+    shard_model = ReviewLikeShard
+
     user = models.ForeignKey(
         User,
         related_name='review_likes',
@@ -18,15 +262,32 @@ class ReviewLike(models.Model):
         on_delete=models.CASCADE,
     )
 
+    # the trending score of the review is decayed from it
+    created_at = models.DateTimeField(auto_now_add=True)
+
     class Meta:
         verbose_name = 'Review like'
         verbose_name_plural = 'Review likes'
         unique_together = [(
              'user', 'review'
         )]
+        # keyset pagination of the likes of a user
+        indexes = [
+            models.Index(fields=['user', '-created_at', 'id'], name='review_like_user_page_idx'),
+        ]
+
+    @classmethod
+    def target_updates(cls, row_alias, sign):
+        # viral reviews only get their trending score from the periodic rebuild_trending_scores
+        sql, params = Review.trending_sql(f'{row_alias}.created_at', sign)
+        return f', trending_score = {sql}', params
+
+
+class CommentLike(Like):
 
+    target_field = 'comment'
+    shard_model = CommentLikeShard
 
-class CommentLike(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
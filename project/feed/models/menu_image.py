@@ -15,7 +15,11 @@ def image_upload_path(instance, filename):
 
 class MenuImage(models.Model):
 
+    IMAGE_FIELDS = ['image']
+
     image = models.ImageField(upload_to=image_upload_path)
+    # resized copies of the images, written by project/feed/images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     sort_order = models.SmallIntegerField()
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
 
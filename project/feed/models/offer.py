@@ -1,6 +1,8 @@
 import datetime
 from decimal import Decimal
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from .restaurant import Restaurant
 
@@ -15,6 +17,8 @@ def offer_image_path(instance, filename):
 
 class Offer(models.Model):
 
+    IMAGE_FIELDS = ['image_url']
+
     name = models.CharField(verbose_name='offer_name', max_length=256)
     description = models.TextField(blank=True, null=True, default='')
     discounted_price = models.FloatField(blank=True, null=True, default=0.0)
@@ -22,6 +26,8 @@ class Offer(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, null=True)
 
     image_url = models.ImageField(upload_to=offer_image_path)
+    # resized copies of the images, written by project/feed/images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     valid_from = models.DateTimeField()
     valid_till = models.DateTimeField()
     approval_status = models.BooleanField(default=False)
@@ -29,7 +35,16 @@ class Offer(models.Model):
     is_redeemable = models.BooleanField(default=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by the post_save signals in project/feed/signals.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='offer_search_idx'),
+            # keyset pagination of the offer lists
+            models.Index(fields=['created_at', 'id'], name='offer_created_page_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,179 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum, Value
+from django.utils import timezone
+
+from project.feed.models.offer import Offer
+from project.feed.models.restaurant import Restaurant
+
+
+def star_bucket(rating):
+    """
+    This function returns the 1-5 star histogram bucket of an overall rating
+    """
+
+    stars = int(Decimal(str(rating)).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    return min(max(stars, 1), 5)
+
+
+def compute_aggregates(reviews, target_field):
+    """
+    This function returns the aggregate values of every target computed from scratch
+    out of the active reviews, for the rebuild command
+    """
+
+    return reviews.filter(is_active=True, **{f'{target_field}__isnull': False}).values(target_field).annotate(
+        reviews_count=Count('id'),
+        rating_sum=Sum('rating_overall'),
+        taste_sum=Sum('rating_taste'),
+        ambiance_sum=Sum('rating_ambiance'),
+        quality_sum=Sum('rating_quality'),
+        money_value_sum=Sum('rating_money_value'),
+        stars_1=Count('id', filter=Q(rating_overall__lt=Decimal('1.5'))),
+        stars_2=Count('id', filter=Q(rating_overall__gte=Decimal('1.5'), rating_overall__lt=Decimal('2.5'))),
+        stars_3=Count('id', filter=Q(rating_overall__gte=Decimal('2.5'), rating_overall__lt=Decimal('3.5'))),
+        stars_4=Count('id', filter=Q(rating_overall__gte=Decimal('3.5'), rating_overall__lt=Decimal('4.5'))),
+        stars_5=Count('id', filter=Q(rating_overall__gte=Decimal('4.5'))),
+    ).order_by()
+
+
+class RatingAggregate(models.Model):
+
+    # the leaderboard score is a bayesian average that pulls the rating of rarely reviewed
+    # targets towards PRIOR_MEAN as if they had PRIOR_WEIGHT extra reviews of that rating
+    PRIOR_MEAN = Decimal('3.00')
+    PRIOR_WEIGHT = 5
+
+    AGGREGATE_FIELDS = [
+        'reviews_count', 'rating_sum', 'taste_sum', 'ambiance_sum', 'quality_sum', 'money_value_sum',
+        'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5',
+    ]
+
+    # name of the one to one field pointing to the rated object
+    target_field = None
+
+    reviews_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    taste_sum = models.PositiveIntegerField(default=0)
+    ambiance_sum = models.PositiveIntegerField(default=0)
+    quality_sum = models.PositiveIntegerField(default=0)
+    money_value_sum = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def avg_rating(self):
+        if not self.reviews_count:
+            return None
+        return self.rating_sum / self.reviews_count
+
+    @property
+    def histogram(self):
+        return {stars: getattr(self, f'stars_{stars}') for stars in range(1, 6)}
+
+    @classmethod
+    def bayesian_score(cls, rating_sum, reviews_count):
+        return float((cls.PRIOR_WEIGHT * cls.PRIOR_MEAN + rating_sum) / (cls.PRIOR_WEIGHT + reviews_count))
+
+    @classmethod
+    def for_target(cls, target):
+        """
+        Returns the aggregate row of a restaurant or offer, or an empty one if it was never reviewed
+        """
+        try:
+            return target.rating_aggregate
+        except cls.DoesNotExist:
+            return cls()
+
+    @classmethod
+    def record(cls, review, sign=1):
+        """
+        Adds (sign=1) or removes (sign=-1) an active review from the aggregate of its target
+        with a single atomic UPDATE, so it can run inside the transaction that writes the review
+        """
+        target_id = getattr(review, f'{cls.target_field}_id')
+        if target_id is None:
+            return
+        rating = Decimal(str(review.rating_overall)).quantize(Decimal('0.01'))
+        stars_field = f'stars_{star_bucket(rating)}'
+        changes = {
+            'reviews_count': F('reviews_count') + sign,
+            'rating_sum': F('rating_sum') + sign * rating,
+            'taste_sum': F('taste_sum') + sign * int(review.rating_taste),
+            'ambiance_sum': F('ambiance_sum') + sign * int(review.rating_ambiance),
+            'quality_sum': F('quality_sum') + sign * int(review.rating_quality),
+            'money_value_sum': F('money_value_sum') + sign * int(review.rating_money_value),
+            stars_field: F(stars_field) + sign,
+            # every SET expression reads the row as it was before the UPDATE
+            'score': ExpressionWrapper(
+                (Value(cls.PRIOR_WEIGHT * cls.PRIOR_MEAN) + F('rating_sum') + sign * rating)
+                / (Value(cls.PRIOR_WEIGHT) + F('reviews_count') + sign),
+                output_field=FloatField(),
+            ),
+            'updated_at': timezone.now(),
+        }
+        if cls.objects.filter(pk=target_id).update(**changes) or sign < 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**{f'{cls.target_field}_id': target_id})
+        except IntegrityError:
+            # a concurrent request created the row first
+            pass
+        cls.objects.filter(pk=target_id).update(**changes)
+
+
+class RestaurantRating(RatingAggregate):
+
+    target_field = 'restaurant'
+
+    restaurant = models.OneToOneField(
+        Restaurant,
+        primary_key=True,
+        related_name='rating_aggregate',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Restaurant rating'
+        verbose_name_plural = 'Restaurant ratings'
+        indexes = [
+            models.Index(fields=['-score', 'restaurant'], name='restaurant_rating_rank_idx'),
+        ]
+
+
+class OfferRating(RatingAggregate):
+
+    target_field = 'offer'
+
+    offer = models.OneToOneField(
+        Offer,
+        primary_key=True,
+        related_name='rating_aggregate',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Offer rating'
+        verbose_name_plural = 'Offer ratings'
+        indexes = [
+            models.Index(fields=['-score', 'offer'], name='offer_rating_rank_idx'),
+        ]
+
+
+def record_review(review, sign=1):
+    """
+    This function keeps both the restaurant and the offer aggregates in sync with a review
+    """
+
+    RestaurantRating.record(review, sign)
+    OfferRating.record(review, sign)
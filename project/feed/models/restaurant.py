@@ -2,9 +2,12 @@ import datetime
 
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django_countries.fields import CountryField
 
+from project.feed.geo import encode_geohash
 from project.feed.models import Category
 
 
@@ -34,6 +37,8 @@ def cover_upload_path(instance, filename):
 
 class Restaurant(models.Model):
 
+    IMAGE_FIELDS = ['image', 'logo_image', 'cover_image']
+
     name = models.CharField(verbose_name='restaurant_name', max_length=50)
     website = models.URLField(verbose_name='restaurant_website', blank=True)
 
@@ -95,6 +100,8 @@ class Restaurant(models.Model):
     zip_code = models.CharField(verbose_name='restaurant_zip_code', max_length=10, blank=True, null=True)
     lat = models.FloatField(verbose_name='latitude', blank=True, null=True)
     long = models.FloatField(verbose_name='logitude', blank=True, null=True)
+    # kept in sync with lat/long on save, prefix searches on it back the nearby search
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
 
     created = models.DateTimeField(verbose_name='date_created', auto_now_add=True)
     modified = models.DateTimeField(verbose_name='date_modified', auto_now=True)
@@ -102,12 +109,31 @@ class Restaurant(models.Model):
     image = models.ImageField(upload_to=image_upload_path, verbose_name='restaurant_image', blank=True)
     logo_image = models.ImageField(upload_to=logo_upload_path, verbose_name='restaurant_logo_image', blank=True)
     cover_image = models.ImageField(upload_to=cover_upload_path, verbose_name='restaurant_cover_image', blank=True)
+    # resized copies of the images, written by project/feed/images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     is_featured = models.BooleanField(default=False)
+    # maintained by the post_save signals in project/feed/signals.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         verbose_name = 'Restaurant'
         verbose_name_plural = 'Restaurants'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='restaurant_search_idx'),
+            # keyset pagination of the restaurant list
+            models.Index(fields=['created', 'id'], name='restaurant_created_page_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        if self.lat is not None and self.long is not None:
+            self.geohash = encode_geohash(self.lat, self.long)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'lat', 'long'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super(Restaurant, self).save(*args, **kwargs)
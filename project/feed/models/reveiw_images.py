@@ -13,7 +13,11 @@ def review_image_path(instance, filename):
 
 class ReviewImage(models.Model):
 
+    IMAGE_FIELDS = ['image_url']
+
     image_url = models.ImageField(upload_to=review_image_path)
+    # resized copies of the images, written by project/feed/images.py
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     review = models.ForeignKey(Review, verbose_name="reveiew_id", on_delete=models.CASCADE)
 
     def __str__(self):
@@ -1,6 +1,10 @@
+import math
+from datetime import datetime, timedelta
+
 from django.utils import timezone
 from django.conf import settings
-from django.db import models
+from django.db import connection, models
+from django.db.models import Q
 from django.core.validators import MaxValueValidator, MinValueValidator
 
 from project.feed.models import Restaurant
@@ -9,6 +13,14 @@ from project.feed.models.offer import Offer
 
 class Review(models.Model):
 
+    # a like weighs twice as much as one liked TRENDING_HALF_LIFE earlier. The score is stored as
+    # ln(sum(exp(rate * (liked_at - TRENDING_EPOCH)))): the decay to the current time divides every
+    # score by the same factor, so the stored values rank reviews without ever being updated for time
+    TRENDING_HALF_LIFE = timedelta(hours=24)
+    TRENDING_EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    # a score keeping less than this fraction after an unlike only held the removed like
+    TRENDING_RESIDUE = 1e-9
+
     user = models.ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, null=True)
     offer = models.ForeignKey(Offer, on_delete=models.CASCADE, null=True)
@@ -21,15 +33,113 @@ class Review(models.Model):
     tags = models.CharField(max_length=256)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # likes maintained by project/feed/models/likes.py, viral reviews also count the likes of their shards
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    # time decayed like score, null without likes, see TRENDING_HALF_LIFE
+    trending_score = models.FloatField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'Review'
         verbose_name_plural = 'Reviews'
         ordering = ['-created_at']
+        # keyset pagination of the reviews of a restaurant and of a user
+        indexes = [
+            models.Index(fields=['restaurant', '-created_at', 'id'], name='review_restaurant_page_idx'),
+            models.Index(fields=['user', '-created_at', 'id'], name='review_user_page_idx'),
+            models.Index(fields=['-trending_score', '-id'], name='review_trending_idx'),
+            models.Index(fields=['-like_count', '-id'], name='review_popular_idx'),
+        ]
         # unique_together = [(
         #      'user', 'restaurant', 'offer'
         # ),]
+        constraints = [
+            # a new review of the same restaurant and offer deactivates the previous one
+            models.UniqueConstraint(
+                fields=['user', 'restaurant', 'offer'],
+                condition=Q(is_active=True),
+                name='review_one_active_per_user',
+            ),
+        ]
     
     def __str__(self):
-        return self.offer.name
\ No newline at end of file
+        return self.offer.name
+
+    @classmethod
+    def deactivate_active(cls, user, restaurant, offer):
+        """
+        Deactivates the active review of a user for a restaurant and offer with a single UPDATE,
+        returning the deactivated reviews so they can be removed from the rating aggregates
+        """
+        columns = ['id', 'restaurant_id', 'offer_id', 'rating_overall',
+                   'rating_taste', 'rating_ambiance', 'rating_quality', 'rating_money_value']
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {quote(cls._meta.db_table)} SET is_active = false, updated_at = %s'
+                f' WHERE user_id = %s AND restaurant_id IS NOT DISTINCT FROM %s'
+                f' AND offer_id IS NOT DISTINCT FROM %s AND is_active'
+                f' RETURNING {", ".join(quote(column) for column in columns)}',
+                [timezone.now(), user.pk, getattr(restaurant, 'pk', None), getattr(offer, 'pk', None)],
+            )
+            rows = cursor.fetchall()
+        return [cls(is_active=False, **dict(zip(columns, row))) for row in rows]
+
+    @classmethod
+    def trending_weight(cls, liked_at):
+        """
+        Returns the log weight a like given at liked_at adds to the trending score
+        """
+        rate = math.log(2) / cls.TRENDING_HALF_LIFE.total_seconds()
+        return rate * (liked_at - cls.TRENDING_EPOCH).total_seconds()
+
+    @classmethod
+    def trending_sql(cls, liked_at_sql, sign=1):
+        """
+        Returns the SQL and params of the new trending score once a like given at liked_at_sql
+        is added (sign=1) or removed (sign=-1), ln(exp(score) +- exp(weight)) computed in the log space
+        """
+        rate = math.log(2) / cls.TRENDING_HALF_LIFE.total_seconds()
+        weight = f'(%s * EXTRACT(EPOCH FROM {liked_at_sql} - %s))'
+        weight_params = [rate, cls.TRENDING_EPOCH]
+        if sign > 0:
+            sql = (
+                f'CASE WHEN trending_score IS NULL THEN {weight}'
+                f' ELSE GREATEST(trending_score, {weight}) + LN(1 + EXP(-ABS(trending_score - {weight}))) END'
+            )
+            params = weight_params * 3
+        else:
+            sql = (
+                f'CASE WHEN trending_score > {weight} - LN(1 - %s)'
+                f' THEN trending_score + LN(1 - EXP({weight} - trending_score)) END'
+            )
+            params = weight_params + [cls.TRENDING_RESIDUE] + weight_params
+        return sql, params
+
+    @classmethod
+    def rebuild_trending_scores(cls):
+        """
+        Recomputes every trending score from the likes, fixing the rounding drift
+        of the incremental updates, and returns the number of reviews written
+        """
+        from project.feed.models.likes import ReviewLike
+
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        rate = math.log(2) / cls.TRENDING_HALF_LIFE.total_seconds()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET trending_score = scores.score FROM {table} AS review'
+                f' LEFT JOIN ('
+                f'  SELECT review_id, top + LN(SUM(EXP(weight - top))) AS score FROM ('
+                f'   SELECT review_id, weight, MAX(weight) OVER (PARTITION BY review_id) AS top FROM ('
+                f'    SELECT review_id, %s * EXTRACT(EPOCH FROM created_at - %s) AS weight'
+                f'    FROM {quote(ReviewLike._meta.db_table)}'
+                f'   ) AS likes'
+                f'  ) AS weighted GROUP BY review_id, top'
+                f' ) AS scores ON scores.review_id = review.id'
+                f' WHERE {table}.id = review.id'
+                f' AND {table}.trending_score IS DISTINCT FROM scores.score',
+                [rate, cls.TRENDING_EPOCH],
+            )
+            return cursor.rowcount
@@ -1,14 +1,122 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models import F
+
 from project.feed.models.restaurant import Restaurant
+from project.feed.models.review import Review
 
 from project.feed.models.coupon import Coupon
 
 
+def normalize_tag(name):
+    """
+    This function returns the key a tag is indexed under: lowercase, single spaced, at most 50 characters
+    """
+
+    return ' '.join(name.lower().split())[:50]
+
+
+def parse_tags(text):
+    """
+    This function returns {key: name} of the comma separated tags of a review, in order and without duplicates
+    """
+
+    tags = {}
+    for name in (text or '').split(','):
+        name = ' '.join(name.split())[:50]
+        if name:
+            tags.setdefault(normalize_tag(name), name)
+    return tags
+
+
 class Tag(models.Model):
 
     name = models.CharField(max_length=50)
+    # normalized name, one tag per key and restaurant
+    key = models.CharField(max_length=50)
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
     is_active = models.BooleanField(default=True)
+    # number of active reviews of the restaurant mentioning the tag
+    mentions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'key'], name='tag_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['restaurant', '-mentions', 'id'], name='tag_top_idx'),
+            # prefix search of the tags of a restaurant, LIKE 'abc%' whatever the collation
+            models.Index(
+                fields=['restaurant', 'key'], name='tag_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']
+            ),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    @classmethod
+    def record_review(cls, review):
+        """
+        Indexes the tags of an active review: creates the missing tags and adds a mention to every tag
+        with one INSERT ... ON CONFLICT, then links the review to them. The tags are locked in the order
+        of their keys, so concurrent reviews sharing several tags can not deadlock
+        """
+        tags = sorted(parse_tags(review.tags).items())
+        if review.restaurant_id is None or not tags:
+            return []
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (name, key, restaurant_id, is_active, mentions)'
+                f' VALUES {", ".join(["(%s, %s, %s, true, 1)"] * len(tags))}'
+                f' ON CONFLICT (restaurant_id, key) DO UPDATE SET mentions = {table}.mentions + 1'
+                f' RETURNING id',
+                [value for key, name in tags for value in (name, key, review.restaurant_id)],
+            )
+            tag_ids = [row[0] for row in cursor.fetchall()]
+        ReviewTag.objects.bulk_create([
+            ReviewTag(review_id=review.pk, tag_id=tag_id, created_at=review.created_at) for tag_id in tag_ids
+        ])
+        return tag_ids
+
+    @classmethod
+    def remove_reviews(cls, review_ids):
+        """
+        Unlinks deactivated reviews from their tags and removes their mentions in one statement
+        """
+        if not review_ids:
+            return
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH removed AS ('
+                f' DELETE FROM {quote(ReviewTag._meta.db_table)} WHERE review_id = ANY(%s) RETURNING tag_id'
+                f') UPDATE {table} SET mentions = GREATEST({table}.mentions - counts.count, 0)'
+                f' FROM (SELECT tag_id, COUNT(*) AS count FROM removed GROUP BY tag_id) AS counts'
+                f' WHERE {table}.id = counts.tag_id',
+                [list(review_ids)],
+            )
+
+    @classmethod
+    def remove_mention(cls, tag_id):
+        cls.objects.filter(pk=tag_id, mentions__gt=0).update(mentions=F('mentions') - 1)
+
+
+class ReviewTag(models.Model):
+    """
+    A tag mentioned by an active review, created_at is the one of the review
+    so the reviews of a tag are paged newest first from the index alone
+    """
+
+    review = models.ForeignKey(Review, related_name='review_tags', on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, related_name='review_tags', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Review tag'
+        verbose_name_plural = 'Review tags'
+        unique_together = [('review', 'tag')]
+        indexes = [
+            models.Index(fields=['tag', '-created_at', 'review'], name='review_tag_page_idx'),
+        ]
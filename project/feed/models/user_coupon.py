@@ -1,11 +1,59 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 import random
 
 from project.feed.models.coupon import Coupon
 
 
+class RedemptionError(Exception):
+    pass
+
+
+class DailyRedemption(models.Model):
+    """
+    Number of coupons a user redeemed on a day, the row is locked by the UPDATE
+    that increments it so concurrent redemptions of a user are serialized on it
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,)
+
+    day = models.DateField()
+
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Daily redemption'
+        verbose_name_plural = 'Daily redemptions'
+        unique_together = [('user', 'day')]
+
+    def __str__(self):
+        return f'{self.user_id} {self.day}: {self.count}'
+
+    @classmethod
+    def increment(cls, user, day, limit):
+        """
+        Adds a redemption to the counter of the day unless it reached the limit,
+        returns False when the limit is reached
+        """
+        counter = cls.objects.filter(user=user, day=day, count__lt=limit)
+        if counter.update(count=F('count') + 1):
+            return True
+        try:
+            with transaction.atomic():
+                cls.objects.create(user=user, day=day, count=1)
+            return True
+        except IntegrityError:
+            # the row exists, either full or created by a concurrent redemption
+            return bool(counter.update(count=F('count') + 1))
+
+
 class UserCoupon(models.Model):
 
     REDEEM_LIMIT = 5
@@ -23,5 +71,26 @@ class UserCoupon(models.Model):
 
     used_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-used_at', 'id'], name='user_coupon_page_idx'),
+        ]
+
     def __str__(self):
         return str(self.user.username)
+
+    @classmethod
+    @transaction.atomic
+    def redeem(cls, user, coupon):
+        """
+        Records a redemption of the coupon in one transaction, raising RedemptionError
+        if the user redeemed it in the last REDEEM_HOURS_LIMIT hours or reached REDEEM_LIMIT today
+        """
+        if not DailyRedemption.increment(user, timezone.localdate(), cls.REDEEM_LIMIT):
+            raise RedemptionError(f'Only {cls.REDEEM_LIMIT} coupons can be redeemed per day.')
+        # the counter row stays locked until commit, no other redemption of the user on the same day
+        # runs meanwhile (two redemptions straddling midnight lock different rows)
+        since = timezone.now() - timedelta(hours=cls.REDEEM_HOURS_LIMIT)
+        if cls.objects.filter(user=user, coupon=coupon, used_at__gt=since).exists():
+            raise RedemptionError('Coupon can not be redeemable before 24 hours.')
+        return cls.objects.create(user=user, coupon=coupon)
@@ -57,3 +57,9 @@ class Profile(models.Model):
         max_length=15,
         default=code_generator,
     )
+
+    # tokens issued before are refused, see project.api.auth.tokens
+    tokens_revoked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
@@ -0,0 +1,41 @@
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery
+
+# 'simple' does no stemming, names of restaurants and dishes are matched as typed
+SEARCH_CONFIG = 'simple'
+
+
+def restaurant_vector(category_model):
+    """
+    This function returns the search vector expression of a restaurant:
+    its name, then its category name, then its address and city
+    """
+
+    category_name = Subquery(category_model.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('address', 'city', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def offer_vector(restaurant_model):
+    """
+    This function returns the search vector expression of an offer:
+    its name, then its restaurant name, then its description
+    """
+
+    restaurant_name = Subquery(restaurant_model.objects.filter(pk=OuterRef('restaurant_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(restaurant_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def comment_vector():
+    """
+    This function returns the search vector expression of a comment
+    """
+
+    return SearchVector('content', weight='A', config=SEARCH_CONFIG)
@@ -1,13 +1,109 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 
-from project.feed.models import Profile
+from project.feed.images import read_uploads, schedule
+from project.feed.models import Category, Comment, CommentLike, Offer, Profile, Restaurant, Review, ReviewLike
+from project.feed.models.menu_image import MenuImage
+from project.feed.models.reveiw_images import ReviewImage
+from project.feed.models.rating_aggregate import record_review
+from project.feed.models.tag import ReviewTag, Tag
+from project.feed.search import comment_vector, offer_vector, restaurant_vector
 
 
 @receiver(post_save, sender=User)
 def my_handler(**kwargs):
-    user = kwargs.get('instance')
-    Profile.objects.get_or_create(
-        user=user,
-    )
+    # only new users miss their profile, saving a user again costs no query on it
+    if kwargs.get('created'):
+        Profile.objects.create(
+            user=kwargs.get('instance'),
+        )
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_aggregates(**kwargs):
+    review = kwargs.get('instance')
+    if review.is_active:
+        record_review(review, sign=-1)
+
+
+# the like views count likes within their own statement, these only see likes written through the ORM
+@receiver(post_save, sender=ReviewLike)
+@receiver(post_save, sender=CommentLike)
+def count_saved_like(**kwargs):
+    like = kwargs.get('instance')
+    if kwargs.get('created'):
+        type(like).record(like)
+
+
+@receiver(post_delete, sender=ReviewLike)
+@receiver(post_delete, sender=CommentLike)
+def count_deleted_like(**kwargs):
+    like = kwargs.get('instance')
+    type(like).record(like, sign=-1)
+
+
+@receiver(post_delete, sender=ReviewTag)
+def remove_tag_mention(**kwargs):
+    Tag.remove_mention(kwargs.get('instance').tag_id)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_restaurant_search_vector(**kwargs):
+    restaurant = kwargs.get('instance')
+    Restaurant.objects.filter(pk=restaurant.pk).update(search_vector=restaurant_vector(Category))
+    # offers are also found by the name of their restaurant
+    if not kwargs.get('created'):
+        Offer.objects.filter(restaurant=restaurant).update(search_vector=offer_vector(Restaurant))
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_vectors(**kwargs):
+    if not kwargs.get('created'):
+        # restaurants are serialized with the name of their category
+        Restaurant.objects.filter(category=kwargs.get('instance')).update(
+            search_vector=restaurant_vector(Category), modified=timezone.now()
+        )
+
+
+# restaurants and reviews are serialized with their images, their timestamps move with them
+@receiver(post_save, sender=MenuImage)
+@receiver(post_delete, sender=MenuImage)
+def touch_restaurant(**kwargs):
+    Restaurant.objects.filter(pk=kwargs.get('instance').restaurant_id).update(modified=timezone.now())
+
+
+@receiver(post_save, sender=ReviewImage)
+@receiver(post_delete, sender=ReviewImage)
+def touch_review(**kwargs):
+    Review.objects.filter(pk=kwargs.get('instance').review_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Offer)
+def update_offer_search_vector(**kwargs):
+    Offer.objects.filter(pk=kwargs.get('instance').pk).update(search_vector=offer_vector(Restaurant))
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_search_vector(**kwargs):
+    Comment.objects.filter(pk=kwargs.get('instance').pk).update(search_vector=comment_vector())
+
+
+@receiver(pre_save, sender=Restaurant)
+@receiver(pre_save, sender=Offer)
+@receiver(pre_save, sender=MenuImage)
+@receiver(pre_save, sender=ReviewImage)
+def read_image_uploads(**kwargs):
+    instance = kwargs.get('instance')
+    instance._image_jobs = read_uploads(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=Offer)
+@receiver(post_save, sender=MenuImage)
+@receiver(post_save, sender=ReviewImage)
+def schedule_image_processing(**kwargs):
+    instance = kwargs.get('instance')
+    schedule(instance, getattr(instance, '_image_jobs', []))
+    instance._image_jobs = []
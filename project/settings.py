@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_countries',
     'rest_framework',
     'project.feed',
@@ -70,15 +71,15 @@ INSTALLED_APPS = [
 # AUTH_USER_MODEL = 'firebase_authentication.User'
 
 MIDDLEWARE = [
+    'project.api.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'project.api.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     # 'firebase_authentication.authentication.FirebaseAuthMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -122,6 +123,78 @@ DATABASES = {
 }
 
 
+# The search cache keeps result pages per normalized query, least recently used pages are
+# evicted first once MAX_ENTRIES is reached and every page expires after TIMEOUT seconds
+CACHES = {
+    # has to be shared by the workers (memcached, redis) for the cached lists dropped on a change
+    # to be dropped for all of them
+    'default': {
+        'BACKEND': os.environ.get('DEFAULT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DEFAULT_CACHE_LOCATION', ''),
+    },
+    'search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'search',
+        'TIMEOUT': 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # has to be shared by the workers (memcached, redis) for sessions to live only there
+    'sessions': {
+        'BACKEND': os.environ.get('SESSION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('SESSION_CACHE_LOCATION', 'sessions'),
+    },
+}
+
+# a default cache local to every worker can only drop their copies, the other workers keep theirs
+# LOCAL_CACHE_MAX_TTL seconds at most
+DEFAULT_CACHE_SHARED = 'locmem' not in CACHES['default']['BACKEND']
+LOCAL_CACHE_MAX_TTL = 60
+
+# sessions are read from the sessions cache, SESSION_WRITE_THROUGH also writes them to the database
+# so a worker missing them in its cache, a flush or a restart does not log users out
+SESSION_WRITE_THROUGH = os.environ.get('SESSION_WRITE_THROUGH', '1') == '1'
+SESSION_ENGINE = 'django.contrib.sessions.backends.{}'.format('cached_db' if SESSION_WRITE_THROUGH else 'cache')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# in memory typeahead index of every worker, ~190 bytes per indexed name
+SUGGEST_MAX_ENTRIES = 250000
+SUGGEST_REFRESH_SECONDS = 300
+
+# coupon codes are a keyed permutation of a sequence over alphabet ** length codes (32 ** 8 ~ 1.1e12),
+# changing any of them can produce codes issued before, they are then rejected by the unique constraint.
+# The key must never change once codes were issued, it is kept apart from SECRET_KEY so rotating that
+# one does not move it. The default is the key the first codes were issued with.
+COUPON_CODE_KEY = os.environ.get('COUPON_CODE_KEY', '&ylsny@gm0rb^4wg+_g8tx-k49v682z)myyj^tlltq8v0$8n!#')
+COUPON_CODE_ALPHABET = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+COUPON_CODE_LENGTH = 8
+
+# uploaded images are stored and resized by a thread pool after the request returned,
+# IMAGE_PIPELINE_SYNC processes them within the request instead (tests)
+IMAGE_PIPELINE_WORKERS = 2
+IMAGE_PIPELINE_SYNC = False
+
+# reviews and comments with LIKE_COUNT_SHARD_THRESHOLD likes count the next ones on LIKE_COUNT_SHARDS
+# shard rows instead of their own row, None keeps every like on the row
+LIKE_COUNT_SHARDS = 16
+LIKE_COUNT_SHARD_THRESHOLD = 1000
+
+# every worker serves ads from memory, reloading them every AD_ROTATION_REFRESH_SECONDS, and adds
+# the impressions and clicks it buffered every AD_FLUSH_SECONDS or once AD_FLUSH_EVENTS are pending
+AD_ROTATION_REFRESH_SECONDS = 60
+AD_FLUSH_SECONDS = 10
+AD_FLUSH_EVENTS = 1000
+
+# responses shorter than this are not worth compressing
+COMPRESSION_MIN_BYTES = 1024
+
+# count the queries of every request in the X-Query-Count and Server-Timing headers and log the requests
+# over their budget (project.api.queries.QUERY_BUDGETS) or repeating queries, with their top shapes
+QUERY_INSTRUMENTATION = os.environ.get('QUERY_INSTRUMENTATION') == '1'
+QUERY_INSTRUMENTATION_TOP_SHAPES = 5
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -140,12 +213,24 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# session users are loaded with their profile in one query, ModelBackend still resolves
+# the sessions created before
+AUTHENTICATION_BACKENDS = [
+    'project.api.auth.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # Authentication is done one a view level
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.BasicAuthentication',
+        'project.api.auth.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'project.api.renderers.ORJSONRenderer',
+        'project.api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -170,6 +255,10 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# how long a process trusts its cached revocation time of a user, with a per process cache
+# a revocation may take this long to reach the other workers
+AUTH_REVOCATION_CACHE_SECONDS = 60
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.0/topics/i18n/
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 
 application = get_wsgi_application()
+
+from project.api.admin_ad.rotation import ad_rotator  # noqa: E402
+from project.api.search.suggest import suggest_index  # noqa: E402
+
+# build the typeahead index of this worker before it takes requests and refresh it in the background
+suggest_index.start()
+
+# serve ads from memory and flush their impressions in the background
+ad_rotator.start()